@@ -0,0 +1,196 @@
+"""
+Self describing capture files 'capture_raw_<stepname>.raw'.
+
+The file starts with a header of HEADER_SIZE bytes:
+MAGIC followed by a json dict with 'dtype', 'dt_s', 'stepname',
+'skalierungsfaktor' and 'samples'.
+The samples follow the header: The file may be mapped using 'np.memmap'.
+
+>>> import tempfile
+>>> filename = pathlib.Path(tempfile.mkdtemp()) / "capture_raw_slow.raw"
+>>> writer = CaptureRawWriter(filename, dt_s=0.5, stepname="slow", skalierungsfaktor=1.0)
+>>> writer.append(np.array([1.0, 2.0, 3.0]))
+>>> writer.append(np.array([4.0, 5.0]))
+>>> writer.close()
+>>> reader = CaptureRawReader(filename)
+>>> reader.dtype, reader.dt_s, reader.stepname, reader.samples
+(dtype('float64'), 0.5, 'slow', 5)
+>>> [piece.tolist() for piece in reader.iter_pieces(push_size_samples=2, start_s=0.5)]
+[[2.0, 3.0], [4.0, 5.0]]
+"""
+
+import json
+import logging
+import pathlib
+
+import numpy as np
+
+logger = logging.getLogger("logger")
+
+MAGIC = b"pymeas2019_noise capture_raw\n"
+HEADER_SIZE = 4096
+"""
+The samples start at this offset. A multiple of the page size.
+"""
+LEGACY_DTYPE = np.dtype(np.float32)
+"""
+Files without header: Samples written by previous versions.
+"""
+SUPPORTED_DTYPES = (np.dtype("<f4"), np.dtype("<f8"))
+LEGACY_CHECK_SAMPLES = 1024
+"""
+A file without header is only accepted if its first samples are finite float32.
+"""
+
+
+class CaptureRawWriter:
+    """
+    Appends samples to a capture file.
+    The dtype is defined by the first 'append()'.
+    'close()' updates the number of samples in the header.
+    """
+
+    def __init__(
+        self,
+        filename: pathlib.Path,
+        dt_s: float,
+        stepname: str,
+        skalierungsfaktor: float,
+    ):
+        assert isinstance(filename, pathlib.Path)
+        assert isinstance(dt_s, float)
+        assert isinstance(stepname, str)
+        assert isinstance(skalierungsfaktor, float)
+
+        self.filename = filename
+        self.dt_s = dt_s
+        self.stepname = stepname
+        self.skalierungsfaktor = skalierungsfaktor
+        self.dtype: np.dtype | None = None
+        self.samples = 0
+        self.__f = filename.open("wb")
+
+    def append(self, array: np.ndarray) -> None:
+        assert isinstance(array, np.ndarray)
+        if self.dtype is None:
+            if array.dtype not in SUPPORTED_DTYPES:
+                raise Exception(
+                    f"{self.filename}: Unsupported dtype '{array.dtype}', expected one of {[dtype.str for dtype in SUPPORTED_DTYPES]}!"
+                )
+            self.dtype = array.dtype
+            self.__write_header()
+        if array.dtype != self.dtype:
+            raise Exception(
+                f"{self.filename}: Expected dtype '{self.dtype}' but got '{array.dtype}'!"
+            )
+        self.__f.write(array.tobytes())
+        self.samples += len(array)
+
+    def close(self) -> None:
+        if self.dtype is None:
+            self.dtype = LEGACY_DTYPE
+        self.__write_header()
+        self.__f.close()
+
+    def __write_header(self) -> None:
+        assert self.dtype is not None
+        header = {
+            "dtype": self.dtype.str,
+            "dt_s": self.dt_s,
+            "stepname": self.stepname,
+            "skalierungsfaktor": self.skalierungsfaktor,
+            "samples": self.samples,
+        }
+        header_bytes = MAGIC + json.dumps(header).encode("ascii") + b"\n"
+        assert len(header_bytes) <= HEADER_SIZE
+        position = self.__f.tell()
+        self.__f.seek(0)
+        self.__f.write(header_bytes.ljust(HEADER_SIZE, b" "))
+        self.__f.seek(max(position, HEADER_SIZE))
+
+
+class CaptureRawReader:
+    """
+    Maps a capture file into memory: No samples are read or copied up front.
+    """
+
+    def __init__(self, filename: pathlib.Path):
+        assert isinstance(filename, pathlib.Path)
+
+        self.filename = filename
+        size_bytes = filename.stat().st_size
+        with filename.open("rb") as f:
+            header_bytes = f.read(HEADER_SIZE)
+
+        if header_bytes.startswith(MAGIC):
+            header = json.loads(header_bytes[len(MAGIC) :])
+            self.dtype = np.dtype(header["dtype"])
+            if self.dtype not in SUPPORTED_DTYPES:
+                raise Exception(
+                    f"{filename}: Unsupported dtype '{self.dtype}', expected one of {[dtype.str for dtype in SUPPORTED_DTYPES]}!"
+                )
+            self.dt_s: float | None = header["dt_s"]
+            self.stepname: str | None = header["stepname"]
+            self.skalierungsfaktor: float | None = header["skalierungsfaktor"]
+            offset = HEADER_SIZE
+        else:
+            self.__check_legacy(header_bytes, size_bytes)
+            logger.warning(
+                f"{filename}: No header: Assume '{LEGACY_DTYPE}' written by a previous version."
+            )
+            self.dtype = LEGACY_DTYPE
+            self.dt_s = None
+            self.stepname = None
+            self.skalierungsfaktor = None
+            offset = 0
+
+        # The header 'samples' is only updated by 'close()':
+        # The file size is also valid if the measurement was aborted.
+        self.samples = (size_bytes - offset) // self.dtype.itemsize
+        self.array: np.ndarray = np.empty(0, dtype=self.dtype)
+        if self.samples > 0:
+            self.array = np.memmap(
+                filename,
+                dtype=self.dtype,
+                mode="r",
+                offset=offset,
+                shape=(self.samples,),
+            )
+
+    def __check_legacy(self, header_bytes: bytes, size_bytes: int) -> None:
+        """
+        Previous versions wrote float32 samples without header.
+        Reject files which are obviously something else.
+        """
+        if header_bytes.startswith(MAGIC.split(b" ")[0]):
+            raise Exception(f"{self.filename}: Unknown header!")
+        if size_bytes % LEGACY_DTYPE.itemsize != 0:
+            raise Exception(
+                f"{self.filename}: No header and the size is not a multiple of '{LEGACY_DTYPE}'!"
+            )
+        samples = np.frombuffer(
+            header_bytes[
+                : len(header_bytes) // LEGACY_DTYPE.itemsize * LEGACY_DTYPE.itemsize
+            ],
+            dtype=LEGACY_DTYPE,
+        )[:LEGACY_CHECK_SAMPLES]
+        if not np.all(np.isfinite(samples)):
+            raise Exception(
+                f"{self.filename}: No header and the samples are not valid '{LEGACY_DTYPE}'!"
+            )
+
+    def sample_index(self, time_s: float) -> int:
+        assert self.dt_s is not None
+        return min(self.samples, round(time_s / self.dt_s))
+
+    def iter_pieces(self, push_size_samples: int, start_s: float = 0.0):
+        """
+        Yield views of 'push_size_samples' starting at 'start_s'.
+        A last incomplete piece is not returned.
+        """
+        assert isinstance(push_size_samples, int)
+        start = 0 if start_s == 0.0 else self.sample_index(start_s)
+        for begin in range(
+            start, self.samples - push_size_samples + 1, push_size_samples
+        ):
+            yield self.array[begin : begin + push_size_samples]
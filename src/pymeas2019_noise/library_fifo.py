@@ -0,0 +1,97 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("logger")
+
+
+class Fifo:
+    """
+    A preallocated first-in-first-out buffer for samples.
+
+    This replaces the pattern 'self.array = np.append(self.array, array_in)'
+    which reallocates and copies the whole backlog on every push.
+
+    The valid samples are always contiguous: 'self.array' is a view and may be
+    passed to numpy/scipy without copying.
+    When the end of the buffer is reached, the remaining samples are moved to
+    the beginning of the buffer. The buffer only grows if the backlog does not fit.
+
+    >>> fifo = Fifo(capacity=4, dtype=np.float64)
+    >>> fifo.push(np.array([1.0, 2.0, 3.0]))
+    >>> fifo.array
+    array([1., 2., 3.])
+    >>> fifo.drop(2)
+    >>> fifo.push(np.array([4.0, 5.0, 6.0]))
+    >>> fifo.array
+    array([3., 4., 5., 6.])
+    >>> fifo.capacity
+    4
+    >>> fifo.pop(3)
+    array([3., 4., 5.])
+    >>> len(fifo)
+    1
+    """
+
+    def __init__(self, capacity: int, dtype):
+        assert isinstance(capacity, int)
+        assert capacity > 0
+        self.__buffer = np.empty(capacity, dtype=dtype)
+        self.__start = 0
+        self.__end = 0
+
+    def __len__(self) -> int:
+        return self.__end - self.__start
+
+    @property
+    def capacity(self) -> int:
+        return len(self.__buffer)
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        A view on the valid samples.
+        The view becomes invalid with the next 'push()'.
+        """
+        return self.__buffer[self.__start : self.__end]
+
+    def push(self, array_in: np.ndarray) -> None:
+        samples = len(array_in)
+        if self.__end + samples > len(self.__buffer):
+            self.__make_room(samples)
+        self.__buffer[self.__end : self.__end + samples] = array_in
+        self.__end += samples
+
+    def drop(self, samples: int) -> None:
+        """
+        Remove 'samples' from the beginning of the fifo.
+        """
+        assert 0 <= samples <= len(self)
+        self.__start += samples
+        if self.__start == self.__end:
+            self.__start = self.__end = 0
+
+    def pop(self, samples: int) -> np.ndarray:
+        """
+        Remove 'samples' from the beginning of the fifo and return a copy of them.
+        """
+        array = self.__buffer[self.__start : self.__start + samples].copy()
+        self.drop(samples)
+        return array
+
+    def __make_room(self, samples: int) -> None:
+        size = len(self)
+        if size + samples > len(self.__buffer):
+            # The backlog does not fit: grow
+            capacity = max(2 * len(self.__buffer), size + samples)
+            logger.debug(
+                f"Fifo: grow from {len(self.__buffer)} to {capacity} samples (backlog {size} samples)"
+            )
+            buffer = np.empty(capacity, dtype=self.__buffer.dtype)
+            buffer[:size] = self.array
+            self.__buffer = buffer
+        else:
+            # Move the remaining samples to the beginning
+            self.__buffer[:size] = self.array
+        self.__start = 0
+        self.__end = size
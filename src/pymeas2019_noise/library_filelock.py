@@ -154,6 +154,19 @@ class FilelockMeasurement:
 
         atexit.register(remove_lock)
 
+        FilelockMeasurement.register_signal_handler()
+
+    @classmethod
+    def init_worker(cls) -> None:
+        """
+        Called in a worker process of a process pool.
+        The parent process holds the lock: The worker only checks the stop requests.
+        """
+        FilelockMeasurement.FILE_LOCK = LockTag.FILENAME_LOCK.open("r")
+        FilelockMeasurement.register_signal_handler()
+
+    @classmethod
+    def register_signal_handler(cls) -> None:
         def signal_handler(sig, frame):  # pylint: disable=unused-argument
             msg = "You pressed Ctrl+C!"
             if not FilelockMeasurement.REQUESTED_STOP_SOFT:
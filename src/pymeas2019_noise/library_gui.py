@@ -7,13 +7,11 @@ This code is base on a sample from
   https://docs.python.org/3/license.html
 """
 
-import itertools
 import logging
 import pathlib
 import time
 import warnings
 
-import matplotlib.animation
 import wx
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg, NavigationToolbar2WxAgg
 from wx import xrc
@@ -74,7 +72,7 @@ class PlotPanel(wx.Panel):
     def __init__(self, parent, app):
         self._app = app
         self._plot_context = app._plot_context
-        self.animation = None
+        self.timer_animate = None
         self.canvas_force_resize = False
         self.canvas_last_resize_s = None
 
@@ -104,25 +102,16 @@ class PlotPanel(wx.Panel):
     def init_plot_data(self):
         self.toolbar.update()  # Not sure why this is needed - ADS
 
-        def endless_iter():
-            yield from itertools.count(start=42)
-
-        self._plot_context.plot_data.startup_duration.log("FuncAnimation() - before")
-        self.animation = matplotlib.animation.FuncAnimation(
-            fig=self._plot_context.fig,
-            func=self.animate,
-            frames=endless_iter(),
-            # Delay between frames in milliseconds
-            interval=1000,
-            # A function used to draw a clear frame. If not given, the results of drawing from the first item in the frames sequence will be used.
-            init_func=None,
-            repeat=False,
-        )
-        self._plot_context.plot_data.startup_duration.log("FuncAnimation() - after")
+        # Not 'FuncAnimation': It redraws the whole figure every frame.
+        # 'PlotContext.animate()' only redraws what changed.
+        self.timer_animate = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.animate, self.timer_animate)
+        self.timer_animate.Start(1000)
+        self._plot_context.plot_data.startup_duration.log("Timer started")
 
-        # Important: If this statement is BEFORE 'FuncAnimation', the animation sometimes does not start!
         with Duration("update_presentation():") as _elapsed:
             self._plot_context.update_presentation()
+        self.canvas.draw_idle()
 
     def GetToolBar(self):
         # You will need to override GetToolBar if you are using an
@@ -130,7 +119,7 @@ class PlotPanel(wx.Panel):
         return self.toolbar
 
     @log_duration
-    def animate(self, i):
+    def animate(self, event):
         self._plot_context.plot_data.startup_duration.log("animate() - beginning")
 
         if self.canvas_last_resize_s:
@@ -143,6 +132,8 @@ class PlotPanel(wx.Panel):
                 self.Layout()
                 self.canvas_force_resize = False
                 self.canvas_last_resize_s = None
+                self._plot_context.update_level_of_detail()
+                self.canvas.draw_idle()
 
         self._plot_context.animate()
 
@@ -305,6 +296,7 @@ class MyApp(wx.App):  # pylint: disable=too-many-instance-attributes
         logger.debug(f"OnComboBoxPresentation(): {self.presentation.title}")
         self._plot_context.set_presentation(self.presentation)
         self._plot_context.update_presentation()
+        self.plotpanel.canvas.draw_idle()
         self.__enable_display_stage()
 
     def UpdateStatusBar(self, event):
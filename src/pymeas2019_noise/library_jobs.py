@@ -0,0 +1,107 @@
+"""
+Process the 'raw-*' directories of a measurement in parallel.
+
+Every directory is independent: 'map_dir_raw()' fans them out to a process pool.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import pathlib
+from collections.abc import Callable
+
+from . import library_logger, library_topic
+
+logger = logging.getLogger("logger")
+
+
+def _init_worker(
+    directory_logger: pathlib.Path,
+    logger_name: str,
+    worker_counter,
+    func_init_worker: Callable[[], None] | None,
+) -> None:
+    with worker_counter.get_lock():
+        worker_counter.value += 1
+        worker = worker_counter.value
+    # With 'fork', the logger of the parent process is inherited.
+    library_logger.Dummy.INITIALIZED = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    library_logger.init_logger(directory_logger, (f"{logger_name}_job{worker}.txt",))
+    if func_init_worker is not None:
+        func_init_worker()
+
+
+def _run(
+    func: Callable[[pathlib.Path], None], dir_raw: pathlib.Path, skip_on_error: bool
+) -> str | None:
+    """
+    Return None or the reason why 'dir_raw' was skipped.
+    """
+    try:
+        func(dir_raw)
+    except library_topic.FrequencyNotFound as e:
+        if skip_on_error:
+            logger.warning(f"SKIPPED: {e}")
+            return str(e)
+        raise
+    return None
+
+
+def map_dir_raw(
+    func: Callable[[pathlib.Path], None],
+    dir_raws: list[pathlib.Path],
+    jobs: int,
+    directory_logger: pathlib.Path,
+    logger_name: str,
+    skip_on_error: bool,
+    func_init_worker: Callable[[], None] | None = None,
+) -> dict[str, str]:
+    """
+    Call 'func(dir_raw)' for every directory.
+    jobs == 1: In this process.
+    jobs > 1: In a pool of 'jobs' processes. Every worker logs
+      to '<logger_name>_job<n>.txt'. 'func' and 'func_init_worker' have
+      to be module level functions.
+
+    Return the skipped directories: {dir_raw.name: reason}
+    """
+    assert isinstance(jobs, int)
+    assert jobs >= 1
+
+    skipped: dict[str, str] = {}
+    if jobs == 1:
+        for dir_raw in dir_raws:
+            reason = _run(func, dir_raw, skip_on_error)
+            if reason is not None:
+                skipped[dir_raw.name] = reason
+        return skipped
+
+    logger.info(f"Processing {len(dir_raws)} directories using {jobs} jobs.")
+    worker_counter = multiprocessing.Value("i", 0)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(directory_logger, logger_name, worker_counter, func_init_worker),
+    ) as executor:
+        futures = {
+            executor.submit(_run, func, dir_raw, skip_on_error): dir_raw
+            for dir_raw in dir_raws
+        }
+        for future in concurrent.futures.as_completed(futures):
+            dir_raw = futures[future]
+            reason = future.result()
+            if reason is not None:
+                skipped[dir_raw.name] = reason
+            logger.info(f"{dir_raw.name}: done")
+    return skipped
+
+
+def log_skipped(skipped: dict[str, str]) -> None:
+    if len(skipped) == 0:
+        return
+    lines = [f"  {name}: {reason}" for name, reason in sorted(skipped.items())]
+    logger.warning(
+        f"SKIPPED {len(skipped)} directories (FrequencyNotFound):\n" + "\n".join(lines)
+    )
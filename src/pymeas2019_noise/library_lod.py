@@ -0,0 +1,163 @@
+"""
+Level of detail for the interactive plot.
+
+A stage may hold hundreds of thousands of samples, but the axes is only
+about a thousand pixels wide. 'LodLine' hands matplotlib a min/max
+envelope: Per pixel column, the samples with the minimum and the maximum
+value. The envelope is recalculated when the view (zoom, pan, scale or
+size of the axes) changes.
+
+The x values have to be sorted: This is the case for the time series,
+the spectra and the step sizes.
+
+>>> x = np.arange(1_000_000, dtype=float)
+>>> y = np.sin(x / 1000.0)
+>>> x_lod, y_lod = envelope(x, y, x_min=0.0, x_max=1e6, columns=500, logarithmic=False)
+>>> len(x_lod) <= 2 * 500 + 4
+True
+>>> float(y_lod.min()) == float(y.min()), float(y_lod.max()) == float(y.max())
+(True, True)
+>>> float(x_lod[0]), float(x_lod[-1])
+(0.0, 999999.0)
+"""
+
+import numpy as np
+
+POINTS_PER_COLUMN = 4
+"""
+Lines with fewer visible points per pixel column are not decimated.
+"""
+
+
+def envelope(
+    x: np.ndarray,
+    y: np.ndarray,
+    x_min: float,
+    x_max: float,
+    columns: int,
+    logarithmic: bool,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the samples with the minimum and maximum y of every pixel column
+    between x_min and x_max. One sample on both sides of the view is added:
+    A line continues to the border of the axes.
+    """
+    assert columns >= 1
+
+    begin = max(int(np.searchsorted(x, x_min, side="left")) - 1, 0)
+    end = min(int(np.searchsorted(x, x_max, side="right")) + 1, len(x))
+    if end - begin <= POINTS_PER_COLUMN * columns:
+        return x[begin:end], y[begin:end]
+
+    x_view = x[begin:end]
+    y_view = y[begin:end]
+    if logarithmic:
+        x_positive = x_view[x_view > 0.0]
+        if len(x_positive) == 0:
+            return x_view, y_view
+        x_min = max(x_min, float(x_positive[0]))
+        edges = np.geomspace(x_min, x_max, num=columns + 1)
+    else:
+        edges = np.linspace(x_min, x_max, num=columns + 1)
+    # The start index of every pixel column which contains samples.
+    # The samples beyond the view are columns of their own: They must not
+    # hide the minimum or maximum of the first and last column.
+    starts = np.unique(
+        np.concatenate(
+            (
+                [0],
+                np.searchsorted(x_view, [x_min], side="left"),
+                np.searchsorted(x_view, edges[1:-1]),
+                np.searchsorted(x_view, [x_max], side="right"),
+            )
+        )
+    )
+    starts = starts[starts < len(x_view)]
+
+    indices = [
+        [0, len(x_view) - 1],
+        _first_index_of(y_view, starts, np.minimum.reduceat(y_view, starts)),
+        _first_index_of(y_view, starts, np.maximum.reduceat(y_view, starts)),
+    ]
+    selected = begin + np.unique(np.concatenate(indices))
+    return x[selected], y[selected]
+
+
+def _first_index_of(
+    y: np.ndarray, starts: np.ndarray, values: np.ndarray
+) -> np.ndarray:
+    """
+    Return the index of 'values[i]' in the column beginning at 'starts[i]'.
+    """
+    counts = np.diff(np.append(starts, len(y)))
+    found = np.flatnonzero(y == np.repeat(values, counts))
+    if len(found) == 0:
+        # All values are NaN
+        return starts
+    positions = found[np.minimum(np.searchsorted(found, starts), len(found) - 1)]
+    # NaN: The value is not found in its column
+    return np.where(positions < starts + counts, positions, starts)
+
+
+class LodLine:
+    """
+    Wraps a 'Line2D': 'set_data()' keeps all samples, the line displays
+    the envelope for the current view.
+    """
+
+    def __init__(self, plot_line):
+        self.plot_line = plot_line
+        self.__x = np.zeros(0)
+        self.__y = np.zeros(0)
+        self.__decimate = False
+        self.__view: tuple | None = None
+
+    def set_data(self, x, y) -> None:
+        x = np.asarray(x)
+        y = np.asarray(y)
+        assert len(x) == len(y)
+        self.__x = x
+        self.__y = y
+        self.__decimate = (len(x) > 1) and bool(np.all(x[1:] >= x[:-1]))
+        self.__view = None
+        if not self.__decimate:
+            self.plot_line.set_data(x, y)
+            return
+        self.update_view()
+
+    def update_view(self) -> bool:
+        """
+        Recalculate the envelope if the view changed.
+        Return True if the data of the line changed.
+        """
+        if not self.__decimate:
+            return False
+        ax = self.plot_line.axes
+        if ax is None:
+            # The line has been removed
+            return False
+        logarithmic = ax.get_xscale() == "log"
+        if ax.get_autoscalex_on():
+            # The limits will be calculated from the envelope: Cover all samples.
+            x_min, x_max = self.__x[0], self.__x[-1]
+        else:
+            x_min, x_max = sorted(ax.get_xlim())
+        columns = max(int(ax.get_window_extent().width), 1)
+        view = (float(x_min), float(x_max), columns, logarithmic)
+        if view == self.__view:
+            return False
+        self.__view = view
+        self.plot_line.set_data(
+            *envelope(
+                self.__x,
+                self.__y,
+                x_min=x_min,
+                x_max=x_max,
+                columns=columns,
+                logarithmic=logarithmic,
+            )
+        )
+        return True
+
+    def remove(self) -> None:
+        self.plot_line.remove()
@@ -0,0 +1,169 @@
+"""
+Redo only what is stale: 'result_manifest.json'.
+
+Per step (for example 'condense'), the manifest of a directory stores
+- the inputs: {filename: [st_mtime_ns, st_size]}
+- the fingerprint of the parameters, for example of the plot config
+- the version of pymeas2019_noise
+- the outputs: They still have to exist.
+
+A step is up to date if all of them match.
+The inputs are stamped before the step is done: A file written
+while the step is running will be detected next time.
+
+>>> import tempfile
+>>> directory = pathlib.Path(tempfile.mkdtemp())
+>>> filename_input = directory / "densitystep_slow_02.npz"
+>>> _ = filename_input.write_text("x")
+>>> manifest = Manifest(directory)
+>>> stamp = manifest.stamp([filename_input])
+>>> manifest.is_up_to_date(STEP_CONDENSE, stamp, fingerprint("E12"))
+False
+>>> manifest.update(STEP_CONDENSE, stamp, fingerprint("E12"), outputs=[filename_input])
+>>> Manifest(directory).is_up_to_date(STEP_CONDENSE, stamp, fingerprint("E12"))
+True
+>>> manifest.is_up_to_date(STEP_CONDENSE, stamp, fingerprint("E24"))
+False
+"""
+
+import dataclasses
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pathlib
+import types
+from collections.abc import Callable, Iterable
+
+from . import __version__
+
+logger = logging.getLogger("logger")
+
+FILENAME = "result_manifest.json"
+FORMAT_VERSION = 1
+"""
+Increment if the structure of the manifest changes: All steps will be redone.
+"""
+STEP_PROCESS_RAW = "process_raw"
+STEP_CONDENSE = "condense"
+STEP_COMPOSITE_PLOTS = "composite_plots"
+
+
+def fingerprint(*parameters) -> str:
+    """
+    A hash of the parameters.
+    Dataclasses are hashed by their fields, functions by their source code:
+    Editing 'config_plot.py' makes the results stale.
+    """
+    h = hashlib.sha256()
+    for parameter in parameters:
+        h.update(_canonical(parameter).encode())
+    return h.hexdigest()[:16]
+
+
+def _canonical(obj) -> str:
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        fields = ", ".join(
+            f"{field.name}={_canonical(getattr(obj, field.name))}"
+            for field in dataclasses.fields(obj)
+        )
+        return f"{type(obj).__qualname__}({fields})"
+    if isinstance(obj, types.ModuleType):
+        return f"module {obj.__name__}"
+    if isinstance(obj, types.FunctionType | types.MethodType):
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = ""
+        return f"function {obj.__module__}.{obj.__qualname__} {hashlib.sha256(source.encode()).hexdigest()}"
+    if isinstance(obj, list | tuple):
+        return "[" + ", ".join(_canonical(item) for item in obj) + "]"
+    if isinstance(obj, dict):
+        return (
+            "{"
+            + ", ".join(f"{key!r}: {_canonical(obj[key])}" for key in sorted(obj))
+            + "}"
+        )
+    return repr(obj)
+
+
+class Manifest:
+    def __init__(self, directory: pathlib.Path):
+        assert isinstance(directory, pathlib.Path)
+        self.directory = directory
+        self.filename = directory / FILENAME
+
+    def __load(self) -> dict:
+        try:
+            data = json.loads(self.filename.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"{self.filename}: {e}: All steps will be redone.")
+            return {}
+        if data.get("format") != FORMAT_VERSION:
+            return {}
+        return data["steps"]
+
+    def __name(self, filename: pathlib.Path) -> str:
+        return filename.relative_to(self.directory).as_posix()
+
+    def stamp(self, inputs: Iterable[pathlib.Path]) -> dict[str, list[int]]:
+        stamp = {}
+        for filename in inputs:
+            stat = filename.stat()
+            stamp[self.__name(filename)] = [stat.st_mtime_ns, stat.st_size]
+        return stamp
+
+    def has_step(self, step: str) -> bool:
+        return step in self.__load()
+
+    def is_up_to_date(self, step: str, stamp: dict, fingerprint: str) -> bool:
+        entry = self.__load().get(step)
+        if entry is None:
+            return False
+        if entry["version"] != __version__:
+            return False
+        if entry["fingerprint"] != fingerprint:
+            return False
+        if entry["inputs"] != stamp:
+            return False
+        return all((self.directory / name).exists() for name in entry["outputs"])
+
+    def update(
+        self,
+        step: str,
+        stamp: dict,
+        fingerprint: str,
+        outputs: Iterable[pathlib.Path],
+    ) -> None:
+        steps = self.__load()
+        steps[step] = {
+            "version": __version__,
+            "fingerprint": fingerprint,
+            "inputs": stamp,
+            "outputs": sorted(self.__name(filename) for filename in outputs),
+        }
+        filename_tmp = self.filename.with_name(self.filename.name + ".tmp")
+        filename_tmp.write_text(
+            json.dumps({"format": FORMAT_VERSION, "steps": steps}, indent=1)
+        )
+        os.replace(filename_tmp, self.filename)
+
+    def updater(
+        self,
+        step: str,
+        stamp: dict,
+        fingerprint: str,
+        func_outputs: Callable[[], Iterable[pathlib.Path]],
+    ) -> Callable[[], None]:
+        """
+        Return a function which updates the manifest:
+        'func_outputs()' is called when the outputs have been written.
+        """
+
+        def update():
+            self.update(step, stamp, fingerprint, outputs=func_outputs())
+
+        return update
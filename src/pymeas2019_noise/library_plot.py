@@ -5,8 +5,25 @@ do_show=False,do_animate=False: No GUI. Just write the plot into a file.
 do_show=True,do_animate=False: GUI. Show the data, no animation.
 do_show=True,do_animate=True: GUI. Show the data, animation.
 
+The animation checks for changed data:
+'PlotContext.animate()' does all the work in the calling thread.
+A GUI may instead run 'PlotContext.refresh()' in a worker thread:
+
+  GUI thread:    request = plot_context.refresh_request()  # None: no changes
+  worker thread: result = PlotContext.refresh(request)
+  GUI thread:    plot_context.apply_refresh(result)
+
+The changes are reported by 'plot_data.file_watcher', see 'library_topic.FileWatcher'.
+
+Redrawing the whole figure is slow: The logarithmic grids and ticks.
+The plot lines and the legend are therefore 'animated' artists:
+A full draw caches the background without them, 'PlotContext.blit_lines()'
+then only draws the lines onto the cached background.
+A full draw is only required if the presentation, the scales or the size change.
+
 """
 
+import dataclasses
 import logging
 import pathlib
 import subprocess
@@ -14,11 +31,206 @@ import sys
 
 import matplotlib.pyplot as plt
 import matplotlib.ticker
+import numpy as np
 
-from . import library_plot_config, library_subprocess, library_topic, run_0_measure
+from . import (
+    library_lod,
+    library_plot_config,
+    library_render,
+    library_subprocess,
+    library_topic,
+    run_0_measure,
+)
 
 logger = logging.getLogger("logger")
 
+LINE_STYLE = dict(  # noqa: C408
+    linestyle="none",
+    linewidth=0.1,
+    marker=".",
+    markersize=3,
+)
+
+
+def calculate_xy(
+    topics, presentation, stage, func_summary_replaced=None
+) -> tuple[list, str]:
+    """
+    Return ([(topic, (x, y) or None), ...], x_label).
+    None: The topic has nothing to display.
+    func_summary_replaced(): Called if the summary of a topic is just being
+    reloaded: The topic has to be displayed again after the reload.
+    """
+    assert isinstance(presentation, library_topic.Presentation)
+    assert isinstance(stage, None | library_topic.Stage)
+
+    label_stepsize = set()
+    list_xy = []
+    for topic in topics:
+        _stage = stage
+        if presentation.requires_stage:
+            _stage = topic.find_stage(stage)
+            if _stage is None:
+                logger.warning(f"No stage stored for topic {topic.color_topic}")
+                list_xy.append((topic, None))
+                continue
+            label_stepsize.add(_stage.label)
+        try:
+            x, y = presentation.get_xy(topic=topic, stage=_stage)
+        except (
+            library_topic.Stage100msNotFoundException,
+            library_topic.FrequencyNotFound,
+        ) as exc:
+            logger.error(f"SKIPPED: Topic {topic.topic}: {exc}")
+            list_xy.append((topic, None))
+            continue
+        except library_topic.SummaryReplacedException as exc:
+            logger.debug(f"Topic {topic.topic}: {exc}")
+            list_xy.append((topic, None))
+            if func_summary_replaced is not None:
+                func_summary_replaced()
+            continue
+        assert len(x) == len(y)
+        list_xy.append((topic, (x, y)))
+
+    x_label = presentation.x_label
+    if len(label_stepsize) > 0:
+        x_label += "  "
+        x_label += ", ".join(sorted(label_stepsize))
+    return list_xy, x_label
+
+
+def style_presentation(
+    fig,
+    ax,
+    tag: str,
+    x_label: str,
+    y_label: str,
+    logarithmic_scales: bool,
+    plot_config: library_plot_config.PlotConfig,
+) -> None:
+    """
+    Labels, scales and grid: Shared by the GUI and 'PresentationFigure'.
+    """
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+
+    for _ax in fig.get_axes():
+        _ax.relim()
+        _ax.autoscale()
+        _ax.grid(
+            True,
+            which="major",
+            axis="both",
+            linestyle="-",
+            color="gray",
+            linewidth=0.5,
+        )
+        _ax.grid(
+            True,
+            which="minor",
+            axis="both",
+            linestyle="-",
+            color="silver",
+            linewidth=0.1,
+        )
+        if logarithmic_scales:
+            _ax.xaxis.set_major_locator(
+                matplotlib.ticker.LogLocator(base=10.0, numticks=20)
+            )
+            _ax.yaxis.set_major_locator(
+                matplotlib.ticker.LogLocator(base=10.0, numticks=20)
+            )
+            # Uncomment to modify figure
+            # fig.set_size_inches(13.0, 7.0)
+            # ax.set_xlim(1e-3, 1e4)
+            # ax.set_ylim(1e-9, 1e-5)
+            if plot_config.func_matplotlib_ax is not None:
+                if tag != library_topic.PRESENTATION_STEPSIZE:
+                    plot_config.func_matplotlib_ax(ax=_ax)
+
+    if logarithmic_scales:
+        if plot_config.func_matplotlib_fig is not None:
+            plot_config.func_matplotlib_fig(fig=fig)
+
+
+@dataclasses.dataclass(slots=True)
+class LineData:
+    x: np.ndarray
+    y: np.ndarray
+    color: str
+    label: str
+
+
+@dataclasses.dataclass(slots=True)
+class PresentationFigure:
+    """
+    A presentation as plain data: See 'library_render'.
+    """
+
+    tag: str
+    x_label: str
+    y_label: str
+    logarithmic_scales: bool
+    plot_config: library_plot_config.PlotConfig
+    title: str | None
+    lines: list[LineData]
+    filenames: list[pathlib.Path]
+    dpi: int
+
+    def render(self) -> None:
+        fig = library_render.new_figure(figsize=(8, 4))
+        ax = fig.subplots()
+        if self.title:
+            ax.set_title(self.title)
+        scale = "log" if self.logarithmic_scales else "linear"
+        for line in self.lines:
+            # As 'PlotContext': A dummy line is scaled and then set.
+            # This also keeps the limits valid if the data is empty.
+            (plot_line,) = ax.plot(
+                (0, 1), (0, 1), color=line.color, label=line.label, **LINE_STYLE
+            )
+            ax.set_xscale(scale)
+            ax.set_yscale(scale)
+            plot_line.set_data(line.x, line.y)
+        leg = ax.legend(fancybox=True, framealpha=0.5)
+        leg.get_frame().set_linewidth(0.0)
+        style_presentation(
+            fig=fig,
+            ax=ax,
+            tag=self.tag,
+            x_label=self.x_label,
+            y_label=self.y_label,
+            logarithmic_scales=self.logarithmic_scales,
+            plot_config=self.plot_config,
+        )
+        for filename in self.filenames:
+            fig.savefig(filename, dpi=self.dpi)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class RefreshRequest:
+    """
+    What is displayed: A snapshot taken in the GUI thread.
+    """
+
+    plot_data: library_topic.PlotDataMultipleDirectories
+    check_directories: bool
+    topics: tuple[library_topic.Topic, ...]
+    presentation: library_topic.Presentation
+    stage: library_topic.Stage | None
+    generation: int
+    """
+    Incremented by 'PlotContext.invalidate()'.
+    """
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class RefreshResult:
+    generation: int
+    directories_changed: bool
+    updates: list[library_topic.TopicUpdate]
+
 
 class PlotContext:
     def __init__(
@@ -41,9 +253,19 @@ class PlotContext:
         # The data to be displayed
         self.plot_data = plot_data
         self._plot_is_invalid = True
+        # A summary was replaced while drawing: Redraw after the next refresh.
+        self._invalidate_after_refresh = False
+        self._generation = 0
         self._topic = None
         self._stage = None
         self._fig, self._ax = plt.subplots(figsize=(8, 4))
+        self._lod_lines: list[library_lod.LodLine] = []
+        self._legend = None
+        self._background = None
+        # Zoom, pan, autoscale and resize change the limits
+        self._ax.callbacks.connect("xlim_changed", self._on_xlim_changed)
+        # The callbacks of the figure are kept if the GUI replaces the canvas
+        self._fig.canvas.mpl_connect("draw_event", self._on_draw)
 
     @property
     def fig(self):
@@ -59,6 +281,7 @@ class PlotContext:
 
     def invalidate(self):
         self._plot_is_invalid = True
+        self._generation += 1
 
     def set_presentation(self, presentation):
         assert isinstance(presentation, library_topic.Presentation)
@@ -78,22 +301,88 @@ class PlotContext:
             (plot_line,) = self._ax.plot(
                 x,
                 y,
-                linestyle="none",
-                linewidth=0.1,
-                marker=".",
-                markersize=3,
                 color=topic.color,
                 label=topic.topic_basenoise(self._presentation),
+                **LINE_STYLE,
             )
             scale = "log" if self._presentation.logarithmic_scales else "linear"
             self._ax.set_xscale(scale)
             self._ax.set_yscale(scale)
-            topic.set_plot_line(plot_line)
+            plot_line.set_animated(True)
+            lod_line = library_lod.LodLine(plot_line)
+            self._lod_lines.append(lod_line)
+            topic.set_plot_line(lod_line)
 
         leg = self._ax.legend(fancybox=True, framealpha=0.5)
         leg.get_frame().set_linewidth(0.0)
+        leg.set_animated(True)
+        self._legend = leg
+
+    @property
+    def _animated_artists(self) -> list:
+        artists = [
+            lod_line.plot_line
+            for lod_line in self._lod_lines
+            if lod_line.plot_line.axes is not None
+        ]
+        if self._legend is not None:
+            # The legend covers the lines
+            artists.append(self._legend)
+        return artists
+
+    def _on_draw(self, event) -> None:
+        """
+        A full draw: Cache the background and add the animated artists.
+        This is also called by 'savefig()' which then renders the lines too.
+        """
+        canvas = self._fig.canvas
+        if canvas.supports_blit:
+            self._background = canvas.copy_from_bbox(self._fig.bbox)
+        for artist in self._animated_artists:
+            artist.draw(event.renderer)
+
+    def blit_lines(self) -> None:
+        """
+        Redraw the plot lines only: Their data changed.
+        """
+        canvas = self._fig.canvas
+        if not self._background_is_valid():
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        for artist in self._animated_artists:
+            self._fig.draw_artist(artist)
+        canvas.blit(self._fig.bbox)
+
+    def _background_is_valid(self) -> bool:
+        """
+        False if the figure has not been drawn or has been resized since.
+        'savefig()' with another dpi also replaces the background.
+        """
+        if self._background is None:
+            return False
+        x0, y0, x1, y1 = self._background.get_extents()
+        bbox = self._fig.bbox
+        return (x1 - x0, y1 - y0) == (int(bbox.width), int(bbox.height))
+
+    def _on_xlim_changed(self, _ax) -> None:
+        self.update_level_of_detail()
+
+    def update_level_of_detail(self) -> bool:
+        """
+        Recalculate the envelopes for the current view.
+        Return True if plot lines have changed.
+        """
+        changed = False
+        for lod_line in self._lod_lines:
+            if lod_line.update_view():
+                changed = True
+        return changed
 
     def clear_figure(self):
+        self._lod_lines = []
+        self._legend = None
+        self._background = None
         # for legend in self.__fig.legends:
         #     legend.remove()
         for line in self._fig.lines:
@@ -115,74 +404,35 @@ class PlotContext:
             self.clear_figure()
             self.initialize_plot_lines()
 
-        label_stepsize = set()
-
-        for topic in self.list_selected_topics:
-            stage = self._stage
-            if self._presentation.requires_stage:
-                stage = topic.find_stage(stage)
-                if stage is None:
-                    topic.remove_line()
-                    logger.warning(f"No stage stored for topic {topic.color_topic}")
-                    continue
-                if stage is not None:
-                    label_stepsize.add(stage.label)
-            try:
-                topic.recalculate_data(presentation=self._presentation, stage=stage)
-            except (
-                library_topic.Stage100msNotFoundException,
-                library_topic.FrequencyNotFound,
-            ) as exc:
-                logger.error(f"SKIPPED: Topic {topic.topic}: {exc}")
+        list_xy, x_label = calculate_xy(
+            topics=self.list_selected_topics,
+            presentation=self._presentation,
+            stage=self._stage,
+            func_summary_replaced=self._on_summary_replaced,
+        )
+        for topic, xy in list_xy:
+            if xy is None:
+                topic.remove_line()
                 continue
-
-        x_label = self._presentation.x_label
-        if len(label_stepsize) > 0:
-            x_label += "  "
-            x_label += ", ".join(sorted(label_stepsize))
-        plt.xlabel(x_label)
-        plt.ylabel(self._presentation.title)
-
-        for ax in self._fig.get_axes():
-            ax.relim()
-            ax.autoscale()
-            plt.grid(
-                True,
-                which="major",
-                axis="both",
-                linestyle="-",
-                color="gray",
-                linewidth=0.5,
-            )
-            plt.grid(
-                True,
-                which="minor",
-                axis="both",
-                linestyle="-",
-                color="silver",
-                linewidth=0.1,
-            )
-            if self._presentation.logarithmic_scales:
-                ax.xaxis.set_major_locator(
-                    matplotlib.ticker.LogLocator(base=10.0, numticks=20)
-                )
-                ax.yaxis.set_major_locator(
-                    matplotlib.ticker.LogLocator(base=10.0, numticks=20)
-                )
-                # Uncomment to modify figure
-                # self.__fig.set_size_inches(13.0, 7.0)
-                # ax.set_xlim(1e-3, 1e4)
-                # ax.set_ylim(1e-9, 1e-5)
-                if self._plot_config.func_matplotlib_ax is not None:
-                    if self._presentation.tag != library_topic.PRESENTATION_STEPSIZE:
-                        self._plot_config.func_matplotlib_ax(ax=ax)
+            topic.set_plot_data(*xy)
 
         # The following line will take up to 5s. Why?
         # self.__fig.canvas.draw()
 
-        if self._presentation.logarithmic_scales:
-            if self._plot_config.func_matplotlib_fig is not None:
-                self._plot_config.func_matplotlib_fig(fig=self._fig)
+        style_presentation(
+            fig=self._fig,
+            ax=self._ax,
+            tag=self._presentation.tag,
+            x_label=x_label,
+            y_label=self._presentation.title,
+            logarithmic_scales=self._presentation.logarithmic_scales,
+            plot_config=self._plot_config,
+        )
+
+    def _on_summary_replaced(self) -> None:
+        # The refresh worker is reloading the summary just now:
+        # Invalidating immediately would fail again till the refresh is applied.
+        self._invalidate_after_refresh = True
 
     @property
     def list_selected_topics(self) -> list:
@@ -190,20 +440,113 @@ class PlotContext:
             return self.plot_data.list_topics
         return [topic for topic in self.plot_data.list_topics if self._topic == topic]
 
-    def animate(self):
-        if self.plot_data.directories_changed():
+    def poll_loading(self) -> bool:
+        """
+        Merge the topics loaded in the background.
+        Return True if topics have been merged.
+        """
+        if not self.plot_data.loading:
+            return False
+        if self.plot_data.load_data_poll():
+            self.invalidate()
+            return True
+        return False
+
+    def update_presentation_if_invalid(self) -> bool:
+        """
+        Return True if the plot has been updated.
+        """
+        if not self._plot_is_invalid:
+            return False
+        self.update_presentation()
+        return True
+
+    def refresh_request(self) -> RefreshRequest | None:
+        """
+        Return None if nothing changed: No refresh required.
+        """
+        topics = tuple(self.list_selected_topics)
+        if not self.plot_data.file_watcher.changes_pending(
+            [topic.dir_raw for topic in topics]
+        ):
+            return None
+        return RefreshRequest(
+            plot_data=self.plot_data,
+            check_directories=not self.plot_data.loading,
+            topics=topics,
+            presentation=self._presentation,
+            stage=self._stage,
+            generation=self._generation,
+        )
+
+    @staticmethod
+    def refresh(request: RefreshRequest) -> RefreshResult:
+        """
+        Reload the changed summaries and calculate the plot data.
+        Neither the plot nor 'plot_data' are modified:
+        This may run in a worker thread.
+        """
+        assert isinstance(request, RefreshRequest)
+        file_watcher = request.plot_data.file_watcher
+        directories_changed = False
+        if request.check_directories:
+            directories_changed = file_watcher.directories_changed()
+        dir_raws_changed = file_watcher.pop_changed(
+            [topic.dir_raw for topic in request.topics]
+        )
+        updates = []
+        for topic in request.topics:
+            if topic.dir_raw not in dir_raws_changed:
+                continue
+            update = topic.calculate_if_changed(
+                presentation=request.presentation, stage=request.stage
+            )
+            if update is not None:
+                updates.append(update)
+        return RefreshResult(
+            generation=request.generation,
+            directories_changed=directories_changed,
+            updates=updates,
+        )
+
+    def apply_refresh(self, result: RefreshResult) -> bool:
+        """
+        Return True if plot lines have changed: The canvas has to be redrawn.
+        """
+        assert isinstance(result, RefreshResult)
+        if self._invalidate_after_refresh:
+            self._invalidate_after_refresh = False
+            self.invalidate()
+        if result.directories_changed and not self.plot_data.loading:
             logger.info("Directories changed: Reload all data!")
             self.invalidate()
-            self.plot_data.load_data(
+            self.plot_data.load_data_start(
                 plot_config=self._plot_config, presentations=self._presentations
             )
 
-        if self._plot_is_invalid:
-            self.update_presentation()
+        # The presentation, topic or stage changed while refreshing:
+        # Take over the summaries but redraw all plot lines.
+        current = result.generation == self._generation
+        if (not current) and (len(result.updates) > 0):
+            self.invalidate()
+
+        changed = False
+        for update in result.updates:
+            if update.topic.apply_update(update, set_data=current):
+                changed = True
+        return changed
+
+    def animate(self):
+        self.poll_loading()
+
+        if self.update_presentation_if_invalid():
+            self._fig.canvas.draw_idle()
             return
 
-        for topic in self.list_selected_topics:
-            topic.reload_if_changed(presentation=self._presentation, stage=self._stage)
+        request = self.refresh_request()
+        if request is not None:
+            if self.apply_refresh(self.refresh(request)):
+                self.blit_lines()
 
     def start_measurement(self, dir_raw):
         # The start button has been pressed
@@ -328,39 +671,53 @@ class PlotFile:
             write_files_directory = pathlib.Path(__file__).absolute().parent
         self.write_files_directory = write_files_directory
 
-    def plot_presentations(self):
+    def plot_presentations(self, renderer: library_render.Renderer | None = None):
         """
         Print all presentation (LSD, LS, PS, etc.)
+        renderer: Renders the figures. Default: A pool of 'library_render.JOBS_DEFAULT' processes.
         """
+        if renderer is None:
+            with library_render.Renderer() as renderer:
+                self.plot_presentations(renderer=renderer)
+            return
+
         for presentation in self._presentations.list:
             try:
-                self.plot_presentation(presentation=presentation)
+                figure = self.figure_presentation(presentation=presentation)
             except (
                 library_topic.Stage100msNotFoundException,
                 library_topic.FrequencyNotFound,
             ) as exc:
                 logger.error(f"Presentation {presentation.tag}: {exc}")
+                continue
+            for filename in figure.filenames:
+                logger.info(filename)
+            renderer.submit(figure)
 
-    def plot_presentation(self, presentation):
-        plot_context = PlotContext(
-            plot_data=self.plot_data,
-            plot_config=self._plot_config,
-            presentations=self._presentations,
+    def figure_presentation(self, presentation) -> PresentationFigure:
+        list_xy, x_label = calculate_xy(
+            topics=self.plot_data.list_topics, presentation=presentation, stage=None
         )
-        try:
-            if self.title:
-                plt.title(self.title)
-
-            plot_context.set_presentation(presentation=presentation)
-            plot_context.update_presentation()
-
-            for ext in self.write_files:
-                filename = (
-                    self.write_files_directory
-                    / f"result_{plot_context.presentation_tag}.{ext}"
+        return PresentationFigure(
+            tag=presentation.tag,
+            x_label=x_label,
+            y_label=presentation.title,
+            logarithmic_scales=presentation.logarithmic_scales,
+            plot_config=self._plot_config,
+            title=self.title,
+            lines=[
+                LineData(
+                    x=np.asarray(xy[0]),
+                    y=np.asarray(xy[1]),
+                    color=topic.color,
+                    label=topic.topic_basenoise(presentation),
                 )
-                logger.info(filename)
-                plot_context.savefig(filename=filename, dpi=300)
-
-        finally:
-            plot_context.close()
+                for topic, xy in list_xy
+                if xy is not None
+            ],
+            filenames=[
+                self.write_files_directory / f"result_{presentation.tag}.{ext}"
+                for ext in self.write_files
+            ],
+            dpi=300,
+        )
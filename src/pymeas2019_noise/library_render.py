@@ -0,0 +1,122 @@
+"""
+Render matplotlib figures into files, optionally in a process pool.
+
+A figure is described by plain data (numpy arrays, strings, the plot config)
+and implements 'render()'. The 'Topic' and 'LsdSummary' objects stay
+in the calling process.
+
+'render()' uses 'new_figure()': A figure with an Agg canvas, pyplot is
+not involved. This works in any process and thread, whatever backend
+the GUI selected.
+"""
+
+import concurrent.futures
+import os
+from collections.abc import Callable
+
+import matplotlib
+import matplotlib.figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+JOBS_DEFAULT = min(8, os.cpu_count() or 1)
+"""
+Rendering is CPU bound: One process per core.
+"""
+
+
+def new_figure(figsize: tuple[float, float] | None = None) -> matplotlib.figure.Figure:
+    """
+    figsize None: 'rcParams["figure.figsize"]' as 'plt.subplots()'.
+    """
+    fig = matplotlib.figure.Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _init_worker() -> None:
+    matplotlib.use("Agg")
+
+
+def _render(figure) -> None:
+    figure.render()
+
+
+class Renderer:
+    """
+    jobs == 1: 'submit()' renders in this process.
+    jobs > 1: 'submit()' returns immediately, the figures are rendered in
+      a pool of 'jobs' processes. The pool is started with the first figure.
+      'close()' waits till all figures are rendered.
+      The figures have to be picklable: The functions of the plot config
+      have to be module level functions.
+    """
+
+    def __init__(self, jobs: int | None = None):
+        """
+        jobs None: JOBS_DEFAULT
+        """
+        if jobs is None:
+            jobs = JOBS_DEFAULT
+        assert isinstance(jobs, int)
+        assert jobs >= 1
+        self.__jobs = jobs
+        self.__executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self.__futures: list[concurrent.futures.Future] = []
+        self.__callbacks: list[tuple[int, Callable[[], None]]] = []
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            # Do not hide the original exception
+            self.__shutdown()
+            return
+        self.close()
+
+    def submit(self, figure) -> None:
+        """
+        'figure.render()' writes the files.
+        """
+        if self.__jobs == 1:
+            figure.render()
+            return
+        if self.__executor is None:
+            self.__executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.__jobs, initializer=_init_worker
+            )
+        self.__futures.append(self.__executor.submit(_render, figure))
+
+    def after_rendered(self, func: Callable[[], None]) -> None:
+        """
+        Call 'func()' when the figures submitted so far are written.
+        Not called if one of these figures failed.
+        """
+        if len(self.__futures) == 0:
+            func()
+            return
+        self.__callbacks.append((len(self.__futures), func))
+
+    def close(self) -> None:
+        """
+        Wait till all figures are rendered.
+        Raise the exception of the first figure which failed.
+        """
+        try:
+            done = 0
+            for count, func in self.__callbacks:
+                for future in self.__futures[done:count]:
+                    future.result()
+                done = count
+                func()
+            for future in self.__futures[done:]:
+                future.result()
+        finally:
+            self.__shutdown()
+
+    def __shutdown(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+        self.__futures = []
+        self.__callbacks = []
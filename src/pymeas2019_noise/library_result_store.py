@@ -0,0 +1,187 @@
+"""
+Versioned, columnar result files: '.npz' bundles of numpy arrays.
+
+'densitystep_<stepname>_<stage>.npz'
+  The spectrum, the step size histogram and the samples of one stage.
+'result_summary.npz'
+  The LSD summary and the stages of a topic.
+
+Every bundle contains the columns 'format' and 'version'.
+No python objects are pickled: Loading does not depend on module paths.
+
+The bundles are not compressed: 'load(mmap_mode="r")' maps the columns
+into memory instead of reading them.
+
+>>> import tempfile
+>>> filename = pathlib.Path(tempfile.mkdtemp()) / "result_summary.npz"
+>>> values, offsets = pack([np.array([1.0, 2.0]), np.array([]), np.array([3.0])])
+>>> save(filename, kind=KIND_SUMMARY, columns={"values": values, "offsets": offsets})
+>>> columns = load(filename, kind=KIND_SUMMARY, mmap_mode="r")
+>>> [array.tolist() for array in unpack(columns["values"], columns["offsets"])]
+[[1.0, 2.0], [], [3.0]]
+>>> type(columns["values"]).__name__
+'memmap'
+"""
+
+import logging
+import os
+import pathlib
+import struct
+import time
+import zipfile
+
+import numpy as np
+
+logger = logging.getLogger("logger")
+
+FORMAT_VERSION = 1
+"""
+Increment if the columns change in an incompatible way.
+"""
+
+LOAD_ERRORS = (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile)
+"""
+Raised by 'load()' for a file which has been removed, is locked (Windows),
+is truncated or lacks a column.
+"""
+KIND_DENSITYSTEP = "densitystep"
+KIND_SUMMARY = "result_summary"
+
+_COLUMN_FORMAT = "format"
+_COLUMN_VERSION = "version"
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def save(filename: pathlib.Path, kind: str, columns: dict) -> None:
+    """
+    Write to a temporary file and rename it:
+    A reader will never see a partially written file.
+    """
+    assert isinstance(filename, pathlib.Path)
+    assert isinstance(kind, str)
+    assert isinstance(columns, dict)
+    assert _COLUMN_FORMAT not in columns
+    assert _COLUMN_VERSION not in columns
+
+    filename_tmp = filename.with_name(filename.name + ".tmp")
+    with filename_tmp.open("wb") as f:
+        np.savez(
+            f,
+            **{_COLUMN_FORMAT: kind, _COLUMN_VERSION: FORMAT_VERSION},
+            **columns,
+        )
+    retry = 0
+    while True:
+        try:
+            os.replace(filename_tmp, filename)
+            return
+        except PermissionError as e:
+            # Windows: The reader has the file open just now.
+            retry += 1
+            if retry >= 20:
+                raise
+            logger.debug(f"Renaming {filename_tmp}: {e}")
+            time.sleep(0.05)
+
+
+def load(
+    filename: pathlib.Path,
+    kind: str,
+    mmap_mode: str | None = None,
+    names: tuple[str, ...] | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    mmap_mode is None: Read the columns and close the file.
+    mmap_mode == 'r': Map the columns into memory.
+      Windows: The file may not be replaced as long as a column is referenced.
+    names: Only return these columns. The other columns are not read.
+    """
+    assert isinstance(filename, pathlib.Path)
+    assert isinstance(kind, str)
+    assert mmap_mode in (None, "r")
+    assert isinstance(names, tuple | None)
+
+    if mmap_mode is None:
+        with np.load(filename, allow_pickle=False) as npz:
+            if names is None:
+                names = tuple(npz.files)
+            columns = {
+                name: npz[name] for name in (_COLUMN_FORMAT, _COLUMN_VERSION, *names)
+            }
+    else:
+        columns = _load_mmap(filename)
+        if names is not None:
+            columns = {
+                name: columns[name]
+                for name in (_COLUMN_FORMAT, _COLUMN_VERSION, *names)
+            }
+
+    _kind = str(columns.pop(_COLUMN_FORMAT, ""))
+    if _kind != kind:
+        raise Exception(f"{filename}: Expected format '{kind}' but got '{_kind}'!")
+    version = int(columns.pop(_COLUMN_VERSION))
+    if version > FORMAT_VERSION:
+        raise Exception(
+            f"{filename}: Format version {version} is not supported (max {FORMAT_VERSION}). Please update pymeas2019_noise!"
+        )
+    return columns
+
+
+def _load_mmap(filename: pathlib.Path) -> dict[str, np.ndarray]:
+    """
+    The '.npy' members of an uncompressed '.npz' are stored as is:
+    Find the offset of the data of every member and map it.
+    """
+    columns: dict[str, np.ndarray] = {}
+    with filename.open("rb") as f, zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception(f"{filename}: '{info.filename}' is compressed!")
+            f.seek(info.header_offset)
+            signature, len_filename, len_extra = _ZIP_LOCAL_HEADER.unpack(
+                f.read(_ZIP_LOCAL_HEADER.size)
+            )
+            assert signature == _ZIP_LOCAL_HEADER_SIGNATURE, filename
+            f.seek(len_filename + len_extra, os.SEEK_CUR)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            assert not dtype.hasobject, filename
+            name = info.filename.removesuffix(".npy")
+            if (len(shape) == 0) or (0 in shape):
+                # np.memmap does not support empty arrays: Read the few bytes.
+                columns[name] = np.fromfile(
+                    f, dtype=dtype, count=int(np.prod(shape))
+                ).reshape(shape)
+                continue
+            columns[name] = np.memmap(
+                filename,
+                dtype=dtype,
+                mode="r",
+                offset=f.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return columns
+
+
+def pack(arrays: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Store arrays of different length in one column.
+    Return (values, offsets): Array i is values[offsets[i]:offsets[i+1]].
+    """
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(array) for array in arrays])
+    if len(arrays) == 0:
+        return np.zeros(0), offsets
+    return np.concatenate(arrays), offsets
+
+
+def unpack(values: np.ndarray, offsets: np.ndarray) -> list[np.ndarray]:
+    offsets = offsets.tolist()
+    return [
+        values[begin:end] for begin, end in zip(offsets[:-1], offsets[1:], strict=True)
+    ]
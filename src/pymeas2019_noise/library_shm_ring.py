@@ -0,0 +1,202 @@
+"""
+A single-producer/single-consumer ring of samples in shared memory.
+
+The producer and the consumer may live in different processes.
+The samples are copied once: from the producer into the ring.
+The consumer processes views into the ring and then releases them.
+
+>>> ring = ShmRing.create(capacity=4, dtype=np.float64)
+>>> ring.put(np.array([1.0, 2.0, 3.0]))
+0.0
+>>> ring.get(max_samples=10)
+array([1., 2., 3.])
+>>> ring.release(2)
+>>> ring.put(np.array([4.0, 5.0]))
+0.0
+>>> ring.get(max_samples=10)
+array([3., 4.])
+>>> ring.release(2)
+>>> ring.put_EOF(exit_code=0)
+>>> ring.get(max_samples=10)
+array([5.])
+>>> ring.release(1)
+>>> ring.get(max_samples=10) is None
+True
+>>> ring.exit_code
+0
+>>> ring.close(unlink=True)
+"""
+
+import dataclasses
+import multiprocessing
+import multiprocessing.shared_memory
+import time
+
+import numpy as np
+
+_HEAD = 0
+_TAIL = 1
+_EOF = 2
+_EXIT_CODE = 3
+_COUNTERS = 4
+
+WAIT_TIMEOUT_S = 1.0
+"""
+The producer and the consumer check every 'WAIT_TIMEOUT_S' if the other side is still alive.
+"""
+
+
+@dataclasses.dataclass(slots=True)
+class ShmRingDescriptor:
+    """
+    Everything required to attach to the ring from another process.
+    """
+
+    name: str
+    capacity: int
+    dtype: str
+    condition: object
+
+
+class ShmRing:
+    """
+    'head' and 'tail' count the samples ever written and ever released.
+    They are only modified while holding 'condition':
+    This also orders the accesses to the samples between the processes.
+    """
+
+    def __init__(
+        self,
+        descriptor: ShmRingDescriptor,
+        shm: multiprocessing.shared_memory.SharedMemory,
+        create: bool,
+    ):
+        assert isinstance(descriptor, ShmRingDescriptor)
+        self.descriptor = descriptor
+        self.capacity = descriptor.capacity
+        dtype = np.dtype(descriptor.dtype)
+        size_counters = _COUNTERS * np.dtype(np.int64).itemsize
+        self.__shm = shm
+        self.__counters = np.ndarray(
+            (_COUNTERS,), dtype=np.int64, buffer=self.__shm.buf
+        )
+        self.__samples = np.ndarray(
+            (self.capacity,), dtype=dtype, buffer=self.__shm.buf, offset=size_counters
+        )
+        if create:
+            self.__counters[:] = 0
+        self.__condition = descriptor.condition
+
+    @classmethod
+    def create(cls, capacity: int, dtype) -> "ShmRing":
+        assert isinstance(capacity, int)
+        assert capacity > 0
+        dtype = np.dtype(dtype)
+        size = _COUNTERS * np.dtype(np.int64).itemsize + capacity * dtype.itemsize
+        shm = multiprocessing.shared_memory.SharedMemory(create=True, size=size)
+        descriptor = ShmRingDescriptor(
+            name=shm.name,
+            capacity=capacity,
+            dtype=dtype.str,
+            condition=multiprocessing.Condition(),
+        )
+        return cls(descriptor, shm=shm, create=True)
+
+    @classmethod
+    def attach(cls, descriptor: ShmRingDescriptor) -> "ShmRing":
+        shm = multiprocessing.shared_memory.SharedMemory(name=descriptor.name)
+        return cls(descriptor, shm=shm, create=False)
+
+    def close(self, unlink: bool) -> None:
+        # The views have to be released before the shared memory.
+        del self.__counters
+        del self.__samples
+        self.__shm.close()
+        if unlink:
+            self.__shm.unlink()
+
+    @property
+    def size(self) -> int:
+        """
+        Samples which have been written but not released.
+        """
+        with self.__condition:
+            return int(self.__counters[_HEAD] - self.__counters[_TAIL])
+
+    @property
+    def exit_code(self) -> int:
+        return int(self.__counters[_EXIT_CODE])
+
+    def put(self, array: np.ndarray, func_alive=None) -> float:
+        """
+        Copy 'array' into the ring.
+        Wait while the ring is full.
+        'func_alive()' returns False if the consumer stopped: Raise instead of waiting forever.
+        Return the time waited in seconds.
+        """
+        waited_s = 0.0
+        begin = 0
+        while begin < len(array):
+            with self.__condition:
+                head = int(self.__counters[_HEAD])
+                while head - int(self.__counters[_TAIL]) == self.capacity:
+                    start_s = time.perf_counter()
+                    if not self.__condition.wait(timeout=WAIT_TIMEOUT_S):
+                        self.__raise_if_dead(func_alive, "consumer")
+                    waited_s += time.perf_counter() - start_s
+                free = self.capacity - (head - int(self.__counters[_TAIL]))
+            # Only the producer writes to the free part of the ring.
+            position = head % self.capacity
+            samples = min(len(array) - begin, free, self.capacity - position)
+            self.__samples[position : position + samples] = array[
+                begin : begin + samples
+            ]
+            begin += samples
+            with self.__condition:
+                self.__counters[_HEAD] = head + samples
+                self.__condition.notify_all()
+        return waited_s
+
+    def put_EOF(self, exit_code: int, func_alive=None) -> None:
+        # A consumer which died while holding the lock never releases it.
+        while not self.__condition.acquire(timeout=WAIT_TIMEOUT_S):
+            self.__raise_if_dead(func_alive, "consumer")
+        try:
+            self.__counters[_EXIT_CODE] = exit_code
+            self.__counters[_EOF] = 1
+            self.__condition.notify_all()
+        finally:
+            self.__condition.release()
+
+    @staticmethod
+    def __raise_if_dead(func_alive, side: str) -> None:
+        if func_alive is None:
+            return
+        if not func_alive():
+            raise Exception(f"ShmRing: The {side} stopped!")
+
+    def get(self, max_samples: int, func_alive=None) -> np.ndarray | None:
+        """
+        Wait for samples.
+        Return a view of up to 'max_samples' or None if EOF.
+        The view is valid till 'release()'.
+        'func_alive()' returns False if the producer stopped: Raise instead of waiting forever.
+        """
+        with self.__condition:
+            while True:
+                tail = int(self.__counters[_TAIL])
+                available = int(self.__counters[_HEAD]) - tail
+                if available > 0:
+                    break
+                if self.__counters[_EOF]:
+                    return None
+                if not self.__condition.wait(timeout=WAIT_TIMEOUT_S):
+                    self.__raise_if_dead(func_alive, "producer")
+        position = tail % self.capacity
+        samples = min(available, max_samples, self.capacity - position)
+        return self.__samples[position : position + samples]
+
+    def release(self, samples: int) -> None:
+        with self.__condition:
+            self.__counters[_TAIL] += samples
+            self.__condition.notify_all()
@@ -1,15 +1,25 @@
+import collections.abc
+import concurrent.futures
+import copy
+import ctypes
+import ctypes.util
+import dataclasses
+import fnmatch
 import logging
 import math
+import os
 import pathlib
 import pickle
 import re
+import struct
 import sys
+import threading
 import time
 import types
 
 import numpy as np
 
-from . import library_plot_config
+from . import library_plot_config, library_result_store
 
 logger = logging.getLogger("logger")
 
@@ -24,6 +34,13 @@ class FrequencyNotFound(Exception):
     pass
 
 
+class SummaryReplacedException(Exception):
+    """
+    'result_summary.npz' has been replaced since the summary was loaded:
+    The stage columns are not available till the summary is reloaded.
+    """
+
+
 class ResultAttributes:
     RESULT_DIR_PATTERN = "raw-*"
     REG_DIR = re.compile(r"^raw-(?P<color>.+?)-(?P<topic>.+)$")
@@ -57,6 +74,13 @@ class ResultAttributes:
 
 
 class PickleResultSummary:
+    """
+    The LSD summary and the stages of a topic: 'result_summary.npz'.
+    Previous versions pickled this class to 'result_summary.pickle'.
+    """
+
+    STAGE_COLUMNS_RAGGED = ("stepsize_bins_V", "stepsize_bins_count", "samples_V")
+
     def __init__(self, f, d, enbw, dict_stages):
         self.f = f
         self.d = d
@@ -79,64 +103,191 @@ class PickleResultSummary:
     def filename(cls, directory):
         assert isinstance(directory, pathlib.Path)
 
+        return directory / "result_summary.npz"
+
+    @classmethod
+    def filename_legacy(cls, directory):
+        assert isinstance(directory, pathlib.Path)
+
         return directory / "result_summary.pickle"
 
     @classmethod
     def save(cls, directory, f, d, enbw, dict_stages):  # pylint: disable=too-many-arguments
         assert isinstance(directory, pathlib.Path)
 
-        prs = PickleResultSummary(f, d, enbw, dict_stages)
-        filename_summary_pickle = cls.filename(directory)
-        with open(filename_summary_pickle, "wb") as fout:
-            pickle.dump(prs, fout)
+        stages = list(dict_stages.values())
+        columns = {
+            "f": np.array(f, dtype=float),
+            "d": np.array(d, dtype=float),
+            "enbw": np.array(enbw, dtype=float),
+            "stage": np.array([s["stage"] for s in stages], dtype=np.int64),
+            "dt_s": np.array([s["dt_s"] for s in stages], dtype=float),
+        }
+        for name in cls.STAGE_COLUMNS_RAGGED:
+            values, offsets = library_result_store.pack(
+                [np.asarray(s[name]) for s in stages]
+            )
+            columns[name] = values
+            columns[name + "_offsets"] = offsets
+        library_result_store.save(
+            cls.filename(directory),
+            kind=library_result_store.KIND_SUMMARY,
+            columns=columns,
+        )
 
     @classmethod
-    def load(cls, directory):
+    def load(cls, directory, mmap_mode: str | None = None):
+        """
+        mmap_mode: See 'library_result_store.load()'.
+        """
         assert isinstance(directory, pathlib.Path)
 
-        filename_summary_pickle = cls.filename(directory)
-        prs = None
-        if filename_summary_pickle.exists():
-            with filename_summary_pickle.open("rb") as fin:
-                # For compatibility with the old source structure
-                # May be remove when old pickle files have gone.
-                sys.modules["library_topic"] = sys.modules[
-                    "pymeas2019_noise.library_topic"
-                ]
-                try:
-                    prs = pickle.load(fin)
-                except pickle.UnpicklingError as e:
-                    logger.error(
-                        f"ERROR Unpicking f{filename_summary_pickle.name}: {e}"
-                    )
-                    logger.exception(e)
-            assert isinstance(prs, PickleResultSummary)
-        if prs is None:
+        filename_summary = cls.filename(directory)
+        if filename_summary.exists():
+            prs = cls._load(filename_summary, mmap_mode=mmap_mode)
+        elif cls.filename_legacy(directory).exists():
+            filename_summary = cls.filename_legacy(directory)
+            prs = cls._load_legacy(filename_summary)
+        else:
             # The summary file has not been calculated yet.
             prs = PickleResultSummary(f=[], d=[], enbw=[], dict_stages={})
 
         prs.x_directory = directory
-        prs.x_filename = filename_summary_pickle
+        prs.x_filename = filename_summary
+        return prs
+
+    @classmethod
+    def _load(cls, filename_summary, mmap_mode):
+        # Before loading: A file replaced meanwhile is detected by the loader.
+        stamp = StageColumnsLoader.stamp(filename_summary)
+        columns = library_result_store.load(
+            filename_summary,
+            kind=library_result_store.KIND_SUMMARY,
+            mmap_mode=mmap_mode,
+            names=("f", "d", "enbw", "stage", "dt_s"),
+        )
+        loader = StageColumnsLoader(filename_summary, mmap_mode=mmap_mode, stamp=stamp)
+        dict_stages = {
+            stage: LazyDictStage(stage=stage, dt_s=dt_s, loader=loader)
+            for stage, dt_s in zip(
+                columns["stage"].tolist(), columns["dt_s"].tolist(), strict=True
+            )
+        }
+        # 'f', 'd' and 'enbw' are short: Lists as in previous versions.
+        return PickleResultSummary(
+            f=columns["f"].tolist(),
+            d=columns["d"].tolist(),
+            enbw=columns["enbw"].tolist(),
+            dict_stages=dict_stages,
+        )
+
+    @classmethod
+    def _load_legacy(cls, filename_summary_pickle):
+        prs = None
+        with filename_summary_pickle.open("rb") as fin:
+            # For compatibility with the old source structure
+            # May be remove when old pickle files have gone.
+            sys.modules["library_topic"] = sys.modules["pymeas2019_noise.library_topic"]
+            try:
+                prs = pickle.load(fin)
+            except pickle.UnpicklingError as e:
+                logger.error(f"ERROR Unpicking f{filename_summary_pickle.name}: {e}")
+                logger.exception(e)
+        assert isinstance(prs, PickleResultSummary)
         try:
             prs.dict_stages  # noqa: B018
         except AttributeError:
             prs.dict_stages = {}
-
         return prs
 
-    def reload_if_changed(self):
+    def load_if_changed(self) -> "PickleResultSummary | None":
+        """
+        Return the reloaded summary if the densitysteps have changed.
+        'self' is not modified: This may run in a worker thread.
+        """
         from . import run_1_condense
 
         changed = run_1_condense.reload_if_changed(dir_raw=self.x_directory)
-        if changed:
-            # File has changed
-            prs = PickleResultSummary.load(self.x_directory)
-            self.f = prs.f
-            self.d = prs.d
-            self.enbw = prs.enbw
-            self.dict_stages = prs.dict_stages
+        if not changed:
+            return None
+        return PickleResultSummary.load(self.x_directory)
 
-        return changed
+
+class StageColumnsLoader:
+    """
+    Reads the 'PickleResultSummary.STAGE_COLUMNS_RAGGED' of 'result_summary.npz'
+    on first access: Most presentations do not need them.
+    'stamp' identifies the file the summary was loaded from: If the file has
+    been replaced meanwhile, the columns would not match the summary.
+    """
+
+    def __init__(
+        self, filename: pathlib.Path, mmap_mode: str | None, stamp: tuple[int, int, int]
+    ):
+        assert isinstance(filename, pathlib.Path)
+        self.__filename = filename
+        self.__mmap_mode = mmap_mode
+        self.__stamp = stamp
+        self.__stages: dict[int, dict[str, np.ndarray]] | None = None
+
+    @staticmethod
+    def stamp(filename: pathlib.Path) -> tuple[int, int, int]:
+        stat = filename.stat()
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, stage: int, name: str) -> np.ndarray:
+        if self.__stages is None:
+            self.__stages = self.__load()
+        if stage not in self.__stages:
+            raise Exception(f"{self.__filename}: Stage {stage} not found!")
+        return self.__stages[stage][name]
+
+    def __load(self) -> dict[int, dict[str, np.ndarray]]:
+        names = PickleResultSummary.STAGE_COLUMNS_RAGGED
+        columns = library_result_store.load(
+            self.__filename,
+            kind=library_result_store.KIND_SUMMARY,
+            mmap_mode=self.__mmap_mode,
+            names=("stage", *names, *(name + "_offsets" for name in names)),
+        )
+        # After loading: The file is the same during the whole load.
+        if self.stamp(self.__filename) != self.__stamp:
+            raise SummaryReplacedException(
+                f"{self.__filename}: The file has been replaced since the summary was loaded."
+            )
+        ragged = {
+            name: library_result_store.unpack(columns[name], columns[name + "_offsets"])
+            for name in names
+        }
+        return {
+            stage: {name: ragged[name][i] for name in names}
+            for i, stage in enumerate(columns["stage"].tolist())
+        }
+
+
+class LazyDictStage(collections.abc.Mapping):
+    """
+    A 'dict_stage' of 'PickleResultSummary.dict_stages'.
+    'stage' and 'dt_s' are read with the summary, the other columns on first access.
+    """
+
+    def __init__(self, stage: int, dt_s: float, loader: StageColumnsLoader):
+        self.__items = {"stage": stage, "dt_s": dt_s}
+        self.__loader = loader
+
+    def __getitem__(self, key):
+        if key in self.__items:
+            return self.__items[key]
+        if key in PickleResultSummary.STAGE_COLUMNS_RAGGED:
+            return self.__loader.get(self.__items["stage"], key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.__items
+        yield from PickleResultSummary.STAGE_COLUMNS_RAGGED
+
+    def __len__(self) -> int:
+        return len(self.__items) + len(PickleResultSummary.STAGE_COLUMNS_RAGGED)
 
 
 class Stage:
@@ -144,13 +295,37 @@ class Stage:
     def __init__(self, topic, dict_stage):
         assert isinstance(topic, Topic)
         self.__topic = topic
+        self.__dict_stage = dict_stage
         self.stage = dict_stage["stage"]
         self.dt_s = dict_stage["dt_s"]
-        self.stepsize_bins_V = dict_stage["stepsize_bins_V"]
-        self.stepsize_bins_count = dict_stage["stepsize_bins_count"]
-        self.samples_V = dict_stage["samples_V"]
         assert isinstance(self.stage, int)
         assert isinstance(self.dt_s, float)
+        self.__time_s: np.ndarray | None = None
+
+    @property
+    def stepsize_bins_V(self):
+        return self.__dict_stage["stepsize_bins_V"]
+
+    @property
+    def stepsize_bins_count(self):
+        return self.__dict_stage["stepsize_bins_count"]
+
+    @property
+    def samples_V(self):
+        return self.__dict_stage["samples_V"]
+
+    @property
+    def time_s(self) -> np.ndarray:
+        """
+        The x axis of 'samples_V'.
+        Cached: A new 'Stage' is created when the summary is reloaded.
+        """
+        if self.__time_s is None:
+            samples = len(self.samples_V)
+            self.__time_s = np.linspace(
+                start=0.0, stop=self.dt_s * samples, num=samples
+            )
+        return self.__time_s
 
     @property
     def label(self):
@@ -234,6 +409,7 @@ class Topic:  # pylint: disable=too-many-public-methods
         assert isinstance(presentations, Presentations)
         self.__ra = ra
         self.__prs = prs
+        self.__stages: list[Stage] | None = None
         self.__plot_line = None
         self._plot_config = plot_config
         self._presentations = presentations
@@ -241,10 +417,23 @@ class Topic:  # pylint: disable=too-many-public-methods
         self.toggle = True
         self.is_basenoise = ra.topic.startswith(Topic.TAG_BASENOISE)
         self.basenoise = None
+        self.__minus_basenoise: tuple[tuple, TopicMinusBasenoise] | None = None
 
     @property
     def topic_minus_basenoise(self):
-        return TopicMinusBasenoise(self)
+        """
+        Cached till the summary of this topic or of the basenoise is reloaded
+        or another basenoise is assigned.
+        """
+        assert self.basenoise is not None
+        key = (self.__prs, self.basenoise.__prs)
+        if self.__minus_basenoise is not None:
+            _key, minus_basenoise = self.__minus_basenoise
+            if all(a is b for a, b in zip(_key, key, strict=True)):
+                return minus_basenoise
+        minus_basenoise = TopicMinusBasenoise(self)
+        self.__minus_basenoise = (key, minus_basenoise)
+        return minus_basenoise
 
     def get_as_dict(self):
         return dict(  # noqa: C408
@@ -274,23 +463,64 @@ class Topic:  # pylint: disable=too-many-public-methods
         assert self.basenoise is None
         self.basenoise = basenoise
 
-    def reload_if_changed(self, presentation, stage):
+    def calculate_if_changed(self, presentation, stage) -> "TopicUpdate | None":
+        """
+        Reload the summary and calculate the data of the plot line.
+        Return None if the summary did not change.
+        Neither the topic nor the plot line are modified:
+        This may run in a worker thread, see 'apply_update()'.
+        """
         assert isinstance(stage, None | Stage)
+        prs = self.__prs.load_if_changed()
+        if prs is None:
+            return None
+        update = TopicUpdate(topic=self, prs=prs)
+        topic = self.__with_prs(prs)
+        if presentation.requires_stage:
+            try:
+                stage = topic.find_stage(stage)
+            except Stage100msNotFoundException as exc:
+                logger.error(f"SKIPPED: Topic {self.topic}: {exc}")
+                return update
+            if stage is None:
+                return update
+        try:
+            x, y = presentation.get_xy(topic=topic, stage=stage)
+        except FrequencyNotFound as exc:
+            logger.error(f"SKIPPED: Topic {self.topic}: {exc}")
+            return update
+        assert len(x) == len(y)
+        update.xy = (x, y)
+        logger.debug(f'plot: reload changed data: "{self.__ra.topic}"')
+        return update
+
+    def __with_prs(self, prs) -> "Topic":
+        """
+        A copy of this topic with another summary.
+        """
+        topic = copy.copy(self)
+        topic.__prs = prs
+        topic.__stages = None
+        return topic
+
+    def apply_update(self, update: "TopicUpdate", set_data: bool = True) -> bool:
+        """
+        Take over the summary calculated by 'calculate_if_changed()'.
+        Return True if the plot line has been changed.
+        """
+        assert isinstance(update, TopicUpdate)
+        assert update.topic is self
+        self.__prs = update.prs
+        self.__stages = None
+        if not set_data or (update.xy is None):
+            return False
         if self.__plot_line is None:
             logger.warning(f"'self.__plot_line is None' for {self.topic}.")
             return False
+        self.__plot_line.set_data(*update.xy)
+        return True
 
-        # start = time.time()
-        changed = self.__prs.reload_if_changed()
-        if changed:
-            self.recalculate_data(presentation=presentation, stage=stage)
-            # logger.info(f'changed {time.time()-start:0.2f}s "{self.__ra.topic}"')
-            logger.debug(f'plot: reload changed data: "{self.__ra.topic}"')
-        return changed
-
-    def recalculate_data(self, presentation, stage):
-        x, y = presentation.get_xy(topic=self, stage=stage)
-        assert len(x) == len(y)
+    def set_plot_data(self, x, y):
         self.__plot_line.set_data(x, y)
 
     @classmethod
@@ -311,6 +541,9 @@ class Topic:  # pylint: disable=too-many-public-methods
     def topic(self) -> str:
         return self.__ra.topic
 
+    def sort_key(self) -> tuple[str, str]:
+        return self.topic.upper(), self.dir_raw.name
+
     @property
     def color_topic(self) -> str:
         return f"{self.color}-{self.topic}"
@@ -328,9 +561,17 @@ class Topic:  # pylint: disable=too-many-public-methods
 
     @property
     def stages(self) -> list:
-        l0 = [Stage(self, dict_stage) for dict_stage in self.__prs.dict_stages.values()]
-        l0.sort(key=lambda stage: stage.stage)
-        return l0
+        """
+        Cached till the summary is reloaded.
+        """
+        if self.__stages is None:
+            l0 = [
+                Stage(self, dict_stage)
+                for dict_stage in self.__prs.dict_stages.values()
+            ]
+            l0.sort(key=lambda stage: stage.stage)
+            self.__stages = l0
+        return self.__stages
 
     def find_stage(self, stage):
         stage_100ms = 0.09
@@ -369,11 +610,7 @@ class Topic:  # pylint: disable=too-many-public-methods
         assert isinstance(stage, Stage)
         # Why is the following line needed?
         # assert stage.belongs_to_topic(self)
-        # TODO(Hans): Cache this array
-        x = np.linspace(
-            start=0.0, stop=stage.dt_s * len(stage.samples_V), num=len(stage.samples_V)
-        )
-        return (x, stage.samples_V)
+        return (stage.time_s, stage.samples_V)
 
     @property
     def f(self):
@@ -484,49 +721,58 @@ class Topic:  # pylint: disable=too-many-public-methods
         return flickernoise_Vrms, flickernoise_minus_basenoise_Vrms, comment
 
 
+@dataclasses.dataclass(slots=True)
+class TopicUpdate:
+    """
+    Calculated by 'Topic.calculate_if_changed()' and applied by 'Topic.apply_update()'.
+    """
+
+    topic: Topic
+    prs: PickleResultSummary
+    xy: tuple[np.ndarray, np.ndarray] | None = None
+    """
+    None: The summary changed but there is nothing to plot.
+    """
+
+
 class ResizedArrays:
     """
     Given two curves (f/base_f and y/base_y).
     This class will find matching 'f' and remove all 'f' which are only in one of both curves.
     The resulting 'self.f', 'self.y', 'self.base_y' will have the same size.
+    Both 'f' and 'base_f' have to be sorted.
+
+    >>> r = ResizedArrays([1.0, 2.0, 3.0, 5.0], [2.0, 3.0, 4.0, 5.0], [10, 20, 30, 50], [2, 3, 4, 5])
+    >>> r.f.tolist(), r.y.tolist(), r.base_y.tolist()
+    ([2.0, 3.0, 5.0], [20.0, 30.0, 50.0], [2.0, 3.0, 5.0])
     """
 
+    TOLERANCE_HZ = 1e-12
+
     def __init__(self, f, base_f, d, base_d):
         assert isinstance(f, list | tuple)
         assert isinstance(base_f, list | tuple)
         assert isinstance(d, list | tuple)
         assert isinstance(base_d, list | tuple)
 
-        new_f = np.zeros(len(f), dtype=np.float32)
-        new_d = np.zeros(len(f), dtype=np.float32)
-        new_base_d = np.zeros(len(f), dtype=np.float32)
-
-        idx = 0
-        idx_base = 0
-        idx_out = 0
-        while True:
-            if idx >= len(f):
-                break
-            if idx_base >= len(base_f):
-                break
-            diff = f[idx] - base_f[idx_base]
-            if abs(diff) < 1e-12:
-                # Both are equal
-                new_f[idx_out] = f[idx]
-                new_d[idx_out] = d[idx]
-                new_base_d[idx_out] = base_d[idx_base]
-                idx += 1
-                idx_base += 1
-                idx_out += 1
-                continue
-            if diff < 0:
-                idx += 1
-                continue
-            idx_base += 1
+        f = np.asarray(f, dtype=float)
+        base_f = np.asarray(base_f, dtype=float)
+        # The first 'base_f' which may be equal to 'f'.
+        # Repeated frequencies are matched in pairs: Add the repetition.
+        repetition = np.arange(len(f)) - np.searchsorted(f, f, side="left")
+        idx_base = (
+            np.searchsorted(base_f, f - self.TOLERANCE_HZ, side="left") + repetition
+        )
+        matched = idx_base < len(base_f)
+        matched[matched] = (
+            np.abs(base_f[idx_base[matched]] - f[matched]) < self.TOLERANCE_HZ
+        )
+        idx = np.flatnonzero(matched)
+        idx_base = idx_base[matched]
 
-        self.f = new_f[:idx_out]
-        self.y = new_d[:idx_out]
-        self.base_y = new_base_d[:idx_out]
+        self.f = f[idx].astype(np.float32)
+        self.y = np.asarray(d, dtype=np.float32)[idx]
+        self.base_y = np.asarray(base_d, dtype=np.float32)[idx_base]
 
         assert len(self.f) == len(self.y)
         assert len(self.f) == len(self.base_y)
@@ -718,13 +964,341 @@ class StartupDuration:
         self.__on = False
 
 
+def read_directories(topdir: pathlib.Path) -> list[pathlib.Path]:
+    return [
+        dir_raw
+        for dir_raw in topdir.glob(ResultAttributes.RESULT_DIR_PATTERN)
+        if dir_raw.is_dir()
+    ]
+
+
+def is_densitystep(filename: str) -> bool:
+    """
+    False for temporary files and the files written by the condense.
+    """
+    from . import program_fir_plot
+
+    return program_fir_plot.FilenameDensityStepMatcher(filename).match
+
+
+class FileWatcher:
+    """
+    Watches 'topdir' for created or removed 'raw-*' directories
+    and the 'raw-*' directories for written densitysteps.
+
+    The subclasses collect the changes in '_poll()' or in callbacks:
+      '_topdir_changed': 'raw-*' directories may have been created or removed.
+      '_dir_raws_changed': Densitysteps in these directories may have been written.
+
+    'watch()' is called in the GUI thread, the other methods
+    may be called in a worker thread.
+    """
+
+    def __init__(self, topdir: pathlib.Path):
+        assert isinstance(topdir, pathlib.Path)
+        self.topdir = topdir
+        self._lock = threading.Lock()
+        self._dir_raws: set[pathlib.Path] = set()
+        self._topdir_changed = True
+        self._dir_raws_changed: set[pathlib.Path] = set()
+
+    def watch(self, list_directories: list[pathlib.Path]) -> None:
+        """
+        Watch these 'raw-*' directories.
+        New directories are reported as changed: The densitysteps may
+        have been written before the directory was watched.
+        """
+        dir_raws = set(list_directories)
+        with self._lock:
+            for dir_raw in self._dir_raws - dir_raws:
+                self._unwatch_dir_raw(dir_raw)
+                self._dir_raws_changed.discard(dir_raw)
+            for dir_raw in dir_raws - self._dir_raws:
+                self._watch_dir_raw(dir_raw)
+                self._dir_raws_changed.add(dir_raw)
+            self._dir_raws = dir_raws
+
+    def directories_changed(self) -> bool:
+        """
+        True if 'raw-*' directories have been created or removed
+        since 'watch()'.
+        """
+        with self._lock:
+            self._poll()
+            if not self._topdir_changed:
+                return False
+            dir_raws = self._dir_raws
+        if set(read_directories(self.topdir)) != dir_raws:
+            # Remains True till 'watch()' is called with the new directories.
+            return True
+        with self._lock:
+            if dir_raws is self._dir_raws:
+                self._topdir_changed = False
+        return False
+
+    def changes_pending(self, dir_raws) -> bool:
+        """
+        False if nothing changed: 'directories_changed()' and 'pop_changed()'
+        have nothing to report.
+        """
+        with self._lock:
+            self._poll()
+            if self._topdir_changed:
+                return True
+            return not self._dir_raws_changed.isdisjoint(dir_raws)
+
+    def pop_changed(self, dir_raws) -> set[pathlib.Path]:
+        """
+        Return the directories of 'dir_raws' with written densitysteps.
+        The changes of the other directories are kept till asked for.
+        """
+        with self._lock:
+            self._poll()
+            changed = self._dir_raws_changed.intersection(dir_raws)
+            self._dir_raws_changed -= changed
+        return changed
+
+    def close(self) -> None:
+        pass
+
+    def _poll(self) -> None:
+        """
+        Collect the changes. Called while holding '_lock'.
+        """
+
+    def _watch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        pass
+
+    def _unwatch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        pass
+
+
+class PollingFileWatcher(FileWatcher):
+    """
+    Fallback: Every poll lists the 'raw-*' directories and stats all densitysteps.
+    A change is reported if the directories or the (mtime, size) of a
+    densitystep differ from the previous poll.
+    """
+
+    def __init__(self, topdir: pathlib.Path):
+        super().__init__(topdir)
+        self.__directories: set[pathlib.Path] | None = None
+        self.__stats: dict[pathlib.Path, dict[str, tuple[int, int]]] = {}
+
+    def _poll(self) -> None:
+        directories = set(read_directories(self.topdir))
+        if directories != self.__directories:
+            self.__directories = directories
+            self._topdir_changed = True
+        for dir_raw in self._dir_raws:
+            stats = {}
+            try:
+                with os.scandir(dir_raw) as it:
+                    for entry in it:
+                        if is_densitystep(entry.name):
+                            stat = entry.stat()
+                            stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                # The directory has been removed
+                continue
+            if self.__stats.get(dir_raw) != stats:
+                self.__stats[dir_raw] = stats
+                self._dir_raws_changed.add(dir_raw)
+
+    def _unwatch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        self.__stats.pop(dir_raw, None)
+
+
+class InotifyFileWatcher(FileWatcher):
+    """
+    Linux: The kernel reports the changes. Nothing is done while idle.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    MASK_TOPDIR = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+    MASK_DIR_RAW = IN_CLOSE_WRITE | IN_MOVED_TO | IN_ONLYDIR
+    """
+    The densitysteps are written to a temporary file and renamed: IN_MOVED_TO.
+    """
+    EVENT = struct.Struct("iIII")
+    """
+    struct inotify_event: wd, mask, cookie, len. Followed by the name.
+    """
+
+    def __init__(self, topdir: pathlib.Path):
+        super().__init__(topdir)
+        self.__libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.__fd = self.__libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.__fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1(): {os.strerror(errno)}")
+        self.__wd_topdir = self.__add_watch(topdir, self.MASK_TOPDIR)
+        self.__wd_dir_raws: dict[int, pathlib.Path] = {}
+
+    def __add_watch(self, directory: pathlib.Path, mask: int) -> int:
+        wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(
+                errno, f"inotify_add_watch({directory}): {os.strerror(errno)}"
+            )
+        return wd
+
+    def close(self) -> None:
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def _watch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        try:
+            wd = self.__add_watch(dir_raw, self.MASK_DIR_RAW)
+        except FileNotFoundError:
+            # The directory has been removed in the meantime
+            return
+        self.__wd_dir_raws[wd] = dir_raw
+
+    def _unwatch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        for wd, _dir_raw in list(self.__wd_dir_raws.items()):
+            if _dir_raw == dir_raw:
+                del self.__wd_dir_raws[wd]
+                # Fails if the directory has been removed: Ignore.
+                self.__libc.inotify_rm_watch(self.__fd, wd)
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                buffer = os.read(self.__fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _cookie, length = self.EVENT.unpack_from(buffer, offset)
+                offset += self.EVENT.size
+                name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self.__event(wd, mask, name)
+
+    def __event(self, wd: int, mask: int, name: str) -> None:
+        if mask & self.IN_Q_OVERFLOW:
+            # Events have been lost
+            self._topdir_changed = True
+            self._dir_raws_changed.update(self._dir_raws)
+            return
+        if wd == self.__wd_topdir:
+            if mask & self.IN_ISDIR:
+                if fnmatch.fnmatch(name, ResultAttributes.RESULT_DIR_PATTERN):
+                    self._topdir_changed = True
+            return
+        dir_raw = self.__wd_dir_raws.get(wd)
+        if dir_raw is None:
+            # IN_IGNORED of a removed watch
+            return
+        if is_densitystep(name):
+            self._dir_raws_changed.add(dir_raw)
+
+
+def create_file_watcher(topdir: pathlib.Path) -> FileWatcher:
+    """
+    inotify on Linux, else polling.
+    """
+    if sys.platform == "linux":
+        try:
+            return InotifyFileWatcher(topdir)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify not available, polling instead: {e}")
+    return PollingFileWatcher(topdir)
+
+
+class TopicLoader:
+    """
+    Loads topics in a thread pool.
+    'poll()' returns the topics loaded so far: The caller merges them
+    in its thread. No other thread ever modifies a 'PlotDataMultipleDirectories'.
+    """
+
+    THREADS = 8
+
+    def __init__(
+        self,
+        list_directories: list[pathlib.Path],
+        plot_config: library_plot_config.PlotConfig,
+        presentations: "Presentations",
+        startup_duration: StartupDuration,
+    ):
+        self.count_total = len(list_directories)
+        self.count_loaded = 0
+        self._startup_duration = startup_duration
+        self.__futures: list[concurrent.futures.Future] = []
+        if self.count_total == 0:
+            return
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(TopicLoader.THREADS, self.count_total),
+            thread_name_prefix="TopicLoader",
+        )
+        self.__futures = [
+            executor.submit(self._load, dir_raw, plot_config, presentations)
+            for dir_raw in list_directories
+        ]
+        # The threads terminate when all topics are loaded: Do not wait for them.
+        executor.shutdown(wait=False)
+
+    @staticmethod
+    def _load(dir_raw, plot_config, presentations) -> tuple[Topic, float]:
+        start_s = time.time()
+        topic = Topic.load(
+            dir_raw=dir_raw, plot_config=plot_config, presentations=presentations
+        )
+        return topic, time.time() - start_s
+
+    @property
+    def done(self) -> bool:
+        return self.count_loaded == self.count_total
+
+    def wait(self) -> None:
+        concurrent.futures.wait(self.__futures)
+
+    def poll(self) -> list[Topic]:
+        """
+        Return the topics loaded since the last call.
+        Raises the exception of a failed 'Topic.load()'.
+        """
+        list_topics = []
+        futures_pending = []
+        for future in self.__futures:
+            if not future.done():
+                futures_pending.append(future)
+                continue
+            topic, duration_s = future.result()
+            self._startup_duration.log(
+                f"Topic.load('{topic.dir_raw.name}'): {duration_s:0.3f}s"
+            )
+            list_topics.append(topic)
+        self.__futures = futures_pending
+        self.count_loaded += len(list_topics)
+        return list_topics
+
+
 class PlotDataMultipleDirectories:
     def __init__(
         self,
         topdir: pathlib.Path,
         plot_config: library_plot_config.PlotConfig,
         presentations: Presentations,
+        wait: bool = True,
+        file_watcher: FileWatcher | None = None,
     ):
+        """
+        wait=False: The topics are loaded in the background, see 'load_data_poll()'.
+        file_watcher: Reports the changes, see 'create_file_watcher()'.
+          Default: Polling.
+        """
         assert isinstance(topdir, pathlib.Path)
         assert isinstance(plot_config, library_plot_config.PlotConfig)
         assert isinstance(presentations, Presentations)
@@ -734,40 +1308,79 @@ class PlotDataMultipleDirectories:
         self.topdir = topdir
         self.topic_basenoise: Topic | None = None
         self.list_topics: list[Topic] = []
-        self.load_data(plot_config=plot_config, presentations=presentations)
-        self.startup_duration.log("After load_data()")
+        self.list_directories: list[pathlib.Path] = []
+        self.loader: TopicLoader | None = None
+        if file_watcher is None:
+            file_watcher = PollingFileWatcher(topdir)
+        self.file_watcher = file_watcher
+        if wait:
+            self.load_data(plot_config=plot_config, presentations=presentations)
+            self.startup_duration.log("After load_data()")
+        else:
+            self.load_data_start(plot_config=plot_config, presentations=presentations)
 
     def load_data(
         self, plot_config: library_plot_config.PlotConfig, presentations: Presentations
     ):
+        loader = self.load_data_start(
+            plot_config=plot_config, presentations=presentations
+        )
+        loader.wait()
+        self.load_data_poll()
+
+    def load_data_start(
+        self, plot_config: library_plot_config.PlotConfig, presentations: Presentations
+    ) -> TopicLoader:
+        """
+        Start loading the new directories in the background.
+        The topics of the remaining directories are kept.
+        """
+        assert self.loader is None
         self.topic_basenoise = None
 
         list_directories = self.read_directories()
-        self.set_directories = {d.name for d in list_directories}
+        self.list_directories = list_directories
+        self.file_watcher.watch(list_directories)
 
         for topic in self.list_topics:
             topic.basenoise = None
 
-        list_topics_tmp = self.list_topics
+        dict_topics = {topic.dir_raw: topic for topic in self.list_topics}
+        self.list_topics = [
+            dict_topics[dir_raw]
+            for dir_raw in list_directories
+            if dir_raw in dict_topics
+        ]
+        self.list_topics.sort(key=Topic.sort_key)
 
-        def topic_exists(dir_raw):
-            for topic in list_topics_tmp:
-                if topic.dir_raw == dir_raw:
-                    return topic
-            return None
+        self.loader = TopicLoader(
+            list_directories=[
+                dir_raw for dir_raw in list_directories if dir_raw not in dict_topics
+            ],
+            plot_config=plot_config,
+            presentations=presentations,
+            startup_duration=self.startup_duration,
+        )
+        return self.loader
 
-        self.list_topics = []
-        for dir_raw in list_directories:
-            topic = topic_exists(dir_raw)
-            if topic is None:
-                topic = Topic.load(
-                    dir_raw=dir_raw,
-                    plot_config=plot_config,
-                    presentations=presentations,
-                )
-            self.list_topics.append(topic)
+    @property
+    def loading(self) -> bool:
+        return self.loader is not None
 
-        self.list_topics.sort(key=lambda topic: topic.topic.upper())
+    def load_data_poll(self) -> bool:
+        """
+        Merge the topics loaded so far.
+        Return True if new topics have been merged.
+        When all topics are loaded, the basenoise is assigned.
+        """
+        if self.loader is None:
+            return False
+        list_topics = self.loader.poll()
+        self.list_topics.extend(list_topics)
+        self.list_topics.sort(key=Topic.sort_key)
+        if not self.loader.done:
+            return len(list_topics) > 0
+        self.loader = None
 
         # Find topic with basenoise
         for topic in self.list_topics:
@@ -784,21 +1397,27 @@ class PlotDataMultipleDirectories:
             for topic in self.list_topics:
                 if not topic.is_basenoise:
                     topic.set_basenoise(self.topic_basenoise)
+        return True
 
     def read_directories(self):
-        list_directories = []
-        for dir_raw in self.topdir.glob(ResultAttributes.RESULT_DIR_PATTERN):
-            if not dir_raw.is_dir():
-                continue
-            list_directories.append(dir_raw)
-        return list_directories
+        return read_directories(self.topdir)
 
     def directories_changed(self):
-        set_directories_new = {d.name for d in self.read_directories()}
-        return self.set_directories != set_directories_new
+        return self.file_watcher.directories_changed()
+
+    def set_file_watcher(self, file_watcher: FileWatcher) -> None:
+        """
+        Replace the file watcher: The GUI may provide its own.
+        """
+        assert isinstance(file_watcher, FileWatcher)
+        self.file_watcher.close()
+        self.file_watcher = file_watcher
+        self.file_watcher.watch(self.list_directories)
 
 
 class PlotDataSingleDirectory:
+    loading = False
+
     def __init__(self, dir_raw, plot_config: library_plot_config.PlotConfig):
         assert isinstance(dir_raw, pathlib.Path)
 
@@ -1,12 +1,21 @@
 #
 # Make sure that the subrepos are included in the python path
 #
+import functools
 import logging
 import pathlib
 
 import numpy as np
 
-from . import library_plot, library_topic, program_fir_plot
+from . import (
+    library_jobs,
+    library_manifest,
+    library_plot,
+    library_render,
+    library_result_store,
+    library_topic,
+    program_fir_plot,
+)
 
 logger = logging.getLogger("logger")
 
@@ -43,26 +52,76 @@ def create_or_empty_directory(dir_raw: pathlib.Path):
     delete_directory_contents(dir_raw)
 
 
+DENSITY_POINTS_CACHES_MAX = 16
+
+
+@functools.lru_cache(maxsize=DENSITY_POINTS_CACHES_MAX)
+def _density_points_cache(dir_raw: pathlib.Path) -> program_fir_plot.DensityPointsCache:
+    """
+    One cache per 'dir_raw': 'reload_if_changed()' only loads the changed densitystep files.
+    Only the caches of the recently used directories are kept.
+    """
+    return program_fir_plot.DensityPointsCache()
+
+
 def reload_if_changed(dir_raw, plot_config):
-    if program_fir_plot.DensityPlot.file_changed(dir_input=dir_raw):
-        try:
-            list_density = program_fir_plot.DensityPlot.plots_from_directory(
-                dir_input=dir_raw, skip=True
-            )
-        except EOFError:
-            # File "c:\Projekte\ETH-Fir\pymeas2019_noise\program_fir.py", line 321, in __init__
-            # data = pickle.load(f)
-            # EOFError: Ran out of input
+    cache = _density_points_cache(dir_raw)
+    if cache.empty:
+        # Nothing loaded yet: Compare with 'result_summary.npz'.
+        if not program_fir_plot.DensityPlot.file_changed(dir_input=dir_raw):
             return False
-        lsd_summary = program_fir_plot.LsdSummary(
-            plot_config=plot_config,
-            list_density=list_density,
-            directory=dir_raw,
-            trace=False,
+    try:
+        changed = cache.update(dir_input=dir_raw, skip=True)
+    except library_result_store.LOAD_ERRORS as e:
+        # The measurement just replaces or removes a file: Retry next time.
+        logger.debug(f"{dir_raw}: {e!r}")
+        return False
+    if not changed:
+        return False
+    lsd_summary = program_fir_plot.LsdSummary(
+        plot_config=plot_config,
+        list_density=cache.list_density,
+        directory=dir_raw,
+        trace=False,
+        cache=cache,
+    )
+    lsd_summary.write_result_summary()
+    return True
+
+
+def migrate_dir_raw(dir_raw: pathlib.Path) -> int:
+    """
+    Convert the '.pickle' files written by previous versions to '.npz'.
+    The '.pickle' files are removed after the conversion.
+    Return the number of converted files.
+    """
+    assert isinstance(dir_raw, pathlib.Path)
+
+    count = 0
+    for filename in program_fir_plot.DensityPlot.files_from_directory(
+        dir_input=dir_raw, skip=False
+    ):
+        if not program_fir_plot.FilenameDensityStepMatcher(filename.name).legacy:
+            continue
+        data = program_fir_plot.DensityPlot.read(filename)
+        filename_npz = filename.with_suffix(
+            program_fir_plot.FilenameDensityStepMatcher.SUFFIX
         )
-        lsd_summary.write_summary_pickle()
-        return True
-    return False
+        program_fir_plot.DensityPlot.write(filename_npz, data)
+        filename.unlink()
+        count += 1
+
+    # Written after the densitystep files: 'DensityPlot.file_changed()' returns False.
+    filename_legacy = library_topic.PickleResultSummary.filename_legacy(dir_raw)
+    if filename_legacy.exists():
+        prs = library_topic.PickleResultSummary.load(dir_raw)
+        if prs.x_filename == filename_legacy:
+            library_topic.PickleResultSummary.save(
+                dir_raw, prs.f, prs.d, prs.enbw, prs.dict_stages
+            )
+        filename_legacy.unlink()
+        count += 1
+    return count
 
 
 def iter_dir_raw(dir_measurement):
@@ -74,7 +133,7 @@ def iter_dir_raw(dir_measurement):
         yield dir_raw
 
 
-def run_condense(dir_measurement, plot_config, skip_on_error=False):
+def run_condense(dir_measurement, plot_config, skip_on_error=False, force=False):
     # if False:
     #   import cProfile
     #   cProfile.run('program.run_condense_0to1()', sort='tottime')
@@ -84,26 +143,75 @@ def run_condense(dir_measurement, plot_config, skip_on_error=False):
     # dir_result = dir_measurement / DIRECTORY_RESULT
     # if not dir_result.exists():
     #   dir_result.mkdir()
-    for dir_raw in iter_dir_raw(dir_measurement):
-        try:
-            run_condense_dir_raw(dir_raw, plot_config=plot_config)
-        except library_topic.FrequencyNotFound as e:
-            if skip_on_error:
-                logger.warning(f"SKIPPED: {e}")
-                continue
-            raise
+    # The figures of a directory are rendered while the next directory is condensed.
+    with library_render.Renderer() as renderer:
+        skipped = library_jobs.map_dir_raw(
+            func=functools.partial(
+                run_condense_dir_raw,
+                plot_config=plot_config,
+                renderer=renderer,
+                force=force,
+            ),
+            dir_raws=list(iter_dir_raw(dir_measurement)),
+            jobs=1,
+            directory_logger=dir_measurement,
+            logger_name="logger_condense",
+            skip_on_error=skip_on_error,
+        )
+    library_jobs.log_skipped(skipped)
+
+
+def run_condense_dir_raw(
+    dir_raw,
+    plot_config,
+    do_plot=True,
+    renderer: library_render.Renderer | None = None,
+    force=False,
+):
+    """
+    renderer: Renders the png files. The files are written when
+      'renderer.close()' returns.
+      Default: A pool of 'library_render.JOBS_DEFAULT' processes.
+    force: Condense even if the densitysteps did not change since the last time.
+    """
+    assert isinstance(dir_raw, pathlib.Path)
 
+    if renderer is None:
+        with library_render.Renderer() as renderer:
+            run_condense_dir_raw(
+                dir_raw=dir_raw,
+                plot_config=plot_config,
+                do_plot=do_plot,
+                renderer=renderer,
+                force=force,
+            )
+        return
 
-def run_condense_dir_raw(dir_raw, plot_config, do_plot=True):
-    assert isinstance(dir_raw, pathlib.Path)
+    manifest = library_manifest.Manifest(dir_raw)
+    stamp = manifest.stamp(
+        program_fir_plot.DensityPlot.files_from_directory(dir_input=dir_raw, skip=False)
+    )
+    fingerprint = library_manifest.fingerprint(plot_config, do_plot)
+    if not force:
+        if manifest.is_up_to_date(library_manifest.STEP_CONDENSE, stamp, fingerprint):
+            logger.info(f"{dir_raw.name}: densitysteps unchanged: condense SKIPPED")
+            return
 
     presentations = library_topic.get_presentations(plot_config=plot_config)
 
     run_condense_0to1(
-        dir_raw=dir_raw, plot_config=plot_config, do_plot=do_plot, trace=False
+        dir_raw=dir_raw,
+        plot_config=plot_config,
+        do_plot=do_plot,
+        trace=False,
+        renderer=renderer,
     )
     run_condense_0to1(
-        dir_raw=dir_raw, plot_config=plot_config, do_plot=do_plot, trace=True
+        dir_raw=dir_raw,
+        plot_config=plot_config,
+        do_plot=do_plot,
+        trace=True,
+        renderer=renderer,
     )
 
     plot_data = library_topic.PlotDataSingleDirectory(
@@ -120,7 +228,24 @@ def run_condense_dir_raw(dir_raw, plot_config, do_plot=True):
             presentations=presentations,
         )
 
-        plotFile.plot_presentations()
+        plotFile.plot_presentations(renderer=renderer)
+
+    renderer.after_rendered(
+        manifest.updater(
+            library_manifest.STEP_CONDENSE,
+            stamp,
+            fingerprint,
+            func_outputs=functools.partial(condense_outputs, dir_raw),
+        )
+    )
+
+
+def condense_outputs(dir_raw: pathlib.Path) -> list[pathlib.Path]:
+    return [
+        filename
+        for filename in dir_raw.glob("result_*")
+        if (filename.name != library_manifest.FILENAME) and (filename.suffix != ".tmp")
+    ]
 
 
 def write_presentation_summary_file(plot_data, directory):
@@ -132,7 +257,13 @@ def write_presentation_summary_file(plot_data, directory):
         SpecializedPrettyPrint(stream=f).pprint(dict_result)
 
 
-def run_condense_0to1(dir_raw, plot_config, trace=False, do_plot=True):
+def run_condense_0to1(
+    dir_raw,
+    plot_config,
+    trace=False,
+    do_plot=True,
+    renderer: library_render.Renderer | None = None,
+):
     assert isinstance(dir_raw, pathlib.Path)
 
     list_density = program_fir_plot.DensityPlot.plots_from_directory(
@@ -147,12 +278,16 @@ def run_condense_0to1(dir_raw, plot_config, trace=False, do_plot=True):
     )
     lsd_summary.write_summary_file(trace=trace)
     if not trace:
-        lsd_summary.write_summary_pickle()
+        lsd_summary.write_result_summary()
 
     if do_plot:
         file_tag = "_trace" if trace else ""
         title = dir_raw.parent.name
-        lsd_summary.plot(file_tag=file_tag, title=title)
+        figure = lsd_summary.figure(file_tag=file_tag, title=title)
+        if renderer is None:
+            figure.render()
+        else:
+            renderer.submit(figure)
 
 
 class SpecializedPrettyPrint:
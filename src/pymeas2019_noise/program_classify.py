@@ -7,15 +7,12 @@ class Classify:
     def __init__(
         self, series="E12", minimal=1e-12, maximal=1e2
     ):  # current, pA possible
-        self.eseries = program_eseries.eseries(
-            series=series, minimal=minimal, maximal=maximal, borders=True
+        self.eseries = program_eseries.eseries_table(
+            series=series, minimal=minimal, maximal=maximal
         )
-        # Take all right borders
-        borders = [x[2] for x in self.eseries]
-        # Take the rightmost border away
-        borders = borders[:-1]
-        self.__borders = np.array(borders, dtype=float)
-        self.V = [x[1] for x in self.eseries]
+        # Take all right borders but the rightmost
+        self.__borders = self.eseries.right[:-1]
+        self.V = self.eseries.center.tolist()
 
     @property
     def bin_count(self) -> int:
@@ -24,6 +21,13 @@ class Classify:
     def find_bin_index(self, value):
         return self.__borders.searchsorted(value)
 
+    def count_bins(self, values: np.ndarray) -> np.ndarray:
+        """
+        Return the count per bin of all 'values'.
+        """
+        idx = self.__borders.searchsorted(values)
+        return np.bincount(idx, minlength=self.bin_count)
+
     def bins_factory(self):
         return ClassifyBins(self)
 
@@ -38,6 +42,18 @@ class ClassifyBins:
         idx = self.__classify.find_bin_index(value)
         self.count[idx] += 1
 
+    def add_array(self, values: np.ndarray):
+        """
+        Same as calling 'add()' for every element of 'values'.
+
+        >>> classify = Classify()
+        >>> count = classify.bins_factory()
+        >>> count.add_array(np.array([1e-12, 1e-4, 1e-5, 1e2, 1e-4]))
+        >>> [(int(idx), int(count.count[idx])) for idx in np.flatnonzero(count.count)]
+        [(0, 1), (84, 1), (96, 2), (168, 1)]
+        """
+        self.count += self.__classify.count_bins(values).astype(self.count.dtype)
+
     @property
     def V(self):
         return self.__classify.V
@@ -60,22 +76,33 @@ def test():
     print(f"V={len(classify.V)}, count={len(count.count)}")
 
 
-# def test_timeit():
-#   classify = Classify()
-#   count = classify.bins_factory()
+def test_timeit():
+    """
+    Microbenchmark: 'add()' per element versus 'add_array()'.
+    A Density calculates the stepsizes of SAMPLES_DENSITY samples.
+    """
+    import timeit
+
+    classify = Classify()
+    stepsizes_V = np.abs(np.diff(np.random.default_rng(47).normal(size=2**12)))
+
+    count_add = classify.bins_factory()
+
+    def timeit_add():
+        for stepsize_V in stepsizes_V:
+            count_add.add(stepsize_V)
+
+    count_add_array = classify.bins_factory()
 
-#   def timeit_intersect():
-#     l = (
-#       (1e-12, 0),
-#       (1e-4, 61),
-#       (1e-5, 49),
-#       (1e2, 133)
-#     )
-#     for v, expected_idx in l:
-#       count.add(v)
+    def timeit_add_array():
+        count_add_array.add_array(stepsizes_V)
 
-#   import timeit
-#   print(timeit.timeit('timeit_intersect()', globals=globals(), number=100000))
+    number = 20
+    duration_add_s = timeit.timeit(timeit_add, number=number) / number
+    duration_add_array_s = timeit.timeit(timeit_add_array, number=number) / number
+    assert np.array_equal(count_add.count, count_add_array.count)
+    print(f"add():       {duration_add_s * 1e3:0.3f}ms")
+    print(f"add_array(): {duration_add_array_s * 1e3:0.3f}ms")
 
 
 def test_numpy_searchsorted():
@@ -111,4 +138,4 @@ if __name__ == "__main__":
         doctest.testmod()
 
     test()
-    # test_timeit()
+    test_timeit()
@@ -10,6 +10,21 @@ from . import library_topic
 
 ENABLE_IRRELEVANT_COMMANDS = False
 
+JobsOption = typing_extensions.Annotated[
+    int,
+    typer.Option(
+        min=1,
+        help="Number of directories 'raw-*' to be processed in parallel",
+    ),
+]
+
+ForceOption = typing_extensions.Annotated[
+    bool,
+    typer.Option(
+        help="Redo all directories, even if the inputs did not change since the last run, see 'result_manifest.json'",
+    ),
+]
+
 
 # 'typer' does not work correctly with typing.Annotated
 # Required is: typing_extensions.Annotated
@@ -104,10 +119,19 @@ def run0_measure_synthetic():
     name="run_1_condense",
     help="condense existing measurements",
 )
-def run1_condense():
+def run1_condense(
+    jobs: JobsOption = 1,
+    dir_raw: typing_extensions.Annotated[
+        str | None,
+        typer.Option(
+            help="Only condense this directory 'raw-*'. 'TOPONLY': Only the composite plots",
+        ),
+    ] = None,
+    force: ForceOption = False,
+):
     from . import run_1_condense
 
-    run_1_condense.main()
+    run_1_condense.main(jobs=jobs, dir_raw=dir_raw, force=force)
 
 
 if ENABLE_IRRELEVANT_COMMANDS:
@@ -123,20 +147,30 @@ if ENABLE_IRRELEVANT_COMMANDS:
     name="run_1_process_raw",
     help="TODO: Add correct help text",
 )
-def run1_process_raw():
+def run1_process_raw(jobs: JobsOption = 1, force: ForceOption = False):
     from . import run_1_process_raw
 
-    run_1_process_raw.main()
+    run_1_process_raw.main(jobs=jobs, force=force)
+
+
+@app.command(
+    name="run_1_migrate",
+    help="Convert the '.pickle' result files written by previous versions to '.npz'",
+)
+def run1_migrate():
+    from . import run_1_migrate
+
+    run_1_migrate.main()
 
 
 @app.command(
     name="run_2_composite_plots",
     help="TODO: Add correct help text",
 )
-def run2_composite_plots():
+def run2_composite_plots(force: ForceOption = False):
     from . import run_2_composite_plots
 
-    run_2_composite_plots.main(dir_measurement=pathlib.Path.cwd())
+    run_2_composite_plots.main(dir_measurement=pathlib.Path.cwd(), force=force)
 
 
 if __name__ == "__main__":
@@ -25,6 +25,32 @@ class SamplingProcessConfig(LockingMixinMock):
     skalierungsfaktor: float = 1.0
     input_Vp: float = 1.0
     duration_s: float = TO_BE_SET  # type: ignore[assignment]
+    decimation_cascade: bool = True
+    """
+    True: program_fir.DecimationCascade drives all stages in one pass.
+    False: The stages are polled using 'push(None)'.
+    """
+    density_save_interval_s: float = 1.0
+    """
+    A 'densitystep_*.npz' is written at most every 'density_save_interval_s'.
+    The files are written in a background thread.
+    """
+    pipeline: bool = False
+    """
+    True: The stages are calculated in a separate process, see program_fir_pipeline.
+    """
+    cascade_split_stages: int = 0
+    """
+    0: All stages are calculated in one thread.
+    K > 0: The first K stages (Density 0, FIR 0, Density 1, ...) are calculated
+    in the calling thread, the remaining stages in a worker thread,
+    see program_fir.CascadeBoundary.
+    The first stages handle almost all samples: A small K balances the load.
+    """
+    pipeline_ring_s: float = 10.0
+    """
+    pipeline: The shared memory between the processes holds this duration of samples.
+    """
 
     def validate(self):
         assert isinstance(self.fir_count, int)
@@ -39,6 +65,14 @@ class SamplingProcessConfig(LockingMixinMock):
         assert isinstance(self.skalierungsfaktor, float)
         assert isinstance(self.input_Vp, float)
         assert isinstance(self.duration_s, float)
+        assert isinstance(self.decimation_cascade, bool)
+        assert isinstance(self.density_save_interval_s, float)
+        assert isinstance(self.pipeline, bool)
+        assert isinstance(self.pipeline_ring_s, float)
+        assert isinstance(self.cascade_split_stages, int)
+        if self.cascade_split_stages > 0:
+            assert self.decimation_cascade
+            assert self.cascade_split_stages < 2 * self.fir_count - 1
 
         self._freeze()
 
@@ -63,6 +97,10 @@ class ConfigStep(LockingMixinMock):
     duration_s: float = TO_BE_SET  # type: ignore[assignment]
     dt_s: float = TO_BE_SET  # type: ignore[assignment]
     skip: bool = False
+    pipeline: bool = False
+    """
+    See SamplingProcessConfig.pipeline
+    """
 
     @property
     def input_Vp(self) -> float:
@@ -90,6 +128,7 @@ class ConfigStep(LockingMixinMock):
         assert isinstance(self.duration_s, float)
         assert isinstance(self.dt_s, float)
         assert isinstance(self.skip, bool)
+        assert isinstance(self.pipeline, bool)
 
         self._freeze()
 
@@ -105,6 +144,7 @@ class ConfigStep(LockingMixinMock):
         c.skalierungsfaktor = self.skalierungsfaktor
         c.input_Vp = self.input_Vp
         c.duration_s = self.duration_s
+        c.pipeline = self.pipeline
 
         return c
 
@@ -219,12 +259,18 @@ class ConfigSetup(LockingMixin):  # pylint: disable=too-few-public-methods
             process_config = configstep.process_config
             process_config.validate()
             sample_process = program_fir.SamplingProcess(process_config, dir_raw)
-            ad_low_noise_float_2023.acquire(
-                configstep=configstep,
-                stream_output=sample_process.output,
-                filename_capture_raw=filename_capture_raw,
-                filelock_measurement=_lock,
-            )
+            try:
+                ad_low_noise_float_2023.acquire(
+                    configstep=configstep,
+                    stream_output=sample_process.output,
+                    filename_capture_raw=filename_capture_raw,
+                    filelock_measurement=_lock,
+                )
+            except BaseException:
+                # 'measure()' calls 'os._exit()': The pipeline processes have to be stopped now.
+                sample_process.abort()
+                raise
+            sample_process.close()
             ad_low_noise_float_2023.close()
 
             if _lock.requested_stop_soft():
@@ -1,3 +1,5 @@
+import dataclasses
+import functools
 import math
 
 import numpy as np
@@ -408,5 +410,45 @@ def eseries(series="E12", minimal=0.01, maximal=300, borders=False):
     raise Exception("Internal programming error")
 
 
+@dataclasses.dataclass(frozen=True)
+class ESeriesTable:
+    """
+    The borders of 'eseries(borders=True)' as read-only arrays.
+    """
+
+    left: np.ndarray
+    center: np.ndarray
+    right: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.center)
+
+
+@functools.cache
+def eseries_table(series="E12", minimal=0.01, maximal=300) -> ESeriesTable:
+    """
+    Same as 'eseries(borders=True)' but calculated only once per arguments.
+    The table is shared by all callers: The arrays are read-only.
+
+    >>> table = eseries_table(series="E6", minimal=1, maximal=10)
+    >>> table.center.tolist()
+    [1.0, 1.5, 2.2, 3.3, 4.7, 6.8, 10.0]
+    >>> table is eseries_table(series="E6", minimal=1, maximal=10)
+    True
+    >>> table.center[0] = 0.0
+    Traceback (most recent call last):
+    ...
+    ValueError: assignment destination is read-only
+    """
+    borders = np.array(
+        eseries(series=series, minimal=minimal, maximal=maximal, borders=True),
+        dtype=float,
+    )
+    left, center, right = (np.ascontiguousarray(column) for column in borders.T)
+    for array in (left, center, right):
+        array.setflags(write=False)
+    return ESeriesTable(left=left, center=center, right=right)
+
+
 if __name__ == "__main__":
     print(eseries(series="E6", minimal=1, maximal=10, borders=True))
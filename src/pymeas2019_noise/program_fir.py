@@ -1,12 +1,24 @@
+import collections
+import heapq
 import logging
 import math
 import pathlib
 import sys
+import threading
+import time
 
 import numpy as np
+import scipy.fft
 import scipy.signal
 
-from . import program_classify, program_configsetup, program_fir_plot, program_settle
+from . import (
+    library_fifo,
+    program_classify,
+    program_configsetup,
+    program_fir_pipeline,
+    program_fir_plot,
+    program_settle,
+)
 from .library_filelock import ExitCode
 
 logger = logging.getLogger("logger")
@@ -26,6 +38,14 @@ NUMPY_FLOAT_TYPE = np.float64  # Bei 5V Referenz Messung gibt es mit nur float 3
 
 classify_stepsize = program_classify.Classify()
 
+# True: The stages which get more than SAMPLES_DENSITY samples per push calculate
+# the periodogram for all overlapping segments of the push.
+# False: Only the first segment of a push is used.
+DENSITY_BATCHED = True
+DENSITY_BATCH_SEGMENTS = 64  # Segments per 'scipy.fft.rfft()' call: Limits the memory
+PERIODOGRAM_WINDOW = scipy.signal.get_window("hamming", SAMPLES_DENSITY)
+PERIODOGRAM_WINDOW_SQUARE_SUM = float(np.sum(PERIODOGRAM_WINDOW**2))
+
 #   <---------------- INPUT ---------========------->
 #
 #  |<-- LEFT -->|<--====- SELECT -====-->|<- RIGHT ->|
@@ -37,6 +57,22 @@ SAMPLES_LEFT_RIGHT = SAMPLES_LEFT + SAMPLES_RIGHT
 assert SAMPLES_LEFT % DECIMATE_FACTOR == 0
 assert SAMPLES_RIGHT % DECIMATE_FACTOR == 0
 
+# The anti alias filter as designed by 'scipy.signal.decimate(ftype="fir")'
+DECIMATE_FIR_TAPS = scipy.signal.firwin(
+    2 * 10 * DECIMATE_FACTOR + 1, 1.0 / DECIMATE_FACTOR, window="hamming"
+)
+DECIMATE_FIR_HISTORY = len(DECIMATE_FIR_TAPS) - 1
+assert DECIMATE_FIR_HISTORY <= SAMPLES_LEFT
+# True: Stream the data through the filter: SAMPLES_RIGHT is not required anymore.
+# False: Call 'scipy.signal.decimate()' on every block of 'previous_fir_samples_input'.
+DECIMATE_STREAMING = True
+# True: Compare every streamed block against 'scipy.signal.decimate()'.
+DECIMATE_CROSSCHECK = False
+DECIMATE_CROSSCHECK_RTOL = 1e-9
+# CascadeBoundary: The calling thread waits if the worker thread lags behind by this many arrays.
+CASCADE_BOUNDARY_ARRAYS_MAX = 16
+CASCADE_BOUNDARY_WAIT_S = 1.0
+
 
 class PushCalculator:
     """
@@ -71,6 +107,37 @@ class PushCalculator:
         return push_size
 
 
+def periodogram_sum(array, dt_s):
+    """
+    Sums up the periodogram of all complete segments of 'array'.
+    The segments have SAMPLES_DENSITY samples and a step of
+    SAMPLES_DENSITY // PERIODOGRAM_OVERLAP samples.
+    The segments are calculated batched, the result is the same as:
+      scipy.signal.periodogram(segment, 1 / dt_s, window="hamming", detrend="linear")
+
+    Return: frequencies, Pxx_sum, count of segments
+    """
+    assert len(array) >= SAMPLES_DENSITY
+    step = SAMPLES_DENSITY // PERIODOGRAM_OVERLAP
+    segments = np.lib.stride_tricks.sliding_window_view(array, SAMPLES_DENSITY)[::step]
+
+    Pxx_sum = np.zeros(SAMPLES_DENSITY // 2 + 1, dtype=np.float64)
+    for i in range(0, len(segments), DENSITY_BATCH_SEGMENTS):
+        batch = scipy.signal.detrend(
+            segments[i : i + DENSITY_BATCH_SEGMENTS], type="linear", axis=-1
+        )
+        batch *= PERIODOGRAM_WINDOW
+        spectrum = scipy.fft.rfft(batch, axis=-1)
+        Pxx_sum += np.sum(spectrum.real**2 + spectrum.imag**2, axis=0)
+
+    # Scaling 'density' and 'onesided' as in 'scipy.signal.periodogram()'
+    fs = 1.0 / dt_s
+    Pxx_sum /= fs * PERIODOGRAM_WINDOW_SQUARE_SUM
+    Pxx_sum[1:-1] *= 2.0
+    frequencies = scipy.fft.rfftfreq(SAMPLES_DENSITY, 1.0 / fs)
+    return frequencies, Pxx_sum, len(segments)
+
+
 class FIR:  # pylint: disable=too-many-instance-attributes
     """
     Stream-Sink: Implements a Stream-Interface
@@ -80,7 +147,7 @@ class FIR:  # pylint: disable=too-many-instance-attributes
     def __init__(self, out):
         self.out = out
         self.prev = None
-        self.array = None
+        self.fifo = None
         self.statistics_count = None
         self.statistics_samples_out = None
         self.statistics_samples_in = None
@@ -88,6 +155,7 @@ class FIR:  # pylint: disable=too-many-instance-attributes
         self.__dt_s = None
         self.TAG_PUSH = None
         self.pushcalulator_next = None
+        self.scheduler: StageScheduler | None = None
 
     def init(self, stage, dt_s, prev):
         self.prev = prev
@@ -99,6 +167,7 @@ class FIR:  # pylint: disable=too-many-instance-attributes
         self.TAG_PUSH = f"FIR {self.stage}"
         decimated_dt_s = dt_s * DECIMATE_FACTOR
         self.pushcalulator_next = PushCalculator(decimated_dt_s)
+        self.fifo = None
         logger.debug(
             f"stage {self.stage} push_size_samples {self.pushcalulator_next.push_size_samples} time_s {self.pushcalulator_next.dt_s * self.pushcalulator_next.push_size_samples}"
         )
@@ -114,8 +183,18 @@ class FIR:  # pylint: disable=too-many-instance-attributes
         assert isinstance(exit_code, ExitCode)
         self.out.put_EOF(exit_code)
 
+    def restart(self) -> None:
+        """
+        The following samples are not contiguous: Decimate the complete blocks
+        and drop the filter state. The next push fakes Left&Right again.
+        """
+        if self.ready():
+            self.calculate()
+        self.fifo = None
+        self.out.restart()
+
     def print_size(self, f):
-        array_len = -1 if self.array is None else len(self.array)
+        array_len = -1 if self.fifo is None else len(self.fifo)
         print(f"stage {self.stage} FIR: array_len: {array_len}")
 
         self.out.print_size(f)
@@ -129,51 +208,174 @@ class FIR:  # pylint: disable=too-many-instance-attributes
           Return: None
         """
         if array_in is None:
-            if self.array is None:
-                return self.out.push(None)
-            # array_in is None: We may decimate
-            if len(self.array) < self.pushcalulator_next.previous_fir_samples_input:
+            if not self.ready():
                 # Not sufficient data
                 # Give the next stage a chance to decimate!
                 return self.out.push(None)
 
-            array_decimate = self.decimate(
-                self.array[: self.pushcalulator_next.previous_fir_samples_input]
-            )
-            assert len(array_decimate) == self.pushcalulator_next.push_size_samples
-            self.statistics_samples_out += len(array_decimate)
-            self.out.push(array_decimate)
-            # Save the remainting part to 'self.array'
-            self.array = self.array[
-                self.pushcalulator_next.previous_fir_samples_select :
-            ]
-            assert len(self.array) >= SAMPLES_LEFT_RIGHT
+            self.calculate()
             return self.TAG_PUSH
 
         assert len(array_in) % self.pushcalulator_next.push_size_samples == 0
 
-        if self.array is None:
+        if self.fifo is None:
+            # A decimation consumes 'previous_fir_samples_select' and keeps
+            # SAMPLES_LEFT_RIGHT: Twice the input size is sufficient if we keep up.
+            self.fifo = library_fifo.Fifo(
+                capacity=2 * self.pushcalulator_next.previous_fir_samples_input,
+                dtype=NUMPY_FLOAT_TYPE,
+            )
             # The first time. Left&Right must be faked.
-            self.array = np.flip(array_in[:SAMPLES_LEFT_RIGHT])
+            self.fifo.push(np.flip(array_in[:SAMPLES_LEFT_RIGHT]))
 
         self.statistics_samples_in += len(array_in)
-        # Add to 'self.array'
-        self.array = np.append(self.array, array_in)
+        # Add to 'self.fifo'
+        self.fifo.push(array_in)
 
         if DEBUG_FIFO:
             if self.__dt_s >= 0.01:
                 logger.debug(
-                    f"stage {self.stage} decimate received push {len(array_in)} samples, total {len(self.array)} samples"
+                    f"stage {self.stage} decimate received push {len(array_in)} samples, total {len(self.fifo)} samples"
                 )
 
+        if self.scheduler is not None:
+            if self.ready():
+                self.scheduler.put(self)
         return None
 
-    def decimate(self, array_decimate):
-        self.statistics_count += 1
+    @property
+    def tag(self) -> str:
+        return self.TAG_PUSH
+
+    @property
+    def backlog_samples(self) -> int:
+        return 0 if self.fifo is None else len(self.fifo)
+
+    @property
+    def samples_input(self) -> int:
+        """
+        The number of samples in 'self.fifo' required to decimate one block.
+        """
+        samples_input = self.pushcalulator_next.previous_fir_samples_input
+        if DECIMATE_STREAMING:
+            samples_input -= SAMPLES_RIGHT
+        return samples_input
+
+    @property
+    def blocks_ready(self) -> int:
+        """
+        The number of blocks which may be decimated now.
+        """
+        if self.fifo is None:
+            return 0
+        samples_select = self.pushcalulator_next.previous_fir_samples_select
+        return max(0, (len(self.fifo) - self.samples_input) // samples_select + 1)
+
+    def ready(self) -> bool:
+        return self.blocks_ready > 0
+
+    def calculate(self) -> None:
+        """
+        Decimate all blocks in 'self.fifo' and push them to the next stage.
+        """
+        blocks = self.blocks_ready
+        assert blocks > 0
+        samples_select = self.pushcalulator_next.previous_fir_samples_select
+        push_size_samples = self.pushcalulator_next.push_size_samples
+
+        samples = self.samples_input + (blocks - 1) * samples_select
+        array_decimated = self.decimate(self.fifo.array[:samples], blocks=blocks)
+        assert len(array_decimated) == blocks * push_size_samples
+        self.statistics_samples_out += len(array_decimated)
+        for i in range(blocks):
+            self.out.push(
+                array_decimated[i * push_size_samples : (i + 1) * push_size_samples]
+            )
+        # Keep the remainting part in 'self.fifo'
+        self.fifo.drop(blocks * samples_select)
+        assert len(self.fifo) >= SAMPLES_LEFT
+
+    def decimate(self, array_decimate, blocks):
+        self.statistics_count += blocks
 
         if DEBUG_FIFO:
-            array_len = -1 if self.array is None else len(self.array)
-            logger.debug(f"decimate, stage {self.stage}, array_len: {array_len}")
+            array_len = -1 if self.fifo is None else len(self.fifo)
+            logger.debug(
+                f"decimate, stage {self.stage}, array_len: {array_len}, blocks: {blocks}"
+            )
+
+        samples_select = self.pushcalulator_next.previous_fir_samples_select
+        if not DECIMATE_STREAMING:
+            samples_input = self.samples_input
+            return np.concatenate(
+                [
+                    self.decimate_scipy(
+                        array_decimate[
+                            i * samples_select : i * samples_select + samples_input
+                        ]
+                    )
+                    for i in range(blocks)
+                ]
+            )
+
+        array_decimated = self.decimate_streaming(array_decimate, blocks=blocks)
+        if DECIMATE_CROSSCHECK:
+            push_size_samples = self.pushcalulator_next.push_size_samples
+            for i in range(blocks):
+                self.decimate_crosscheck(
+                    array_decimate[
+                        i * samples_select : SAMPLES_LEFT + (i + 1) * samples_select
+                    ],
+                    array_decimated[
+                        i * push_size_samples : (i + 1) * push_size_samples
+                    ],
+                )
+        return array_decimated
+
+    def decimate_streaming(self, array_decimate, blocks):
+        """
+        'array_decimate' is LEFT and 'blocks' times SELECT: RIGHT is not required.
+
+        The filter is causal: An output sample only depends on the
+        DECIMATE_FIR_HISTORY samples before it. These samples stay in 'self.fifo'
+        between the pushes and are the filter state.
+        Only every DECIMATE_FACTOR output sample is calculated (polyphase).
+        """
+        assert (
+            len(array_decimate)
+            == SAMPLES_LEFT
+            + blocks * self.pushcalulator_next.previous_fir_samples_select
+        )
+
+        # The first output sample is at index SAMPLES_LEFT,
+        # the last one at the second last sample.
+        array_filter = array_decimate[
+            SAMPLES_LEFT - DECIMATE_FIR_HISTORY : len(array_decimate) - 1
+        ]
+        array_decimated = scipy.signal.upfirdn(
+            DECIMATE_FIR_TAPS, array_filter, up=1, down=DECIMATE_FACTOR
+        )
+        # Skip the output samples which lack history
+        index_from = DECIMATE_FIR_HISTORY // DECIMATE_FACTOR
+        index_to = index_from + blocks * self.pushcalulator_next.push_size_samples
+        return array_decimated[index_from:index_to]
+
+    def decimate_crosscheck(self, array_decimate, array_decimated):
+        array_expected = scipy.signal.decimate(
+            array_decimate, DECIMATE_FACTOR, ftype="fir", zero_phase=False
+        )
+        index_from = SAMPLES_LEFT // DECIMATE_FACTOR
+        array_expected = array_expected[index_from : index_from + len(array_decimated)]
+        atol = DECIMATE_CROSSCHECK_RTOL * np.max(np.abs(array_expected))
+        if not np.allclose(
+            array_decimated, array_expected, rtol=DECIMATE_CROSSCHECK_RTOL, atol=atol
+        ):
+            deviation = np.max(np.abs(array_decimated - array_expected))
+            raise Exception(
+                f"stage {self.stage}: Streaming decimation deviates by {deviation:0.3e} from scipy.signal.decimate()!"
+            )
+
+    def decimate_scipy(self, array_decimate):
         assert len(array_decimate) > SAMPLES_LEFT_RIGHT
         assert len(array_decimate) % DECIMATE_FACTOR == 0
 
@@ -206,13 +408,21 @@ class Density:  # pylint: disable=too-many-instance-attributes
     The class LsdSummary will the access self.Pxx_sum/self.Pxx_n to create a density plot.
     """
 
-    def __init__(self, out, config, directory):
+    def __init__(
+        self,
+        out,
+        config,
+        directory,
+        writer: "program_fir_plot.DensityPlotWriter | None" = None,
+    ):
         assert isinstance(directory, pathlib.Path)
+        assert isinstance(writer, program_fir_plot.DensityPlotWriter | None)
 
         self.out = out
         self.prev = None
         self.__config = config
         self.__directory = directory
+        self.__writer = writer
         self.__stepsize_bins = classify_stepsize.bins_factory()
 
         self.frequencies = None
@@ -225,7 +435,9 @@ class Density:  # pylint: disable=too-many-instance-attributes
         self.__pushcalulator = None
         self.__mode_fifo = None
         self.__fifo = None
+        self.__array_density = None
         self.__fifo_size_s = None
+        self.scheduler: StageScheduler | None = None
 
     def print_size(self, f):
         common = f"stage {self.__stage} Density: Pxx_n: {self.__Pxx_n}"
@@ -250,11 +462,14 @@ class Density:  # pylint: disable=too-many-instance-attributes
         if self.__mode_fifo:
             # In this stage, only a few samples will be pushed
             # We create a fifo
-            self.__fifo = np.empty(0, dtype=NUMPY_FLOAT_TYPE)
+            self.__fifo = library_fifo.Fifo(
+                capacity=2 * SAMPLES_DENSITY, dtype=NUMPY_FLOAT_TYPE
+            )
         else:
             # In this stage, we will get sufficient samples for every push
             # There is no need to allocate a fifo-array.
             self.__fifo = None
+            self.__array_density = None
 
             self.__fifo_size_s = SAMPLES_DENSITY * self.__dt_s
 
@@ -267,6 +482,18 @@ class Density:  # pylint: disable=too-many-instance-attributes
         assert isinstance(exit_code, ExitCode)
         self.out.put_EOF(exit_code)
 
+    def restart(self) -> None:
+        """
+        The following samples are not contiguous: Calculate the complete
+        densities and drop the remaining samples.
+        'Pxx_sum' and 'Pxx_n' are kept: The averaging continues.
+        """
+        if self.ready():
+            self.calculate()
+        if self.__mode_fifo:
+            self.__fifo.drop(len(self.__fifo))
+        self.out.restart()
+
     @property
     def fifo_size_s(self) -> float:
         if self.__fifo_size_s:
@@ -315,23 +542,10 @@ class Density:  # pylint: disable=too-many-instance-attributes
           Return: None
         """
         if array_in is None:
-            if self.__fifo is None:
+            if not self.ready():
                 return self.out.push(None)
 
-            if len(self.__fifo) < SAMPLES_DENSITY:
-                return self.out.push(None)
-
-            # Time is over. Calculate density
-            self.density(self.__fifo)
-            if self.__mode_fifo:
-                len_before = len(self.__fifo)
-                self.__fifo = self.__fifo[self.__pushcalulator.push_size_samples :]
-                if DEBUG_FIFO:
-                    logger.debug(
-                        f"stage {self.__stage} density squash fifo from  {len_before} to {len(self.__fifo)} samples"
-                    )
-            else:
-                self.__fifo = None
+            self.calculate()
             return self.__TAG_PUSH
 
         assert array_in is not None
@@ -346,7 +560,7 @@ class Density:  # pylint: disable=too-many-instance-attributes
                 samples_flipped = self.calculate_samples_flipped()
                 assert samples_flipped < len(array_in)
                 array_tmp = array_in[samples_flipped:]
-            self.__fifo = np.append(self.__fifo, array_tmp)
+            self.__fifo.push(array_tmp)
 
             if DEBUG_FIFO:
                 if self.__dt_s >= 0.01:
@@ -355,22 +569,72 @@ class Density:  # pylint: disable=too-many-instance-attributes
                     )
 
             if self.do_preview():
-                self.density_preview(self.__fifo)
+                self.density_preview(self.__fifo.array)
+        else:
+            assert len(array_in) >= SAMPLES_DENSITY
+            if DENSITY_BATCHED:
+                self.__array_density = array_in
+            else:
+                self.__array_density = array_in[:SAMPLES_DENSITY]
+            # logger.debug(f"Density Stage {self.__stage:02d} dt_s {self.__dt_s:016.12f}, len(array_in)={len(array_in)}")
 
-            return None
+        if self.scheduler is not None:
+            if self.ready():
+                self.scheduler.put(self)
+        return None
 
-        assert len(array_in) >= SAMPLES_DENSITY
-        self.__fifo = array_in[:SAMPLES_DENSITY]
-        # logger.debug(f"Density Stage {self.__stage:02d} dt_s {self.__dt_s:016.12f}, len(array_in)={len(array_in)}")
+    @property
+    def tag(self) -> str:
+        return self.__TAG_PUSH
 
-        return None
+    @property
+    def backlog_samples(self) -> int:
+        if self.__mode_fifo:
+            return len(self.__fifo)
+        if self.__array_density is None:
+            return 0
+        return len(self.__array_density)
+
+    def ready(self) -> bool:
+        if self.__mode_fifo:
+            return len(self.__fifo) >= SAMPLES_DENSITY
+        return self.__array_density is not None
+
+    def calculate(self) -> None:
+        """
+        Time is over. Calculate density until the samples are consumed.
+        """
+        assert self.ready()
+        if not self.__mode_fifo:
+            self.density(self.__array_density)
+            self.__array_density = None
+            return
+
+        while len(self.__fifo) >= SAMPLES_DENSITY:
+            self.density(self.__fifo.array)
+            len_before = len(self.__fifo)
+            self.__fifo.drop(self.__pushcalulator.push_size_samples)
+            if DEBUG_FIFO:
+                logger.debug(
+                    f"stage {self.__stage} density squash fifo from  {len_before} to {len(self.__fifo)} samples"
+                )
 
     def density(self, array):
         # logger.debug(f"Density Stage {self.__stage:02d} dt_s {self.__dt_s:016.12f}, len(array)={len(array)} calculation")
 
-        self.frequencies, Pxx = scipy.signal.periodogram(
-            array[:SAMPLES_DENSITY], 1 / self.__dt_s, window="hamming", detrend="linear"
-        )  # Hz, V^2/Hz
+        if DENSITY_BATCHED and not self.__mode_fifo:
+            # 'array' is the complete push
+            self.frequencies, Pxx, Pxx_n = periodogram_sum(array, self.__dt_s)
+            # The statistics and samples as without batching
+            array = array[:SAMPLES_DENSITY]
+        else:
+            self.frequencies, Pxx = scipy.signal.periodogram(
+                array[:SAMPLES_DENSITY],
+                1 / self.__dt_s,
+                window="hamming",
+                detrend="linear",
+            )  # Hz, V^2/Hz
+            Pxx_n = 1
 
         # Averaging
         assert len(self.__Pxx_sum) == len(Pxx)
@@ -379,11 +643,10 @@ class Density:  # pylint: disable=too-many-instance-attributes
                 # logger.warning(f"Stage {self.__stage}: Expected {Pxx.dtype} but got {self.__Pxx_sum.dtype}.")
                 pass
         self.__Pxx_sum += Pxx
-        self.__Pxx_n += 1
+        self.__Pxx_n += Pxx_n
         # Stepsize statistics
         stepsizes_V = np.abs(np.diff(array))
-        for stepsize_V in stepsizes_V:
-            self.__stepsize_bins.add(stepsize_V)
+        self.__stepsize_bins.add_array(stepsizes_V)
 
         bins_total_count = np.sum(self.__stepsize_bins.count)
         stepsize_bins_count = self.__stepsize_bins.count / (
@@ -401,6 +664,7 @@ class Density:  # pylint: disable=too-many-instance-attributes
             stepsize_bins_count=stepsize_bins_count,
             stepsize_bins_V=self.__stepsize_bins.V,
             samples_V=array,
+            writer=self.__writer,
         )
 
     def density_preview(self, array):
@@ -419,6 +683,7 @@ class Density:  # pylint: disable=too-many-instance-attributes
             stepsize_bins_count=self.__stepsize_bins.count,
             stepsize_bins_V=self.__stepsize_bins.V,
             samples_V=array,
+            writer=self.__writer,
         )
 
 
@@ -444,6 +709,9 @@ class OutTrash:
     def put_EOF(self, exit_code: ExitCode) -> None:
         pass
 
+    def restart(self) -> None:
+        pass
+
     def print_size(self, f):
         pass
 
@@ -458,6 +726,269 @@ class OutTrash:
         return ""
 
 
+class StageScheduler:
+    """
+    A stage puts itself into the ready-queue as soon as it has sufficient
+    samples to calculate. 'run()' calculates only these stages, the lowest first.
+    A calculation may make the following stages ready: They will be calculated
+    in the same 'run()'.
+    """
+
+    def __init__(self, stages: list):
+        self.__stages = stages
+        self.__priorities = {id(stage): i for i, stage in enumerate(stages)}
+        self.__ready: list[int] = []
+        self.calculations = 0
+        for stage in stages:
+            stage.scheduler = self
+
+    def put(self, stage) -> None:
+        priority = self.__priorities[id(stage)]
+        if priority not in self.__ready:
+            heapq.heappush(self.__ready, priority)
+
+    def run(self) -> int:
+        """
+        Return the number of calculations.
+        """
+        calculations = 0
+        while len(self.__ready) > 0:
+            stage = self.__stages[heapq.heappop(self.__ready)]
+            if stage.ready():
+                stage.calculate()
+                calculations += 1
+        self.calculations += calculations
+        return calculations
+
+    @property
+    def backlog(self) -> list[tuple[str, int]]:
+        """
+        Return the samples waiting in every stage: [(tag, samples), ...]
+        """
+        return [(stage.tag, stage.backlog_samples) for stage in self.__stages]
+
+
+class CascadeBoundary:
+    """
+    Stream-Sink: Implements a Stream-Interface
+    Stream-Source: Drives a output of Stream-Interface
+
+    The stages before the boundary are calculated in the calling thread,
+    the stages after the boundary in a worker thread.
+    The arrays are passed in a single-producer/single-consumer deque:
+    'append()' and 'popleft()' do not require a lock.
+    The deque is bounded by CASCADE_BOUNDARY_ARRAYS_MAX: If it is full,
+    'push()' waits till the worker thread took an array.
+    """
+
+    def __init__(self, out, stages: list["Density | FIR"]):
+        self.out = out
+        self.scheduler = StageScheduler(stages)
+        self.__arrays: collections.deque = collections.deque()
+        self.__event = threading.Event()
+        self.__event_space = threading.Event()
+        self.__closed = False
+        self.__stage = None
+        self.statistics_waited_s = 0.0
+        self.__thread: threading.Thread | None = None
+        self.__exception: BaseException | None = None
+
+    def init(self, stage, dt_s, prev):
+        # Transparent: 'Density.do_preview()' accesses 'prev.prev'.
+        self.out.init(stage=stage, dt_s=dt_s, prev=prev)
+        self.__stage = stage
+        self.__start()
+
+    def __start(self) -> None:
+        self.__closed = False
+        self.__thread = threading.Thread(
+            target=self.__worker, name=f"CascadeBoundary {self.__stage}", daemon=True
+        )
+        self.__thread.start()
+
+    def restart(self) -> None:
+        """
+        Wait till the worker thread calculated all arrays,
+        restart the following stages and start the worker thread again.
+        """
+        self.close()
+        self.out.restart()
+        self.__start()
+
+    def done(self):
+        self.close()
+        self.out.done()
+
+    def put_EOF(self, exit_code: ExitCode) -> None:
+        assert isinstance(exit_code, ExitCode)
+        self.close()
+        self.out.put_EOF(exit_code)
+
+    def print_size(self, f):
+        print(
+            f"CascadeBoundary: {len(self.__arrays)} arrays queued, waited {self.statistics_waited_s:0.3f}s",
+            file=f,
+        )
+
+    @property
+    def backlog(self) -> list[tuple[str, int]]:
+        return self.scheduler.backlog
+
+    def push(self, array_in):
+        """
+        if array_in is None:
+          Return: '' as the calculations are done by the worker thread.
+        if array_in is not None:
+          Return: None
+        """
+        if array_in is None:
+            return ""
+        self.__raise_exception()
+        self.__wait_for_space()
+        self.__arrays.append(array_in)
+        self.__event.set()
+        return None
+
+    def __wait_for_space(self) -> None:
+        if len(self.__arrays) < CASCADE_BOUNDARY_ARRAYS_MAX:
+            return
+        start_s = time.perf_counter()
+        while True:
+            self.__event_space.clear()
+            # The worker may have taken an array before 'clear()'
+            if len(self.__arrays) < CASCADE_BOUNDARY_ARRAYS_MAX:
+                break
+            self.__event_space.wait(timeout=CASCADE_BOUNDARY_WAIT_S)
+            self.__raise_exception()
+        self.statistics_waited_s += time.perf_counter() - start_s
+
+    def close(self) -> None:
+        """
+        Wait till the worker thread calculated all arrays.
+        """
+        if self.__thread is None:
+            return
+        self.__closed = True
+        self.__event.set()
+        self.__thread.join()
+        self.__thread = None
+        self.__raise_exception()
+
+    def __raise_exception(self) -> None:
+        if self.__exception is not None:
+            raise Exception(
+                "CascadeBoundary: worker thread failed"
+            ) from self.__exception
+
+    def __worker(self) -> None:
+        try:
+            while True:
+                self.__event.wait()
+                self.__event.clear()
+                while len(self.__arrays) > 0:
+                    array_in = self.__arrays.popleft()
+                    self.__event_space.set()
+                    self.out.push(array_in)
+                    self.scheduler.run()
+                if self.__closed and len(self.__arrays) == 0:
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            logger.exception(e)
+            self.__exception = e
+            self.__event_space.set()
+
+
+class DecimationCascade:
+    """
+    Stream-Sink: Implements a Stream-Interface
+
+    Contains the chain 'Density -> FIR -> Density -> ... -> Density -> OutTrash'
+    and drives it for every pushed array:
+    A StageScheduler calculates the stages which became ready, every stage
+    calculates all its blocks at once before the next stage runs.
+    No 'push(None)' polling through the chain is required: 'push(None)' returns ''.
+
+    This is the same order as the polling would calculate, so the
+    'densitystep_*.npz' files are identical.
+
+    'config.cascade_split_stages' > 0: Only the first stages are calculated in the
+    calling thread, the remaining stages in a worker thread, see CascadeBoundary.
+    Every stage gets the same arrays: The files are identical too.
+    """
+
+    def __init__(
+        self,
+        config,
+        directory,
+        writer: "program_fir_plot.DensityPlotWriter | None" = None,
+    ):
+        assert isinstance(config, program_configsetup.SamplingProcessConfig)
+        assert isinstance(directory, pathlib.Path)
+
+        o = OutTrash()
+        stages: list[Density | FIR] = []
+        self.boundary: CascadeBoundary | None = None
+        # index: 0 Density 0, 1 FIR 0, 2 Density 1, ...
+        for index in reversed(range(2 * config.fir_count - 1)):
+            if index % 2 == 0:
+                o = Density(o, config=config, directory=directory, writer=writer)
+            else:
+                o = FIR(o)
+            stages.insert(0, o)
+            if index == config.cascade_split_stages > 0:
+                self.boundary = CascadeBoundary(o, stages=stages)
+                o = self.boundary
+                stages = []
+
+        self.out = o
+        # The stages calculated in the calling thread
+        self.stages = stages
+        self.scheduler = StageScheduler(self.stages)
+
+    def init(self, stage, dt_s, prev):
+        self.out.init(stage=stage, dt_s=dt_s, prev=prev)
+
+    def done(self):
+        self.out.done()
+
+    def put_EOF(self, exit_code: ExitCode) -> None:
+        assert isinstance(exit_code, ExitCode)
+        self.out.put_EOF(exit_code)
+
+    def print_size(self, f):
+        backlog = self.scheduler.backlog
+        if self.boundary is not None:
+            self.boundary.print_size(f)
+            backlog += self.boundary.backlog
+        for tag, samples in backlog:
+            print(f"{tag}: backlog {samples} samples", file=f)
+
+    def flush(self) -> None:
+        self.scheduler.run()
+
+    def restart(self) -> None:
+        self.scheduler.run()
+        self.out.restart()
+
+    def close(self) -> None:
+        if self.boundary is not None:
+            self.boundary.close()
+
+    def push(self, array_in):
+        """
+        if array_in is None:
+          Return: '' as all calculations are already done.
+        if array_in is not None:
+          Return: None
+        """
+        if array_in is None:
+            return ""
+
+        self.out.push(array_in)
+        self.scheduler.run()
+        return None
+
+
 class InSynthetic:
     """
     Stream-Source: Drives a output of Stream-Interface
@@ -489,12 +1020,7 @@ class InSynthetic:
             self.out.print_size(sys.stdout)
             print("----------------")
 
-            max_calculations = 30
-            for _ in range(max_calculations):
-                calculation_stage = self.out.push(None)
-                done = len(calculation_stage) == 0
-                if done:
-                    break
+        self.out.flush()
 
 
 class UniformPieces:
@@ -506,7 +1032,7 @@ class UniformPieces:
 
     def __init__(self, out):
         self.out = out
-        self.array = np.empty(0, dtype=NUMPY_FLOAT_TYPE)
+        self.fifo = None
         self.stage = None
         self.total_samples = None
         self.pushcalulator_next = None
@@ -517,6 +1043,10 @@ class UniformPieces:
         self.total_samples = 0
         self.out.init(stage=stage, dt_s=dt_s, prev=None)
         self.pushcalulator_next = PushCalculator(dt_s)
+        self.fifo = library_fifo.Fifo(
+            capacity=2 * self.pushcalulator_next.push_size_samples,
+            dtype=NUMPY_FLOAT_TYPE,
+        )
 
     def done(self):
         self.out.done()
@@ -537,34 +1067,58 @@ class UniformPieces:
             return self.out.push(None)
 
         self.total_samples += len(array_in)
-        self.array = np.append(self.array, array_in)
+        self.fifo.push(array_in)
 
         push_size_samples = self.pushcalulator_next.push_size_samples
-        if len(self.array) >= push_size_samples:
-            self.out.push(self.array[:push_size_samples])
-            # Save the remainting part to 'self.array'
-            self.array = self.array[push_size_samples:]
-
-            max_calculations = 40
-            for _i in range(max_calculations):
-                calculation_stage = self.out.push(None)
-                assert isinstance(calculation_stage, str)
-                done = len(calculation_stage) == 0
-                if done:
-                    self._calculation_not_finished_counter = 0
-                    return None
-            self._calculation_not_finished_counter += 1
-            if self._calculation_not_finished_counter >= 20:
-                logger.warning(
-                    f"calculation_not_finished_counter: {self._calculation_not_finished_counter}"
-                )
-            # logger.debug('m', end='')
+        if len(self.fifo) >= push_size_samples:
+            # 'pop()' returns a copy: The next stages may keep a reference.
+            self.out.push(self.fifo.pop(push_size_samples))
+            self.flush()
         return None
 
+    def flush(self) -> None:
+        """
+        Calculate the stages which have sufficient samples.
+        """
+        if isinstance(self.out, DecimationCascade):
+            self.out.flush()
+            return
+
+        # The chain is polled: Every 'push(None)' calculates one stage.
+        max_calculations = 40
+        for _i in range(max_calculations):
+            calculation_stage = self.out.push(None)
+            assert isinstance(calculation_stage, str)
+            done = len(calculation_stage) == 0
+            if done:
+                self._calculation_not_finished_counter = 0
+                return
+        self._calculation_not_finished_counter += 1
+        if self._calculation_not_finished_counter >= 20:
+            logger.warning(
+                f"calculation_not_finished_counter: {self._calculation_not_finished_counter}"
+            )
+        # logger.debug('m', end='')
+
     def put_EOF(self, exit_code: ExitCode) -> None:
         assert isinstance(exit_code, ExitCode)
         self.out.put_EOF(exit_code)
 
+    def restart(self) -> None:
+        """
+        The following samples are not contiguous to the pushed samples (a 'Gap'):
+        Drop the samples which do not fill a push and restart all stages.
+        """
+        self.fifo.drop(len(self.fifo))
+        self.out.restart()
+
+    def close(self) -> None:
+        """
+        Wait till all stages are calculated.
+        """
+        if isinstance(self.out, DecimationCascade):
+            self.out.close()
+
 
 class SamplingProcess:
     def __init__(self, config, directory_raw):
@@ -574,6 +1128,8 @@ class SamplingProcess:
         directory_raw.mkdir(parents=True, exist_ok=True)
         self.config = config
         self.directory_raw = directory_raw
+        # Settle writes no densitysteps, the pipeline writes them in its own processes
+        self.writer: program_fir_plot.DensityPlotWriter | None = None
 
         if config.settle:
             self.output = program_settle.Settle(
@@ -581,15 +1137,52 @@ class SamplingProcess:
             )
             return
 
-        o = OutTrash()
+        if config.pipeline:
+            self.output = program_fir_pipeline.PipelineOutput(
+                config=config, directory_raw=self.directory_raw
+            )
+            return
+
+        self.writer = program_fir_plot.DensityPlotWriter(
+            interval_s=config.density_save_interval_s
+        )
+        self.output = self.create_output(
+            config=config, directory_raw=self.directory_raw, writer=self.writer
+        )
+
+    @classmethod
+    def create_output(
+        cls, config, directory_raw, writer: "program_fir_plot.DensityPlotWriter"
+    ) -> UniformPieces:
+        if config.decimation_cascade:
+            o = DecimationCascade(config=config, directory=directory_raw, writer=writer)
+        else:
+            o = OutTrash()
 
-        for _i in range(config.fir_count - 1):
-            o = Density(o, config=config, directory=self.directory_raw)
-            o = FIR(o)
+            for _i in range(config.fir_count - 1):
+                o = Density(o, config=config, directory=directory_raw, writer=writer)
+                o = FIR(o)
 
-        o = Density(o, config=config, directory=self.directory_raw)
-        o = UniformPieces(o)
-        self.output = o
+            o = Density(o, config=config, directory=directory_raw, writer=writer)
+        return UniformPieces(o)
+
+    def abort(self) -> None:
+        """
+        The acquisition failed: Stop the pipeline processes with an error
+        and wait till they are finished.
+        """
+        if isinstance(self.output, program_fir_pipeline.PipelineOutput):
+            self.output.put_EOF(ExitCode.ERROR)
+        self.close()
+
+    def close(self) -> None:
+        """
+        Wait till all 'densitystep_*.npz' are written.
+        """
+        if isinstance(self.output, UniformPieces | program_fir_pipeline.PipelineOutput):
+            self.output.close()
+        if self.writer is not None:
+            self.writer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+Benchmark: 'DecimationCascade' versus the 'push(None)' polling chain
+and the 'DecimationCascade' split into two threads.
+
+  python -m pymeas2019_noise.program_fir_benchmark
+
+All variants process the same synthetic signal.
+The resulting 'densitystep_*.npz' files have to be identical.
+"""
+
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+
+from . import (
+    program_configsetup,
+    program_fir,
+    program_fir_plot,
+    run_0_measure_synthetic,
+)
+
+DT_S = 1.0 / 97656.25
+DURATION_S = 60.0
+FIR_COUNTS = (20, 30)
+CASCADE_SPLIT_STAGES = 1
+
+
+def run(
+    fir_count: int,
+    decimation_cascade: bool,
+    directory: pathlib.Path,
+    cascade_split_stages: int = 0,
+) -> float:
+    """
+    Return the duration in seconds.
+    """
+    np.random.seed(47)
+    signal = run_0_measure_synthetic.TestSignal(
+        sine_amp_V_rms=1e-4, noise_density_V_sqrtHz=1e-7
+    )
+
+    config = program_configsetup.SamplingProcessConfig()
+    config.fir_count = fir_count
+    config.stepname = "benchmark"
+    config.duration_s = DURATION_S
+    config.decimation_cascade = decimation_cascade
+    config.cascade_split_stages = cascade_split_stages
+    config.validate()
+
+    sp = program_fir.SamplingProcess(config=config, directory_raw=directory)
+    stream_output = sp.output
+    stream_output.init(stage=0, dt_s=DT_S)
+    push_size_samples = program_fir.PushCalculator(DT_S).push_size_samples
+
+    start_s = time.perf_counter()
+    for sample_start in range(0, int(DURATION_S / DT_S), push_size_samples):
+        array = signal.calculate(
+            dt_s=DT_S, sample_start=sample_start, push_size_samples=push_size_samples
+        )
+        stream_output.push(array)
+    for _ in range(100):
+        if stream_output.push(None) == "":
+            break
+    sp.close()
+    return time.perf_counter() - start_s
+
+
+def identical(directory_a: pathlib.Path, directory_b: pathlib.Path) -> bool:
+    filenames_a = sorted(
+        f.name
+        for f in program_fir_plot.DensityPlot.files_from_directory(
+            directory_a, skip=False
+        )
+    )
+    filenames_b = sorted(
+        f.name
+        for f in program_fir_plot.DensityPlot.files_from_directory(
+            directory_b, skip=False
+        )
+    )
+    if filenames_a != filenames_b:
+        return False
+    # The '.npz' files contain timestamps: Compare the columns.
+    for f in filenames_a:
+        data_a = program_fir_plot.DensityPlot.read(directory_a / f)
+        data_b = program_fir_plot.DensityPlot.read(directory_b / f)
+        if data_a.keys() != data_b.keys():
+            return False
+        for name, value_a in data_a.items():
+            if not np.array_equal(value_a, data_b[name]):
+                return False
+    return True
+
+
+def main():
+    for fir_count in FIR_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            directory_chain = pathlib.Path(tmp) / "chain"
+            directory_cascade = pathlib.Path(tmp) / "cascade"
+            directory_split = pathlib.Path(tmp) / "split"
+            duration_chain_s = run(
+                fir_count, decimation_cascade=False, directory=directory_chain
+            )
+            duration_cascade_s = run(
+                fir_count, decimation_cascade=True, directory=directory_cascade
+            )
+            duration_split_s = run(
+                fir_count,
+                decimation_cascade=True,
+                directory=directory_split,
+                cascade_split_stages=CASCADE_SPLIT_STAGES,
+            )
+            print(
+                f"fir_count={fir_count:2d}: chain {duration_chain_s:0.2f}s, cascade {duration_cascade_s:0.2f}s, identical={identical(directory_chain, directory_cascade)}"
+            )
+            print(
+                f"fir_count={fir_count:2d}: cascade split after {CASCADE_SPLIT_STAGES} stages {duration_split_s:0.2f}s, identical={identical(directory_cascade, directory_split)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
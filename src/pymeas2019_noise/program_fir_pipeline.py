@@ -0,0 +1,206 @@
+"""
+Optional pipeline: Acquisition, decimation and persistence run in separate processes.
+Enabled by 'SamplingProcessConfig.pipeline'.
+
+acquisition process (the process calling 'PipelineOutput.push()')
+  copies the samples into a ShmRing in shared memory.
+  The reading of the instrument is not blocked by the calculation.
+
+cascade process
+  reads from the ShmRing and calculates 'UniformPieces' and all stages.
+  The densitystep snapshots are throttled by a 'DensityPlotWriter'
+  and sent to the persistence process.
+
+persistence process
+  writes the 'densitystep_*.npz' files.
+
+The cascade and the persistence process are daemons and stop if the
+acquisition process died: 'os._exit()' does not wait for them.
+"""
+
+import logging
+import multiprocessing
+import queue
+
+from . import library_shm_ring, program_configsetup, program_fir, program_fir_plot
+from .library_filelock import ExitCode
+
+logger = logging.getLogger("logger")
+
+
+def _parent_alive() -> bool:
+    parent = multiprocessing.parent_process()
+    return (parent is None) or parent.is_alive()
+
+
+def _process_cascade(
+    config: "program_configsetup.SamplingProcessConfig",
+    directory_raw,
+    dt_s: float,
+    ring_descriptor: library_shm_ring.ShmRingDescriptor,
+    queue_persist,
+) -> None:
+    ring = library_shm_ring.ShmRing.attach(ring_descriptor)
+    try:
+
+        def func_write(filename, data):
+            queue_persist.put((filename, data))
+
+        writer = program_fir_plot.DensityPlotWriter(
+            interval_s=config.density_save_interval_s, func_write=func_write
+        )
+        output = program_fir.SamplingProcess.create_output(
+            config=config, directory_raw=directory_raw, writer=writer
+        )
+        output.init(stage=0, dt_s=dt_s)
+        push_size_samples = program_fir.PushCalculator(dt_s).push_size_samples
+        while True:
+            array = ring.get(max_samples=push_size_samples, func_alive=_parent_alive)
+            if array is None:
+                break
+            # 'UniformPieces' copies the samples into its fifo
+            output.push(array)
+            ring.release(len(array))
+        output.flush()
+        output.close()
+        output.put_EOF(ExitCode(ring.exit_code))
+        writer.close()
+    finally:
+        queue_persist.put(None)
+        # The acquisition process died: Nobody else will unlink the shared memory.
+        ring.close(unlink=not _parent_alive())
+
+
+def _process_persist(queue_persist) -> None:
+    while True:
+        try:
+            item = queue_persist.get(timeout=library_shm_ring.WAIT_TIMEOUT_S)
+        except queue.Empty:
+            if not _parent_alive():
+                raise Exception("pipeline: The acquisition process stopped!") from None
+            continue
+        if item is None:
+            return
+        filename, data = item
+        program_fir_plot.DensityPlot.write(filename, data)
+
+
+class PipelineOutput:
+    """
+    Stream-Sink: Implements the same interface as 'UniformPieces'.
+    """
+
+    def __init__(self, config, directory_raw):
+        assert isinstance(config, program_configsetup.SamplingProcessConfig)
+        self.config = config
+        self.directory_raw = directory_raw
+        self.statistics_waited_s = 0.0
+        self.__ring: library_shm_ring.ShmRing | None = None
+        self.__processes: list[multiprocessing.Process] = []
+        self.__eof = False
+
+    def init(self, stage, dt_s):
+        assert stage == 0
+        assert self.__ring is None
+        capacity = max(
+            int(self.config.pipeline_ring_s / dt_s),
+            2 * program_fir.PushCalculator(dt_s).push_size_samples,
+        )
+        self.__ring = library_shm_ring.ShmRing.create(
+            capacity=capacity, dtype=program_fir.NUMPY_FLOAT_TYPE
+        )
+        queue_persist: multiprocessing.Queue = multiprocessing.Queue()
+        self.__processes = [
+            multiprocessing.Process(
+                target=_process_persist,
+                args=(queue_persist,),
+                name="pipeline_persist",
+                daemon=True,
+            ),
+            multiprocessing.Process(
+                target=_process_cascade,
+                args=(
+                    self.config,
+                    self.directory_raw,
+                    dt_s,
+                    self.__ring.descriptor,
+                    queue_persist,
+                ),
+                name="pipeline_cascade",
+                daemon=True,
+            ),
+        ]
+        for process in self.__processes:
+            process.start()
+
+    def done(self):
+        pass
+
+    def print_size(self, f):
+        assert self.__ring is not None
+        print(
+            f"pipeline ring: {self.__ring.size}/{self.__ring.capacity} samples, acquisition waited {self.statistics_waited_s:0.3f}s",
+            file=f,
+        )
+
+    def push(self, array_in):
+        """
+        if array_in is None:
+          Return: '' as the calculations are done in the cascade process.
+        if array_in is not None:
+          Return: None
+        """
+        if array_in is None:
+            return ""
+        assert self.__ring is not None
+        self.__raise_if_dead()
+        waited_s = self.__ring.put(array_in, func_alive=self.__alive)
+        if waited_s > 0.0:
+            if self.statistics_waited_s == 0.0:
+                logger.warning(
+                    "pipeline ring full: acquisition waits for the cascade process, see 'print_size()'"
+                )
+            self.statistics_waited_s += waited_s
+        return None
+
+    def __alive(self) -> bool:
+        return all(process.is_alive() for process in self.__processes)
+
+    def __raise_if_dead(self) -> None:
+        for process in self.__processes:
+            if not process.is_alive():
+                raise Exception(
+                    f"{process.name} stopped unexpectedly: exitcode {process.exitcode}"
+                )
+
+    def flush(self) -> None:
+        # The cascade process calculates as soon as samples are available.
+        pass
+
+    def restart(self) -> None:
+        raise Exception(
+            "pipeline: A gap in the samples is not supported, use 'QueuePolicy.BLOCK'!"
+        )
+
+    def put_EOF(self, exit_code: ExitCode) -> None:
+        assert isinstance(exit_code, ExitCode)
+        if self.__eof:
+            return
+        self.__eof = True
+        assert self.__ring is not None
+        self.__ring.put_EOF(exit_code=exit_code.value, func_alive=self.__alive)
+
+    def close(self) -> None:
+        """
+        Wait till the cascade and persistence processes are finished.
+        """
+        if self.__ring is None:
+            return
+        self.put_EOF(ExitCode.OK)
+        for process in self.__processes:
+            process.join()
+        self.__ring.close(unlink=True)
+        self.__ring = None
+        for process in self.__processes:
+            if process.exitcode != 0:
+                raise Exception(f"{process.name}: exitcode {process.exitcode}")
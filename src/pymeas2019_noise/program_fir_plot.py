@@ -1,3 +1,4 @@
+import dataclasses
 import itertools
 import logging
 import math
@@ -11,15 +12,27 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import ticker
 
-from . import library_plot_config, library_topic, program_eseries, program_fir
+from . import (
+    library_plot_config,
+    library_render,
+    library_result_store,
+    library_topic,
+    program_eseries,
+    program_fir,
+)
 
 logger = logging.getLogger("logger")
 
 
 class FilenameDensityStepMatcher:
     FILENAME_TAG_SKIP = "_SKIP"
-    GLOB_PATTERN = "densitystep_*.pickle"
-    PATTERN = rf"^densitystep_(?P<stepname>.*?)_(?P<stage>\d+)(?P<skiptext>{FILENAME_TAG_SKIP})?.pickle$"
+    GLOB_PATTERN = "densitystep_*"
+    SUFFIX = ".npz"
+    SUFFIX_LEGACY = ".pickle"
+    """
+    Written by previous versions: See 'program.migrate_dir_raw()'.
+    """
+    PATTERN = rf"^densitystep_(?P<stepname>.*?)_(?P<stage>\d+)(?P<skiptext>{FILENAME_TAG_SKIP})?(?P<suffix>\.npz|\.pickle)$"
     RE = re.compile(PATTERN)
 
     @classmethod
@@ -28,7 +41,7 @@ class FilenameDensityStepMatcher:
         assert isinstance(stage, int)
         assert isinstance(skip, bool)
         skiptext = cls.FILENAME_TAG_SKIP if skip else ""
-        return f"densitystep_{stepname}_{stage:02d}{skiptext}.pickle"
+        return f"densitystep_{stepname}_{stage:02d}{skiptext}{cls.SUFFIX}"
 
     def __init__(self, filename):
         assert isinstance(filename, str)
@@ -38,35 +51,16 @@ class FilenameDensityStepMatcher:
         self.stage = None
         self.skip = None
         self.label = None
+        self.legacy = None
         if self.match:
             self.stepname = _match.group("stepname")
             self.stage = _match.group("stage")
             self.label = f"{self.stepname}_{self.stage}"
             skiptext = _match.group("skiptext")
             self.skip = skiptext == FilenameDensityStepMatcher.FILENAME_TAG_SKIP
-
-
-class Average:
-    def __init__(self) -> None:
-        self.reset()
-
-    def reset(self):
-        self.__sum_d = 0.0
-        self.__sum_n = 0
-
-    def avg(self):
-        """
-        return None if no samples
-        """
-        if self.__sum_n == 0:
-            return None
-        avg = self.__sum_d / self.__sum_n
-        self.reset()
-        return avg
-
-    def sum(self, d):
-        self.__sum_n += 1
-        self.__sum_d += d
+            self.legacy = (
+                _match.group("suffix") == FilenameDensityStepMatcher.SUFFIX_LEGACY
+            )
 
 
 class DensityPlot:  # pylint: disable=too-many-instance-attributes
@@ -83,7 +77,12 @@ class DensityPlot:  # pylint: disable=too-many-instance-attributes
         stepsize_bins_count,
         stepsize_bins_V,
         samples_V,
+        writer: "DensityPlotWriter | None" = None,
     ):  # pylint: disable=too-many-arguments
+        """
+        writer is None: Write the file now.
+        Else: 'writer' will write the file in the background.
+        """
         assert isinstance(directory, pathlib.Path)
         assert isinstance(stage, int)
         assert isinstance(dt_s, float)
@@ -93,6 +92,13 @@ class DensityPlot:  # pylint: disable=too-many-instance-attributes
         assert isinstance(stepsize_bins_count, np.ndarray)
         assert isinstance(stepsize_bins_V, list)
         assert isinstance(samples_V, np.ndarray)
+        assert isinstance(writer, DensityPlotWriter | None)
+
+        if writer is not None:
+            # The writer writes later: The caller may modify the arrays in the meantime.
+            Pxx_sum = Pxx_sum.copy()
+            stepsize_bins_count = stepsize_bins_count.copy()
+            samples_V = samples_V.copy()
 
         skip = stage < config.fir_count_skipped
         filename = FilenameDensityStepMatcher.filename_from_stepname_stage(
@@ -115,36 +121,69 @@ class DensityPlot:  # pylint: disable=too-many-instance-attributes
         # We expect that the directory was created (and emptied) before.
         # directory.mkdir(parents=True, exist_ok=True)
         filenameFull = directory / filename
-        with filenameFull.open("wb") as f:
-            pickle.dump(data, f)
+        if writer is None:
+            cls.write(filenameFull, data)
+        else:
+            writer.put(filenameFull, data)
 
         return filenameFull
 
+    @classmethod
+    def write(cls, filename: pathlib.Path, data: dict) -> None:
+        """
+        A reader will never see a partially written file.
+        """
+        assert isinstance(filename, pathlib.Path)
+        assert isinstance(data, dict)
+
+        library_result_store.save(
+            filename, kind=library_result_store.KIND_DENSITYSTEP, columns=data
+        )
+
+    @classmethod
+    def read(cls, filename: pathlib.Path) -> dict:
+        """
+        Return the data as written by 'write()'.
+        Also reads the '.pickle' files written by previous versions.
+        """
+        assert isinstance(filename, pathlib.Path)
+
+        if filename.suffix == FilenameDensityStepMatcher.SUFFIX_LEGACY:
+            with filename.open("rb") as f:
+                return pickle.load(f)
+        columns = library_result_store.load(
+            filename, kind=library_result_store.KIND_DENSITYSTEP
+        )
+        for name in ("stepname", "stage", "dt_s", "Pxx_n", "skip"):
+            columns[name] = columns[name].item()
+        return columns
+
     @classmethod
     def file_changed(cls, dir_input):
         filename_summary = library_topic.PickleResultSummary.filename(dir_input)
         timestamp_summary = 0.0
         if filename_summary.exists():
             timestamp_summary = filename_summary.stat().st_mtime
-        for pickle_file in cls.pickle_files_from_directory(
-            dir_input=dir_input, skip=True
-        ):
-            if pickle_file.stat().st_mtime > timestamp_summary:
+        for filename in cls.files_from_directory(dir_input=dir_input, skip=True):
+            if filename.stat().st_mtime > timestamp_summary:
                 # At least one file is newer
                 return True
         # No file has changed
         return False
 
     @classmethod
-    def pickle_files_from_directory(cls, dir_input, skip):
+    def files_from_directory(cls, dir_input, skip):
         """
-        Return all plot (.pickle-files) from directory.
+        Return all densitystep files from directory.
         """
         assert isinstance(dir_input, pathlib.Path)
         assert isinstance(skip, bool)
 
         for filename in dir_input.glob(FilenameDensityStepMatcher.GLOB_PATTERN):
             m = FilenameDensityStepMatcher(filename.name)
+            if not m.match:
+                # For example a temporary file
+                continue
             if skip and m.skip:
                 continue
             yield filename
@@ -152,14 +191,14 @@ class DensityPlot:  # pylint: disable=too-many-instance-attributes
     @classmethod
     def plots_from_directory(cls, dir_input, skip):
         """
-        Return all plot (.pickle-files) from directory.
+        Return all plots from directory.
         """
         assert isinstance(dir_input, pathlib.Path)
         assert isinstance(skip, bool)
 
-        # return [DensityPlot(filename) for filename in cls.pickle_files_from_directory(dir_input, skip)]
+        # return [DensityPlot(filename) for filename in cls.files_from_directory(dir_input, skip)]
         l0 = []
-        for filename in cls.pickle_files_from_directory(dir_input, skip):
+        for filename in cls.files_from_directory(dir_input, skip):
             dp = DensityPlot(filename)
             l0.append(dp)
         return l0
@@ -198,20 +237,8 @@ class DensityPlot:  # pylint: disable=too-many-instance-attributes
         return self.stepname, self.dt_s
 
     def __init__(self, filename):
-        retry = 0
-        while True:
-            try:
-                with open(filename, "rb") as f:
-                    data = pickle.load(f)
-                    break
-            except Exception as e:  # pylint: disable=broad-except
-                logger.debug(f"Unpicking {filename}: {e}")
-                # We could not read the file. probably because the measureing process was writing it just now.
-                # Lets try again!
-                retry += 1
-                if retry >= 3:
-                    raise
-                time.sleep(0.05)
+        # The file is replaced atomically by 'DensityPlot.write()': It is never partially written.
+        data = DensityPlot.read(filename)
         self.stepname = data["stepname"]
         self.stage = data["stage"]
         self.dt_s = data["dt_s"]
@@ -271,6 +298,138 @@ class DensityPlot:  # pylint: disable=too-many-instance-attributes
         plt.close()
 
 
+class DensityPlotWriter:
+    """
+    Writes the densitystep files in a background thread:
+    The disk I/O does not block the calculation of the stages.
+
+    'put()' only stores the snapshot: Per file, the latest snapshot wins.
+    A file is written at most every 'interval_s'.
+    'flush()' writes all pending snapshots and waits till they are written.
+
+    A snapshot which failed to be written is written again with the next
+    interval, unless a newer snapshot of the same file arrived.
+    'close()' retries the snapshots which are still not written and raises
+    if this fails again: The final snapshot is never lost silently.
+
+    'func_write(filename, data)' defaults to 'DensityPlot.write()'.
+    """
+
+    def __init__(self, interval_s: float, func_write=None):
+        assert isinstance(interval_s, float)
+        assert interval_s >= 0.0
+        self.__interval_s = interval_s
+        self.__func_write = DensityPlot.write if func_write is None else func_write
+        self.__condition = threading.Condition()
+        self.__pending: dict[pathlib.Path, dict] = {}
+        self.__written_s: dict[pathlib.Path, float] = {}
+        self.__failed: dict[pathlib.Path, dict] = {}
+        self.__writing = 0
+        self.__flush_requested = 0
+        self.__closed = False
+        self.__thread: threading.Thread | None = None
+        self.statistics_put = 0
+        self.statistics_written = 0
+
+    def put(self, filename: pathlib.Path, data: dict) -> None:
+        with self.__condition:
+            assert not self.__closed
+            self.statistics_put += 1
+            self.__pending[filename] = data
+            # The newer snapshot replaces a failed one
+            self.__failed.pop(filename, None)
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__worker, name="DensityPlotWriter", daemon=True
+                )
+                self.__thread.start()
+            self.__condition.notify_all()
+
+    def flush(self) -> None:
+        with self.__condition:
+            self.__flush_requested += 1
+            self.__condition.notify_all()
+            try:
+                while self.__pending or self.__writing:
+                    self.__condition.wait()
+            finally:
+                self.__flush_requested -= 1
+
+    def close(self) -> None:
+        self.flush()
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        if self.__thread is not None:
+            self.__thread.join()
+
+        # The worker is stopped: Retry the failed snapshots in this thread.
+        failed, self.__failed = self.__failed, {}
+        for filename, data in failed.items():
+            logger.warning(f"Writing {filename}: Retry the failed snapshot")
+            self.__func_write(filename, data)
+            self.statistics_written += 1
+
+    def __due(self, now_s: float) -> tuple[list[pathlib.Path], float | None]:
+        """
+        Return the files to be written now
+        and the time to wait for the next file.
+        """
+        due = []
+        wait_s = None
+        for filename in self.__pending:
+            if self.__flush_requested:
+                due.append(filename)
+                continue
+            remaining_s = (
+                self.__written_s.get(filename, -math.inf) + self.__interval_s - now_s
+            )
+            if remaining_s <= 0.0:
+                due.append(filename)
+                continue
+            wait_s = remaining_s if wait_s is None else min(wait_s, remaining_s)
+        return due, wait_s
+
+    def __worker(self) -> None:
+        while True:
+            with self.__condition:
+                while True:
+                    due, wait_s = self.__due(time.monotonic())
+                    if due:
+                        break
+                    if self.__closed:
+                        return
+                    self.__condition.wait(timeout=wait_s)
+                snapshots = [
+                    (filename, self.__pending.pop(filename)) for filename in due
+                ]
+                self.__writing += 1
+
+            failed: dict[pathlib.Path, dict] = {}
+            try:
+                for filename, data in snapshots:
+                    try:
+                        self.__func_write(filename, data)
+                    except Exception as e:  # pylint: disable=broad-except
+                        logger.exception(f"Writing {filename}: {e}")
+                        failed[filename] = data
+            finally:
+                with self.__condition:
+                    now_s = time.monotonic()
+                    for filename, data in snapshots:
+                        self.__written_s[filename] = now_s
+                        if filename in failed:
+                            self.__failed[filename] = data
+                            if not self.__flush_requested:
+                                # Retry with the next interval
+                                self.__pending.setdefault(filename, data)
+                            continue
+                        self.__failed.pop(filename, None)
+                        self.statistics_written += 1
+                    self.__writing -= 1
+                    self.__condition.notify_all()
+
+
 class DensityPoint:
     DELIMITER = "\t"
 
@@ -307,8 +466,9 @@ class Selector:
     USEFUL_PART = 0.75  # depending on the downsampling, useful part is the non influenced part by the low pass filtering of the FIR stage
 
     def __init__(self, series):
-        self.__eseries_borders = program_eseries.eseries(
-            series=series, minimal=1e-6, maximal=1e8, borders=True
+        self.series = series
+        self.__eseries = program_eseries.eseries_table(
+            series=series, minimal=1e-6, maximal=1e8
         )
 
     def fill_bins(
@@ -317,10 +477,8 @@ class Selector:
         # contribute, fill_bins
         assert isinstance(density, DensityPlot)
 
-        avg = Average()
-        idx_fft = 0
+        frequencies = density.frequencies
         Pxx = density.Pxx
-        list_density_points: list[DensityPoint] = []
 
         fmax_Hz = 1.0 / (density.dt_s * 2.0)  # highest frequency in spectogram
         f_high_limit_Hz = Selector.USEFUL_PART * fmax_Hz
@@ -328,49 +486,53 @@ class Selector:
             f_high_limit_Hz / program_fir.DECIMATE_FACTOR
         )  # every FIR stage reduces sampling frequency by factor DECIMATE_FACTOR
 
-        for f_eserie_left, f_eserie, f_eserie_right in self.__eseries_borders:
-            if not trace:
-                if f_eserie < f_low_limit_Hz:
-                    if not firstDensityPoint:
-                        continue
-                    # Special case for the first point: select low frequencies too
-
-                if f_eserie > f_high_limit_Hz:
-                    if not lastDensity:
-                        # We are finished with this loop
-                        # TodoHans: save above frequency_complete_low_limit here if P is None?
-                        return list_density_points
-                    # Special case for the last point: select high frequencies too
-
-            while True:
-                if idx_fft >= len(density.frequencies):
-                    # We are finished with this loop
-                    return list_density_points
-
-                f_fft = density.frequencies[idx_fft]
-
-                if f_fft < f_eserie_left:
-                    idx_fft += 1
-                    continue
-
-                if f_fft > f_eserie_right:
-                    P = avg.avg()
-                    if P is not None:
-                        d = math.sqrt(P)
-                        dp = DensityPoint(
-                            f=f_eserie,
-                            d=d,
-                            densityPlot=density,
-                            enbw=f_eserie_right - f_eserie_left,
-                        )
-                        list_density_points.append(dp)
-                    break  # Continue in next eserie.
-
-                d = Pxx[idx_fft]
-                avg.sum(d)
-                idx_fft += 1
-
-        raise Exception("Internal Programming Error")
+        # The eseries bins [bin_first, bin_end) are filled
+        bin_first = 0
+        bin_end = len(self.__eseries)
+        if not trace:
+            if not firstDensityPoint:
+                # Special case for the first point: select low frequencies too
+                bin_first = int(
+                    np.searchsorted(self.__eseries.center, f_low_limit_Hz, side="left")
+                )
+            if not lastDensity:
+                # Special case for the last point: select high frequencies too
+                bin_end = int(
+                    np.searchsorted(
+                        self.__eseries.center, f_high_limit_Hz, side="right"
+                    )
+                )
+        if (bin_first >= bin_end) or (len(frequencies) == 0):
+            return []
+        if (bin_end == len(self.__eseries)) and (
+            frequencies[-1] > self.__eseries.right[-1]
+        ):
+            raise Exception("Internal Programming Error")
+
+        # A frequency on a border belongs to the lower bin.
+        # The left border of the first bin is included.
+        bins = np.searchsorted(self.__eseries.right, frequencies, side="left")
+        mask = (frequencies >= self.__eseries.left[bin_first]) & (bins < bin_end)
+        bins = np.maximum(bins[mask], bin_first)
+        count = np.bincount(bins, minlength=bin_end)
+        # 'np.bincount' sums in the order of the frequencies: The sums are identical to a loop.
+        sum_Pxx = np.bincount(bins, weights=Pxx[mask], minlength=bin_end)
+
+        # A bin is only complete if there is a frequency above its right border.
+        selected = np.flatnonzero(count[bin_first:] > 0) + bin_first
+        selected = selected[self.__eseries.right[selected] < frequencies[-1]]
+        d = np.sqrt(sum_Pxx[selected] / count[selected])
+        enbw = self.__eseries.right[selected] - self.__eseries.left[selected]
+
+        return [
+            DensityPoint(f=f_eserie, d=d_, densityPlot=density, enbw=enbw_)
+            for f_eserie, d_, enbw_ in zip(
+                self.__eseries.center[selected].tolist(),
+                d.tolist(),
+                enbw.tolist(),
+                strict=True,
+            )
+        ]
 
 
 class ColorRotator:
@@ -396,6 +558,88 @@ class ColorRotator:
         return next(self.iter)
 
 
+class DensityPointsCache:
+    """
+    Caches the 'DensityPlot' and the 'DensityPoint's of every densitystep file.
+    A file is only loaded again if (filename, mtime, size) changed.
+    'Selector.fill_bins()' is only called again if the file or
+    the position of the stage in the summary changed.
+    """
+
+    def __init__(self) -> None:
+        self.__keys: dict[pathlib.Path, tuple[int, int]] = {}
+        self.__densities: dict[pathlib.Path, DensityPlot] = {}
+        self.__density_points: dict[
+            DensityPlot, tuple[tuple[str, bool, bool, bool], list[DensityPoint]]
+        ] = {}
+        self.statistics_loaded = 0
+        self.statistics_filled = 0
+
+    @property
+    def empty(self) -> bool:
+        return len(self.__keys) == 0
+
+    @property
+    def list_density(self) -> list[DensityPlot]:
+        return list(self.__densities.values())
+
+    def update(self, dir_input: pathlib.Path, skip: bool) -> bool:
+        """
+        Load the files which changed since the last call.
+        Return True if a file changed, appeared or disappeared.
+        """
+        assert isinstance(dir_input, pathlib.Path)
+        assert isinstance(skip, bool)
+
+        changed = False
+        filenames = set()
+        for filename in DensityPlot.files_from_directory(dir_input, skip):
+            filenames.add(filename)
+            try:
+                stat = filename.stat()
+            except FileNotFoundError:
+                # The file has been removed after the glob
+                continue
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self.__keys.get(filename, None) == key:
+                continue
+            self.__densities[filename] = DensityPlot(filename)
+            # Set the key after loading: A failed load is retried next time.
+            self.__keys[filename] = key
+            self.statistics_loaded += 1
+            changed = True
+        for filename in set(self.__keys) - filenames:
+            del self.__keys[filename]
+            del self.__densities[filename]
+            changed = True
+        # Drop the 'DensityPoint's of files which have been reloaded or removed.
+        for density in set(self.__density_points) - set(self.__densities.values()):
+            del self.__density_points[density]
+        return changed
+
+    def fill_bins(
+        self,
+        selector: "Selector",
+        density: DensityPlot,
+        firstDensityPoint: bool,
+        lastDensity: bool,
+        trace: bool,
+    ) -> list[DensityPoint]:
+        key = (selector.series, firstDensityPoint, lastDensity, trace)
+        cached = self.__density_points.get(density, None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        list_density_points = selector.fill_bins(
+            density,
+            firstDensityPoint=firstDensityPoint,
+            lastDensity=lastDensity,
+            trace=trace,
+        )
+        self.__density_points[density] = (key, list_density_points)
+        self.statistics_filled += 1
+        return list_density_points
+
+
 class LsdSummary:
     def __init__(
         self,
@@ -403,11 +647,16 @@ class LsdSummary:
         list_density,
         directory,
         trace=False,
+        cache: DensityPointsCache | None = None,
     ):
+        """
+        cache: If given, 'Selector.fill_bins()' is only called for stages which changed.
+        """
         assert isinstance(plot_config, library_plot_config.PlotConfig)
         assert isinstance(list_density, list)
         assert isinstance(directory, pathlib.Path)
         assert isinstance(trace, bool)
+        assert isinstance(cache, DensityPointsCache | None)
 
         self.__directory = directory
         self.__trace = trace
@@ -424,21 +673,30 @@ class LsdSummary:
                 samples_V=density.samples_V,
             )
 
+        selector = Selector(series=plot_config.eseries)
         for density in list_density:
             assert isinstance(density, DensityPlot)
             Pxx = density.Pxx
             if Pxx is None:
                 continue
 
-            selector = Selector(series=plot_config.eseries)
             first_density_point = len(self.__list_density_points) == 0
             last_density = density == list_density[-1]
-            list_density_points = selector.fill_bins(
-                density,
-                firstDensityPoint=first_density_point,
-                lastDensity=last_density,
-                trace=self.__trace,
-            )
+            if cache is None:
+                list_density_points = selector.fill_bins(
+                    density,
+                    firstDensityPoint=first_density_point,
+                    lastDensity=last_density,
+                    trace=self.__trace,
+                )
+            else:
+                list_density_points = cache.fill_bins(
+                    selector,
+                    density,
+                    firstDensityPoint=first_density_point,
+                    lastDensity=last_density,
+                    trace=self.__trace,
+                )
             self.__list_density_points.extend(list_density_points)
 
     def write_summary_file(self, trace):
@@ -449,7 +707,7 @@ class LsdSummary:
                 f.write(dp.line)
                 f.write("\n")
 
-    def write_summary_pickle(self):
+    def write_result_summary(self):
         f = [dp.f for dp in self.__list_density_points if not dp.skip]
         d = [dp.d for dp in self.__list_density_points if not dp.skip]
         enbw = [dp.enbw for dp in self.__list_density_points if not dp.skip]
@@ -457,13 +715,18 @@ class LsdSummary:
             self.__directory, f, d, enbw, self.__dict_stages
         )
 
-    def plot(self, file_tag="", title=""):  # pylint: disable=too-many-locals
-        fig, ax = plt.subplots()
+    def plot(self, file_tag="", title=""):
+        self.figure(file_tag=file_tag, title=title).render()
 
+    def figure(self, file_tag="", title="") -> "LsdSummaryFigure":
+        """
+        The plot as plain data: See 'library_render'.
+        """
         # https://matplotlib.org/3.1.1/api/markers_api.html
         MARKERS = ".+x*"
         colorRotator = ColorRotator()
 
+        lines = []
         stepnames = [
             (stepname, list(g))
             for stepname, g in itertools.groupby(
@@ -478,8 +741,8 @@ class LsdSummary:
                 )
             ]
             for _stage, list_density_points in stages:
-                f = [dp.f for dp in list_density_points]
-                d = [dp.d for dp in list_density_points]
+                f = np.array([dp.f for dp in list_density_points])
+                d = np.array([dp.d for dp in list_density_points])
                 color = color_fancy = colorRotator.color
                 linestyle = "none"
                 marker = "."
@@ -490,25 +753,54 @@ class LsdSummary:
                     dp = list_density_points[0]
                     marker = MARKERS[stepnumber % len(MARKERS)]
                     markersize = 2 if dp.skip else 4
-                ax.loglog(
-                    f,
-                    d,
-                    linestyle=linestyle,
-                    linewidth=0.1,
-                    marker=marker,
-                    markersize=markersize,
-                    color=color,
+                lines.append(
+                    (
+                        f,
+                        d,
+                        dict(  # noqa: C408
+                            linestyle=linestyle,
+                            linewidth=0.1,
+                            marker=marker,
+                            markersize=markersize,
+                            color=color,
+                        ),
+                    )
                 )
 
-        plt.ylabel("Density [V/Hz^0.5]")
-        plt.xlabel("Frequency [Hz]")
-        # plt.ylim( 1e-11,1e-6)
-        # plt.xlim(1e-2, 1e5) # temp Peter
-        # plt.grid(True)
-        plt.grid(
+        filebase = f"{self.__directory}/result_summary_LSD{file_tag}"
+        logger.info(f" Summary LSD {filebase}")
+        return LsdSummaryFigure(
+            lines=lines, title=title, filename=pathlib.Path(filebase + ".png")
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class LsdSummaryFigure:
+    """
+    Written by 'LsdSummary.figure()'.
+    """
+
+    lines: list[tuple[np.ndarray, np.ndarray, dict]]
+    """
+    (f, d, style) per stage.
+    """
+    title: str
+    filename: pathlib.Path
+
+    def render(self) -> None:
+        fig = library_render.new_figure()
+        ax = fig.subplots()
+        for f, d, style in self.lines:
+            ax.loglog(f, d, **style)
+
+        ax.set_ylabel("Density [V/Hz^0.5]")
+        ax.set_xlabel("Frequency [Hz]")
+        # ax.set_ylim( 1e-11,1e-6)
+        # ax.set_xlim(1e-2, 1e5) # temp Peter
+        ax.grid(
             True, which="major", axis="both", linestyle="-", color="gray", linewidth=0.5
         )
-        plt.grid(
+        ax.grid(
             True,
             which="minor",
             axis="both",
@@ -517,14 +809,7 @@ class LsdSummary:
             linewidth=0.1,
         )
         ax.xaxis.set_major_locator(ticker.LogLocator(base=10.0, numticks=30))
-        if title:
-            plt.title(title)
-        filebase = f"{self.__directory}/result_summary_LSD{file_tag}"
-        logger.info(f" Summary LSD {filebase}")
-        fig.savefig(filebase + ".png", dpi=300)
-        # fig.savefig(filebase+'.svg')
-        # plt.show()
-        fig.clf()
-        plt.close(fig)
-        plt.clf()
-        plt.close()
+        if self.title:
+            ax.set_title(self.title)
+        fig.savefig(self.filename, dpi=300)
+        # fig.savefig(self.filename.with_suffix('.svg'))
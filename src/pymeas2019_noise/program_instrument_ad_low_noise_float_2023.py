@@ -3,13 +3,15 @@ import logging
 import sys
 
 import ad_low_noise_float_2023
+import numpy as np
 from ad_low_noise_float_2023.ad import AdLowNoiseFloat2023
 from ad_low_noise_float_2023.constants import PcbParams
 
-from . import program_configsetup
+from . import library_capture_raw, program_configsetup
 from .constants_ad_low_noise_float_2023 import ConfigStepAdLowNoiseFloat2023
 from .library_filelock import ExitCode
 from .program_fir import UniformPieces
+from .program_fir_pipeline import PipelineOutput
 
 logger = logging.getLogger("logger")
 
@@ -42,21 +44,13 @@ class Instrument:
         filelock_measurement,
     ):  # pylint: disable=too-many-statements
         assert isinstance(configstep, program_configsetup.ConfigStep)
-        assert isinstance(stream_output, UniformPieces)
+        assert isinstance(stream_output, UniformPieces | PipelineOutput)
 
         total_samples = int(configstep.duration_s / configstep.dt_s)
         pcb_params = PcbParams(scale_factor=configstep.skalierungsfaktor)
 
         stream_output.init(stage=0, dt_s=configstep.dt_s)
 
-        def flush_stages():
-            max_calculations = 30
-            for _ in range(max_calculations):
-                calculation_stage = stream_output.push(None)
-                done = len(calculation_stage) == 0
-                if done:
-                    break
-
         def stop(exit_code: ExitCode, reason: str):
             assert isinstance(exit_code, ExitCode)
             assert isinstance(reason, str)
@@ -66,17 +60,36 @@ class Instrument:
         def out_of_sync() -> None:
             logger.info("out_of_sync")
 
-        for measurements in self.adc.iter_measurements_V(
-            pcb_params=pcb_params,
-            total_samples=total_samples,
-            cb_out_of_sync=out_of_sync,
-        ):
-            if filelock_measurement.requested_stop_soft():
-                return stop(ExitCode.CTRL_C, "<ctrl-c> or softstop")
-            queueFull = stream_output.push(measurements.adc_value_V)
-            assert not queueFull
-
-        flush_stages()
+        capture_raw = None
+        if filename_capture_raw is not None:
+            # Do NOT process data when dumping capture_raw:
+            # 'run_1_process_raw' will process the file.
+            capture_raw = library_capture_raw.CaptureRawWriter(
+                filename_capture_raw,
+                dt_s=configstep.dt_s,
+                stepname=configstep.stepname,
+                skalierungsfaktor=configstep.skalierungsfaktor,
+            )
+
+        try:
+            for measurements in self.adc.iter_measurements_V(
+                pcb_params=pcb_params,
+                total_samples=total_samples,
+                cb_out_of_sync=out_of_sync,
+            ):
+                if filelock_measurement.requested_stop_soft():
+                    return stop(ExitCode.CTRL_C, "<ctrl-c> or softstop")
+                if capture_raw is not None:
+                    capture_raw.append(np.asarray(measurements.adc_value_V))
+                    continue
+                queueFull = stream_output.push(measurements.adc_value_V)
+                assert not queueFull
+        finally:
+            if capture_raw is not None:
+                # Also if aborted: The header contains the number of samples.
+                capture_raw.close()
+
+        stream_output.flush()
         return stop(ExitCode.OK, "time over")
 
 
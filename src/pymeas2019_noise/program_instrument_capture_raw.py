@@ -1,9 +1,13 @@
 import logging
 import pathlib
 
-import numpy as np
-
-from . import library_filelock, program_configsetup, program_fir
+from . import (
+    library_capture_raw,
+    library_filelock,
+    program_configsetup,
+    program_fir,
+    program_fir_pipeline,
+)
 
 logger = logging.getLogger("logger")
 
@@ -22,39 +26,33 @@ class Instrument:
         self,
         configstep: program_configsetup.ConfigStep,
         filename_capture_raw: pathlib.Path | None,
-        stream_output: program_fir.UniformPieces,
+        stream_output: program_fir.UniformPieces | program_fir_pipeline.PipelineOutput,
         filelock_measurement: library_filelock.FilelockMeasurement,
     ):  # pylint: disable=too-many-statements
         assert isinstance(configstep, program_configsetup.ConfigStep)
         assert isinstance(filename_capture_raw, pathlib.Path | None)
-        assert isinstance(stream_output, program_fir.UniformPieces)
+        assert isinstance(
+            stream_output,
+            program_fir.UniformPieces | program_fir_pipeline.PipelineOutput,
+        )
         assert isinstance(filelock_measurement, library_filelock.FilelockMeasurement)
 
         pushcalulator_next = program_fir.PushCalculator(configstep.dt_s)
         stream_output.init(stage=0, dt_s=configstep.dt_s)
         push_size_samples = pushcalulator_next.push_size_samples
 
-        def flush_stages():
-            max_calculations = 30
-            for _ in range(max_calculations):
-                calculation_stage = stream_output.push(None)
-                done = len(calculation_stage) == 0
-                if done:
-                    break
-
         if filename_capture_raw is None:
             return
 
-        with filename_capture_raw.open("rb") as f:
-            while True:
-                push_size_bytes = 4 * push_size_samples
-                buffer = f.read(push_size_bytes)
-                if len(buffer) < push_size_bytes:
-                    flush_stages()
-                    return
+        reader = library_capture_raw.CaptureRawReader(filename_capture_raw)
+        if reader.dt_s not in (None, configstep.dt_s):
+            raise Exception(
+                f"{filename_capture_raw}: Captured with dt_s={reader.dt_s} but configured dt_s={configstep.dt_s}!"
+            )
 
-                array = np.frombuffer(buffer, dtype=np.float32)
-                assert len(array) == push_size_samples
-                stream_output.push(array)
+        # The pieces are views into the memory mapped file: 'UniformPieces' copies them into its fifo.
+        for array in reader.iter_pieces(push_size_samples=push_size_samples):
+            stream_output.push(array)
+            stream_output.flush()
 
-                flush_stages()
+        stream_output.flush()
@@ -1,21 +1,220 @@
+import collections
+import dataclasses
+import enum
 import logging
-import pathlib
-import queue
 import sys
 import threading
 import time
 
+import numpy as np
+
+from . import library_capture_raw
 from .library_filelock import ExitCode
 
 logger = logging.getLogger("logger")
 
 IS64BIT = sys.maxsize > 2**32
 if IS64BIT:
-    SIZE_MAX_BYTES = 1e9
+    SIZE_MAX_BYTES = 1_000_000_000
 else:
-    SIZE_MAX_BYTES = 1e9
-BYTES_INT16 = 2
-SIZE_MAX_INT16 = SIZE_MAX_BYTES // BYTES_INT16
+    SIZE_MAX_BYTES = 1_000_000_000
+
+
+class QueuePolicy(enum.StrEnum):
+    """
+    What 'ByteQueue.put()' does if the queue is full.
+    """
+
+    BLOCK = "block"
+    """
+    Wait till the worker made room.
+    """
+    DROP_OLDEST = "drop_oldest"
+    """
+    Drop the oldest data and queue a 'Gap' instead.
+    """
+    SPILL = "spill"
+    """
+    Do not queue the data but append it to the spill file. Queue a 'Gap' instead.
+    """
+
+
+@dataclasses.dataclass(slots=True)
+class Gap:
+    """
+    Marks samples which have been dropped or spilled.
+    """
+
+    samples: int
+
+
+@dataclasses.dataclass(slots=True)
+class _Item:
+    raw_data: object
+    nbytes: int
+
+
+def _nbytes(raw_data) -> int:
+    """
+    'raw_data' may be any sequence of numbers, not only a buffer.
+
+    >>> _nbytes(np.zeros(3, dtype=np.int32)), _nbytes(b"abc"), _nbytes([1.0, 2.0])
+    (12, 3, 16)
+    """
+    if isinstance(raw_data, np.ndarray):
+        return raw_data.nbytes
+    try:
+        return memoryview(raw_data).nbytes
+    except TypeError:
+        return np.asarray(raw_data).nbytes
+
+
+@dataclasses.dataclass(slots=True)
+class QueueMetrics:
+    bytes_high_water: int = 0
+    blocked_s: float = 0.0
+    samples_dropped: int = 0
+    samples_spilled: int = 0
+
+    def log(self, size_max_bytes: int) -> None:
+        logger.info(
+            f"Queue: high water mark {self.bytes_high_water:,d} bytes ({100.0 * self.bytes_high_water / size_max_bytes:.0f}%), blocked {self.blocked_s:0.3f}s, dropped {self.samples_dropped:,d} samples, spilled {self.samples_spilled:,d} samples"
+        )
+
+
+class ByteQueue:
+    """
+    A queue bounded by the number of bytes of the queued data.
+    'put()' is called by the producer, 'get()' by the worker thread.
+    """
+
+    def __init__(
+        self,
+        size_max_bytes: int,
+        policy: QueuePolicy,
+        func_spill=None,
+    ):
+        assert isinstance(size_max_bytes, int)
+        assert isinstance(policy, QueuePolicy)
+        if policy == QueuePolicy.SPILL:
+            assert func_spill is not None
+        self.size_max_bytes = size_max_bytes
+        self.policy = policy
+        self.metrics = QueueMetrics()
+        self.__func_spill = func_spill
+        self.__deque: collections.deque = collections.deque()
+        self.__bytes = 0
+        self.__closed = False
+        self.__condition = threading.Condition()
+
+    @property
+    def bytes(self) -> int:
+        return self.__bytes
+
+    def put(self, raw_data) -> bool:
+        """
+        Return True if data was dropped or spilled.
+        Raise if the queue is closed: The worker thread stopped.
+        """
+        nbytes = _nbytes(raw_data)
+        with self.__condition:
+            self.__raise_closed()
+            full = self.__bytes + nbytes > self.size_max_bytes
+            if full and self.policy == QueuePolicy.BLOCK:
+                start_s = time.perf_counter()
+                # A single array larger than 'size_max_bytes' is accepted into an empty queue.
+                while (
+                    not self.__closed
+                    and self.__bytes > 0
+                    and self.__bytes + nbytes > self.size_max_bytes
+                ):
+                    self.__condition.wait()
+                self.metrics.blocked_s += time.perf_counter() - start_s
+                self.__raise_closed()
+                full = False
+            if full and self.policy == QueuePolicy.DROP_OLDEST:
+                while self.__bytes > 0 and self.__bytes + nbytes > self.size_max_bytes:
+                    self.__drop_oldest()
+            spill = full and self.policy == QueuePolicy.SPILL
+            if spill:
+                self.metrics.samples_spilled += len(raw_data)
+                self.__append_gap(len(raw_data))
+            else:
+                self.__deque.append(_Item(raw_data=raw_data, nbytes=nbytes))
+                self.__bytes += nbytes
+                self.metrics.bytes_high_water = max(
+                    self.metrics.bytes_high_water, self.__bytes
+                )
+                self.__condition.notify_all()
+        if spill:
+            # Writing takes time: Meanwhile, the worker thread has to take the queued data.
+            # Only the producer thread spills: The order of the spilled data is kept.
+            self.__func_spill(raw_data)
+        return full
+
+    def put_EOF(self, exit_code: ExitCode) -> None:
+        """
+        Ignored if the queue is closed: The worker thread already stopped.
+        """
+        with self.__condition:
+            if self.__closed:
+                return
+            self.__deque.append(exit_code)
+            self.__condition.notify_all()
+
+    def get(self):
+        """
+        Return raw_data, a 'Gap' or an 'ExitCode'.
+        """
+        with self.__condition:
+            while len(self.__deque) == 0:
+                self.__condition.wait()
+            item = self.__deque.popleft()
+            if isinstance(item, Gap | ExitCode):
+                return item
+            self.__bytes -= item.nbytes
+            assert self.__bytes >= 0
+            self.__condition.notify_all()
+            return item.raw_data
+
+    def close(self) -> None:
+        """
+        Called by the worker thread when it stops.
+        A waiting or following 'put()' raises.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__deque.clear()
+            self.__bytes = 0
+            self.__condition.notify_all()
+
+    def __raise_closed(self) -> None:
+        if self.__closed:
+            raise Exception("ByteQueue: The worker thread stopped!")
+
+    def __drop_oldest(self) -> None:
+        for i, item in enumerate(self.__deque):
+            if isinstance(item, Gap | ExitCode):
+                continue
+            del self.__deque[i]
+            self.__bytes -= item.nbytes
+            samples = len(item.raw_data)
+            self.metrics.samples_dropped += samples
+            # Replace the data by a gap. Merge with a gap before or after.
+            if i > 0 and isinstance(self.__deque[i - 1], Gap):
+                self.__deque[i - 1].samples += samples
+            elif i < len(self.__deque) and isinstance(self.__deque[i], Gap):
+                self.__deque[i].samples += samples
+            else:
+                self.__deque.insert(i, Gap(samples=samples))
+            return
+
+    def __append_gap(self, samples: int) -> None:
+        if len(self.__deque) > 0 and isinstance(self.__deque[-1], Gap):
+            self.__deque[-1].samples += samples
+        else:
+            self.__deque.append(Gap(samples=samples))
+        self.__condition.notify_all()
 
 
 class Progress:
@@ -62,6 +261,12 @@ class InThread:  # pylint: disable=too-many-instance-attributes
       put_EOF()
 
     The worker thread of the stream
+
+    The queue between is bounded by `size_max_bytes`.
+    `policy` defines what happens if the worker falls behind, see QueuePolicy.
+    After a `Gap`, the following samples are not contiguous: `out.restart()` restarts the
+    filters of all stages, the averaged densities are kept.
+    If the worker thread stops, `put()` raises.
     """
 
     def __init__(
@@ -69,25 +274,40 @@ class InThread:  # pylint: disable=too-many-instance-attributes
         out,
         dt_s,
         func_convert,
-        filename_capture_raw: pathlib.Path | None,
+        capture_raw: library_capture_raw.CaptureRawWriter | None,
         duration_s=None,
+        policy: QueuePolicy = QueuePolicy.BLOCK,
+        size_max_bytes: int = SIZE_MAX_BYTES,
+        spill: library_capture_raw.CaptureRawWriter | None = None,
     ):
+        assert isinstance(capture_raw, library_capture_raw.CaptureRawWriter | None)
+        assert isinstance(spill, library_capture_raw.CaptureRawWriter | None)
         self.out = out
         self.dt_s = dt_s
-        self._f_capture_raw = None
-        if filename_capture_raw is not None:
-            self._f_capture_raw = filename_capture_raw.open("wb")
+        self._capture_raw = capture_raw
+        self._spill = spill
         self.done = False
         self.exitcode = ExitCode.OK
         self.__func_convert = func_convert
         self.thread = None
         self.__samples_processed = 0
-        self.__queue: queue.Queue = queue.Queue()
-        self.__queue_size = 0
-        self.__queue_size_max = SIZE_MAX_INT16 / 50  # 2%
+        self.__queue = ByteQueue(
+            size_max_bytes=size_max_bytes,
+            policy=policy,
+            func_spill=None if spill is None else self.__spill,
+        )
+        self.__queue_size_log = size_max_bytes // 50  # 2%
         self.out.init(stage=0, dt_s=dt_s)
         self.__progress = Progress(dt_s, duration_s)
-        self.__lock = threading.Lock()
+
+    @property
+    def metrics(self) -> QueueMetrics:
+        return self.__queue.metrics
+
+    def __spill(self, raw_data) -> None:
+        # Called by the producer thread
+        assert self._spill is not None
+        self._spill.append(self.__func_convert(raw_data))
 
     def worker(self):
         try:
@@ -95,18 +315,26 @@ class InThread:  # pylint: disable=too-many-instance-attributes
                 raw_data_in = self.__queue.get()
                 if isinstance(raw_data_in, ExitCode):
                     self.out.done()
-                    if self._f_capture_raw is not None:
-                        self._f_capture_raw.close()
+                    if self._capture_raw is not None:
+                        self._capture_raw.close()
+                    if self._spill is not None:
+                        self._spill.close()
+                    self.metrics.log(self.__queue.size_max_bytes)
                     break
+                if isinstance(raw_data_in, Gap):
+                    logger.warning(
+                        f"Queue full: {raw_data_in.samples} samples not processed ({self.__queue.policy}), restart the stages"
+                    )
+                    self.__samples_processed += raw_data_in.samples
+                    self.out.restart()
+                    continue
                 samples = len(raw_data_in)
-                with self.__lock:
-                    self.__queue_size -= samples
-                assert self.__queue_size >= 0
                 self.__samples_processed += samples
                 # logger.info('push: ', end='')
                 array_in = self.__func_convert(raw_data_in)
-                if self._f_capture_raw is not None:
-                    self._f_capture_raw.write(array_in.tobytes())
+                if self._capture_raw is not None:
+                    # The dtype of 'array_in' is stored in the header.
+                    self._capture_raw.append(array_in)
                     # Do NOT process data when dumping capture_raw.
                     continue
                 rc = self.out.push(array_in)
@@ -119,6 +347,9 @@ class InThread:  # pylint: disable=too-many-instance-attributes
             logger.exception(ex)
             self.exitcode = ExitCode.ERROR
             self.done = True
+        finally:
+            # Do not leave the producer blocked in 'put()'
+            self.__queue.close()
 
     def start(self):
         self.thread = threading.Thread(target=self.worker)
@@ -126,21 +357,22 @@ class InThread:  # pylint: disable=too-many-instance-attributes
 
     def put_EOF(self, exit_code: ExitCode) -> None:
         assert isinstance(exit_code, ExitCode)
-        self.__queue.put(exit_code)
-
-    def put(self, raw_data):
-        self.__queue.put(raw_data)
-        assert self.__queue_size >= 0
-        samples = len(raw_data)
-        with self.__lock:
-            self.__queue_size += samples
-        if self.__queue_size > self.__queue_size_max:
-            self.__queue_size_max = min(int(1.5 * self.__queue_size), SIZE_MAX_INT16)
+        self.__queue.put_EOF(exit_code)
+
+    def put(self, raw_data) -> bool:
+        """
+        Return True if the queue was full and data was dropped or spilled.
+        """
+        full = self.__queue.put(raw_data)
+        queue_bytes = self.__queue.bytes
+        if queue_bytes > self.__queue_size_log:
+            self.__queue_size_log = min(
+                int(1.5 * queue_bytes), self.__queue.size_max_bytes
+            )
             logger.info(
-                f"Size of queue used: {100.0 * self.__queue_size / SIZE_MAX_INT16:.0f}%"
+                f"Size of queue used: {100.0 * queue_bytes / self.__queue.size_max_bytes:.0f}%"
             )
-        # Return True if queue is full
-        return self.__queue_size > SIZE_MAX_INT16
+        return full
 
     def join(self):
         self.thread.join()
@@ -37,6 +37,10 @@ class Settle:  # pylint: disable=too-many-instance-attributes
     def init(self, stage, dt_s):
         self.__dt_s = dt_s
 
+    def restart(self) -> None:
+        # Settling only checks the range of the samples: A gap does not matter.
+        pass
+
     def done(self):
         ExitCode.ERROR_INPUT_NOT_SETTLE.os_exit(
             msg="Settling: The input voltage did not settle!"
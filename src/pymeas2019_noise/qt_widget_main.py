@@ -53,6 +53,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.statusbar.addWidget(QtWidgets.QLabel("Status", self.centralwidget))
         self.label_status_text = QtWidgets.QLabel("-", self.centralwidget)
         self.statusbar.addWidget(self.label_status_text, 1)
+        self.progress_bar_loading = QtWidgets.QProgressBar(self.centralwidget)
+        self.progress_bar_loading.setFormat("Loading topics %v/%m")
+        self.progress_bar_loading.hide()
+        self.statusbar.addPermanentWidget(self.progress_bar_loading)
 
         self.verticalLayout_centralwidget.addWidget(self.plotpanel)
 
@@ -70,6 +74,17 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         self.on_button_reload_topic()
 
+        # The topics are loaded in the background: Show them as they arrive.
+        self._list_topics_displayed = list(self._plot_context.plot_data.list_topics)
+        self.timer_loading = QTimer(self)
+        self.timer_loading.timeout.connect(self.on_timer_loading)
+        self.timer_loading.start(200)
+
+    def closeEvent(self, event) -> None:  # noqa: N802
+        self.timer_loading.stop()
+        self.plotpanel.stop_refresh()
+        super().closeEvent(event)
+
     def _connect_signals(self) -> None:
         self.button_start.clicked.connect(self.on_start)
         self.button_stop.clicked.connect(self.on_stop)
@@ -136,6 +151,22 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.button_skip_settle.setEnabled(is_measurement_running)
         self.label_status_text.setText(FILELOCK_GUI.get_status())
 
+    def on_timer_loading(self) -> None:
+        plot_data = self._plot_context.plot_data
+        self._plot_context.poll_loading()
+        if plot_data.loader is None:
+            self.progress_bar_loading.hide()
+        else:
+            self.progress_bar_loading.setMaximum(plot_data.loader.count_total)
+            self.progress_bar_loading.setValue(plot_data.loader.count_loaded)
+            self.progress_bar_loading.show()
+
+        if self._list_topics_displayed != plot_data.list_topics:
+            self._list_topics_displayed = list(plot_data.list_topics)
+            self.on_button_reload_topic()
+            if not plot_data.loading:
+                plot_data.startup_duration.log("All topics loaded")
+
     def on_start(self, _checked: bool = False) -> None:
         color = self.combo_box_measurement_color.currentText()
         topic = self.text_ctrl_measurement_topic.text().strip()
@@ -152,6 +183,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         logger.debug(f"on_combo_box_presentation(): {self.presentation.title}")
         self._plot_context.set_presentation(self.presentation)
         self._plot_context.update_presentation()
+        self.plotpanel.canvas.draw_idle()
         self._enable_display_stage()
 
     def on_open_directory(self, _checked: bool = False) -> None:
@@ -1,11 +1,19 @@
 # pylint: disable=import-error,no-name-in-module
 import logging
+import pathlib
 import time
 import warnings
 from collections.abc import Callable
 from typing import Any, cast
 
-import matplotlib.animation
+from PySide6.QtCore import (
+    QFileSystemWatcher,
+    QObject,
+    QThread,
+    QTimer,
+    Signal,
+    Slot,
+)
 from PySide6.QtWidgets import QVBoxLayout, QWidget
 from matplotlib.backend_bases import MouseEvent
 from matplotlib.backends.backend_qt5agg import (
@@ -13,7 +21,7 @@ from matplotlib.backends.backend_qt5agg import (
     NavigationToolbar2QT as NavigationToolbar2QTAgg,
 )
 
-from . import library_plot
+from . import library_plot, library_topic
 
 # Hide messages about experimental matplotlib tool API.
 warnings.filterwarnings(action="ignore")
@@ -34,13 +42,85 @@ class PymeasNavigationToolbar2QTAgg(NavigationToolbar2QTAgg):
         super().home(*args)
 
 
+class QtFileWatcher(library_topic.FileWatcher):
+    """
+    QFileSystemWatcher uses the notifications of the operating system:
+    inotify on Linux, kqueue on macOS, ReadDirectoryChangesW on Windows.
+    Lives in the GUI thread.
+    """
+
+    def __init__(
+        self,
+        topdir: pathlib.Path,
+        parent: QObject,
+        on_changed: Callable[[], None],
+    ):
+        super().__init__(topdir)
+        self.__on_changed = on_changed
+        self.__watcher = QFileSystemWatcher(parent)
+        self.__watcher.addPath(str(topdir))
+        self.__watcher.directoryChanged.connect(self.__on_directory_changed)
+
+    def close(self) -> None:
+        directories = self.__watcher.directories()
+        if len(directories) > 0:
+            self.__watcher.removePaths(directories)
+
+    def _watch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        self.__watcher.addPath(str(dir_raw))
+
+    def _unwatch_dir_raw(self, dir_raw: pathlib.Path) -> None:
+        self.__watcher.removePath(str(dir_raw))
+
+    def __on_directory_changed(self, path: str) -> None:
+        # Only the directory is reported, not the file.
+        # A 'result_summary.npz' written by the condense will cause
+        # an additional refresh which finds nothing to do.
+        directory = pathlib.Path(path)
+        with self._lock:
+            if directory == self.topdir:
+                self._topdir_changed = True
+            elif directory in self._dir_raws:
+                self._dir_raws_changed.add(directory)
+        self.__on_changed()
+
+
+class RefreshWorker(QObject):
+    """
+    Lives in a QThread: Checks for changes, reloads the summaries
+    and calculates the plot data. The GUI thread is not blocked.
+    """
+
+    refreshed = Signal(object)
+
+    @Slot(object)
+    def refresh(self, request: library_plot.RefreshRequest) -> None:
+        result: library_plot.RefreshResult | None = None
+        try:
+            result = library_plot.PlotContext.refresh(request)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(e)
+        # Always answer: The GUI thread waits for the result before the next request.
+        self.refreshed.emit(result)
+
+
 class PlotPanel(QWidget):
+    request_refresh = Signal(object)
+
     def __init__(self, plot_context: library_plot.PlotContext, parent: QWidget | None):
         super().__init__(parent)
         self._plot_context = plot_context
         self._plot_context: library_plot.PlotContext
-        self.animation: matplotlib.animation.FuncAnimation | None = None
+        self.timer: QTimer | None = None
         self.canvas_last_resize_s: float | None = None
+        self._refresh_pending = False
+        self._refresh_thread = QThread(self)
+        self._refresh_worker = RefreshWorker()
+        self._refresh_worker.moveToThread(self._refresh_thread)
+        self._refresh_thread.finished.connect(self._refresh_worker.deleteLater)
+        # Queued connections: The receiver lives in the other thread.
+        self.request_refresh.connect(self._refresh_worker.refresh)
+        self._refresh_worker.refreshed.connect(self._on_refreshed)
 
         self.canvas = FigureCanvasQTAgg(self._plot_context.fig)
         self.toolbar = PymeasNavigationToolbar2QTAgg(self.canvas, self, plot_context)
@@ -63,27 +143,64 @@ class PlotPanel(QWidget):
     def init_plot_data(self) -> None:
         self.toolbar.update()
 
-        self._plot_context.plot_data.startup_duration.log("FuncAnimation() - before")
-        self.animation = matplotlib.animation.FuncAnimation(
-            fig=self._plot_context.fig,
-            func=cast(Callable[[Any], Any], self.animate),
-            frames=None,
-            interval=1000,
-            init_func=None,
-            repeat=False,
-        )
-        self._plot_context.plot_data.startup_duration.log("FuncAnimation() - after")
+        plot_data = self._plot_context.plot_data
+        if isinstance(plot_data, library_topic.PlotDataMultipleDirectories):
+            plot_data.set_file_watcher(
+                QtFileWatcher(
+                    topdir=plot_data.topdir, parent=self, on_changed=self.animate
+                )
+            )
+
+        self._refresh_thread.start()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.animate)
+        self.timer.start(1000)
+        self._plot_context.plot_data.startup_duration.log("Refresh thread started")
 
         self._plot_context.update_presentation()
+        self.canvas.draw_idle()
+
+    def stop_refresh(self) -> None:
+        """
+        Has to be called before the application exits.
+        """
+        if self.timer is not None:
+            self.timer.stop()
+        self._refresh_thread.quit()
+        self._refresh_thread.wait()
 
-    def animate(self, _frame: Any) -> None:
+    def animate(self) -> None:
         """
-        This will be called by a timer
+        This will be called by a timer and if files changed.
+        The changed data is calculated by the 'RefreshWorker'.
         """
         if self.canvas_last_resize_s is not None:
             if self.canvas_last_resize_s + 0.5 < time.monotonic():
                 logger.info("matplotlib-canvas: delayed resize")
+                self._plot_context.update_level_of_detail()
                 self.canvas.draw_idle()
                 self.canvas_last_resize_s = None
 
-        self._plot_context.animate()
+        self._plot_context.poll_loading()
+
+        if self._plot_context.update_presentation_if_invalid():
+            self.canvas.draw_idle()
+            return
+
+        if self._refresh_pending:
+            # The worker is still busy with the previous request.
+            return
+        request = self._plot_context.refresh_request()
+        if request is None:
+            # Nothing changed
+            return
+        self._refresh_pending = True
+        self.request_refresh.emit(request)
+
+    @Slot(object)
+    def _on_refreshed(self, result: library_plot.RefreshResult | None) -> None:
+        self._refresh_pending = False
+        if result is None:
+            return
+        if self._plot_context.apply_refresh(result):
+            self._plot_context.blit_lines()
@@ -28,6 +28,7 @@ def main():
         topdir=directory_cwd,
         plot_config=plot_config,
         presentations=presentations,
+        wait=False,
     )
 
     plot_context = library_plot.PlotContext(
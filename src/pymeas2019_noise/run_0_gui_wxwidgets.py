@@ -16,6 +16,7 @@ def main():
         topdir=directory_cwd,
         plot_config=plot_config,
         presentations=presentations,
+        file_watcher=library_topic.create_file_watcher(directory_cwd),
     )
 
     plot_context = library_plot.PlotContext(
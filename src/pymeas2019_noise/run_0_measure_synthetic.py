@@ -84,6 +84,7 @@ def main():
         sp.output, signal=signal, dt_s=DT_S, time_total_s=config.duration_s
     )
     i.process()
+    sp.close()
     logger.info("Done")
 
 
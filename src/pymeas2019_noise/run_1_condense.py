@@ -1,8 +1,15 @@
+import functools
 import logging
 import pathlib
 import sys
 
-from . import library_logger, program, run_2_composite_plots
+from . import (
+    library_jobs,
+    library_logger,
+    library_render,
+    program,
+    run_2_composite_plots,
+)
 
 logger = logging.getLogger("logger")
 
@@ -14,41 +21,78 @@ def reload_if_changed(dir_raw):
     return program.reload_if_changed(dir_raw=dir_raw, plot_config=plot_config)
 
 
-def doit(dir_measurement: pathlib.Path):
+def condense_dir_raw(dir_raw: pathlib.Path, force: bool = False) -> None:
+    """
+    Runs in a worker process: The plot config is loaded in the worker.
+    The directories are already processed in parallel: Render in the worker.
+    """
     import config_plot
 
     plot_config = config_plot.get_plot_config()
+    program.run_condense_dir_raw(
+        dir_raw=dir_raw,
+        plot_config=plot_config,
+        renderer=library_render.Renderer(jobs=1),
+        force=force,
+    )
+
 
-    if len(sys.argv) > 1:
-        dir_raw = sys.argv[1]
+def doit(
+    dir_measurement: pathlib.Path,
+    jobs: int = 1,
+    dir_raw: str | None = None,
+    force: bool = False,
+):
+    """
+    force: Condense all directories, even if the densitysteps did not change.
+    """
+    import config_plot
+
+    plot_config = config_plot.get_plot_config()
+
+    if dir_raw is not None:
         if dir_raw == "TOPONLY":
             logger.info(
                 f"Argument '{dir_raw}': run_2_composite_plots.run('{dir_measurement}')"
             )
-            run_2_composite_plots.main(dir_measurement=dir_measurement)
+            run_2_composite_plots.main(dir_measurement=dir_measurement, force=force)
             return
         logger.info(
             f"Argument '{dir_raw}': program.run_condense_dir_raw('{dir_measurement / dir_raw}')"
         )
         program.run_condense_dir_raw(
-            dir_raw=dir_measurement / dir_raw, plot_config=plot_config
+            dir_raw=dir_measurement / dir_raw, plot_config=plot_config, force=force
         )
         return
 
     logger.info(f"No arguments': run_condense('{dir_measurement}')")
-    program.run_condense(
-        dir_measurement=dir_measurement, plot_config=plot_config, skip_on_error=True
-    )
-    run_2_composite_plots.main(dir_measurement=dir_measurement)
+    if jobs > 1:
+        skipped = library_jobs.map_dir_raw(
+            func=functools.partial(condense_dir_raw, force=force),
+            dir_raws=list(program.iter_dir_raw(dir_measurement)),
+            jobs=jobs,
+            directory_logger=dir_measurement,
+            logger_name="logger_condense",
+            skip_on_error=True,
+        )
+        library_jobs.log_skipped(skipped)
+    else:
+        program.run_condense(
+            dir_measurement=dir_measurement,
+            plot_config=plot_config,
+            skip_on_error=True,
+            force=force,
+        )
+    run_2_composite_plots.main(dir_measurement=dir_measurement, force=force)
 
 
-def main():
+def main(jobs: int = 1, dir_raw: str | None = None, force: bool = False):
     dir_measurement = pathlib.Path.cwd()
 
     library_logger.init_logger_condense(dir_measurement)
 
-    doit(dir_measurement=dir_measurement)
+    doit(dir_measurement=dir_measurement, jobs=jobs, dir_raw=dir_raw, force=force)
 
 
 if __name__ == "__main__":
-    main()
+    main(dir_raw=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,24 @@
+import logging
+import pathlib
+
+from . import library_logger, program
+
+logger = logging.getLogger("logger")
+
+
+def doit(dir_measurement: pathlib.Path) -> None:
+    for dir_raw in program.iter_dir_raw(dir_measurement):
+        count = program.migrate_dir_raw(dir_raw)
+        if count > 0:
+            logger.info(f"{dir_raw.name}: {count} files migrated")
+
+
+def main():
+    dir_measurement = pathlib.Path.cwd()
+
+    library_logger.init_logger_condense(dir_measurement)
+    doit(dir_measurement=dir_measurement)
+
+
+if __name__ == "__main__":
+    main()
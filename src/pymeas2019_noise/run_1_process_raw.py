@@ -3,12 +3,12 @@ import pathlib
 from . import library_logger, run_1_condense, run_1_process_raw_0
 
 
-def main():
+def main(jobs: int = 1, force: bool = False):
     dir_measurement = pathlib.Path.cwd()
 
     library_logger.init_logger_condense(dir_measurement)
-    run_1_process_raw_0.doit(dir_measurement=dir_measurement)
-    run_1_condense.doit(dir_measurement=dir_measurement)
+    run_1_process_raw_0.doit(dir_measurement=dir_measurement, jobs=jobs, force=force)
+    run_1_condense.doit(dir_measurement=dir_measurement, jobs=jobs, force=force)
 
 
 if __name__ == "__main__":
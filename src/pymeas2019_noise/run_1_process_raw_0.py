@@ -2,9 +2,12 @@ import logging
 import pathlib
 
 from . import (
+    library_filelock,
+    library_jobs,
     library_logger,
-    library_topic,
+    library_manifest,
     program,
+    program_fir_plot,
     program_instrument_capture_raw,
 )
 from .program_configsetup import ConfigSetup
@@ -23,27 +26,79 @@ def patch_configsetup(configsetup) -> ConfigSetup:
     return configsetup
 
 
-def doit(dir_measurement: pathlib.Path):
+def process_dir_raw(dir_raw: pathlib.Path) -> None:
+    """
+    May run in a worker process: The config is loaded in the worker.
+    """
     import config_measurement
 
     configsetup = patch_configsetup(config_measurement.get_configsetup())
+    configsetup.measure(dir_measurement=dir_raw.parent, dir_raw=dir_raw, do_exit=False)
 
+
+def doit(dir_measurement: pathlib.Path, jobs: int = 1, force: bool = False):
+    """
+    force: Process all directories, even if the raw captures did not change.
+    """
+    import config_measurement
+
+    fingerprint = library_manifest.fingerprint(
+        patch_configsetup(config_measurement.get_configsetup())
+    )
+    stamps: dict[pathlib.Path, dict] = {}
+    dir_raws = []
     for dir_raw in program.iter_dir_raw(dir_measurement=dir_measurement):
-        try:
-            pickles = list(dir_raw.glob("densitystep_*.pickle"))
-            if len(pickles) > 0:
+        manifest = library_manifest.Manifest(dir_raw)
+        stamp = manifest.stamp(sorted(dir_raw.glob("capture_raw_*.raw")))
+        if not force:
+            if manifest.is_up_to_date(
+                library_manifest.STEP_PROCESS_RAW, stamp, fingerprint
+            ):
                 logger.info(
-                    f"directory '{dir_raw.name}' already processed: processing SKIPPED"
+                    f"directory '{dir_raw.name}': raw captures unchanged: processing SKIPPED"
                 )
                 continue
-            configsetup.measure(
-                dir_measurement=dir_measurement, dir_raw=dir_raw, do_exit=False
-            )
-        except library_topic.FrequencyNotFound as e:
-            if skip_on_error:
-                logger.warning(f"SKIPPED: {e}")
-                continue
-            raise
+            if not manifest.has_step(library_manifest.STEP_PROCESS_RAW):
+                densitysteps = list(
+                    program_fir_plot.DensityPlot.files_from_directory(
+                        dir_input=dir_raw, skip=False
+                    )
+                )
+                if len(densitysteps) > 0:
+                    # Processed by a previous version without manifest
+                    logger.info(
+                        f"directory '{dir_raw.name}' already processed: processing SKIPPED (use --force to process again)"
+                    )
+                    continue
+        stamps[dir_raw] = stamp
+        dir_raws.append(dir_raw)
+
+    if jobs > 1:
+        # This process holds the lock for all workers.
+        library_filelock.FilelockMeasurement()
+
+    skipped = library_jobs.map_dir_raw(
+        func=process_dir_raw,
+        dir_raws=dir_raws,
+        jobs=jobs,
+        directory_logger=dir_measurement,
+        logger_name="logger_condense",
+        skip_on_error=skip_on_error,
+        func_init_worker=library_filelock.FilelockMeasurement.init_worker,
+    )
+    library_jobs.log_skipped(skipped)
+
+    for dir_raw in dir_raws:
+        if dir_raw.name in skipped:
+            continue
+        library_manifest.Manifest(dir_raw).update(
+            library_manifest.STEP_PROCESS_RAW,
+            stamps[dir_raw],
+            fingerprint,
+            outputs=program_fir_plot.DensityPlot.files_from_directory(
+                dir_input=dir_raw, skip=False
+            ),
+        )
 
     # logger.info("Now process as 'run_1_condense.py'!")
     # plot_config = config_plot.get_plot_config()
@@ -1,12 +1,15 @@
 import logging
 import pathlib
 
-from . import library_logger, library_plot, library_topic
+from . import library_logger, library_manifest, library_plot, library_topic
 
 logger = logging.getLogger("logger")
 
 
-def main(dir_measurement):
+def main(dir_measurement, force: bool = False):
+    """
+    force: Plot, even if the summaries of the topics did not change.
+    """
     import config_measurement
     import config_plot
 
@@ -24,7 +27,25 @@ def main(dir_measurement):
         write_files_directory=dir_measurement,
         title=config_measurement.TITLE,
     )
-    plot_file.plot_presentations()
+    manifest = library_manifest.Manifest(dir_measurement)
+    stamp = manifest.stamp(
+        library_topic.PickleResultSummary.filename(dir_raw)
+        for dir_raw in library_topic.read_directories(dir_measurement)
+        if library_topic.PickleResultSummary.filename(dir_raw).exists()
+    )
+    fingerprint = library_manifest.fingerprint(plot_config, config_measurement.TITLE)
+    if (not force) and manifest.is_up_to_date(
+        library_manifest.STEP_COMPOSITE_PLOTS, stamp, fingerprint
+    ):
+        logger.info("Summaries unchanged: composite plots SKIPPED")
+    else:
+        plot_file.plot_presentations()
+        manifest.update(
+            library_manifest.STEP_COMPOSITE_PLOTS,
+            stamp,
+            fingerprint,
+            outputs=dir_measurement.glob("result_*.png"),
+        )
 
     try:
         import library_1_postprocess
@@ -0,0 +1,183 @@
+"""
+The policies of 'ByteQueue' and the handling of a stopped worker thread
+and of a 'Gap' in 'InThread'.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise.library_filelock import ExitCode
+from pymeas2019_noise.program_measurement_stream import (
+    ByteQueue,
+    Gap,
+    InThread,
+    QueuePolicy,
+)
+
+
+def array(samples: int, value: float = 0.0) -> np.ndarray:
+    return np.full(samples, value, dtype=np.float64)
+
+
+def test_block_waits_for_get():
+    queue = ByteQueue(size_max_bytes=8 * 10, policy=QueuePolicy.BLOCK)
+    assert not queue.put(array(8))
+
+    def get_later():
+        time.sleep(0.2)
+        queue.get()
+
+    thread = threading.Thread(target=get_later)
+    thread.start()
+    assert not queue.put(array(8))
+    thread.join()
+    assert queue.bytes == 8 * 8
+    assert queue.metrics.blocked_s > 0.1
+
+
+def test_block_accepts_large_array_into_empty_queue():
+    queue = ByteQueue(size_max_bytes=8, policy=QueuePolicy.BLOCK)
+    assert not queue.put(array(100))
+    assert len(queue.get()) == 100
+
+
+def test_drop_oldest():
+    queue = ByteQueue(size_max_bytes=8 * 10, policy=QueuePolicy.DROP_OLDEST)
+    assert not queue.put(array(4, 1.0))
+    assert not queue.put(array(4, 2.0))
+    assert queue.put(array(4, 3.0))
+    assert queue.put(array(4, 4.0))
+    queue.put_EOF(ExitCode.OK)
+
+    # The dropped arrays are merged into one gap
+    assert queue.get() == Gap(samples=8)
+    assert queue.get()[0] == 3.0
+    assert queue.get()[0] == 4.0
+    assert queue.get() == ExitCode.OK
+    assert queue.metrics.samples_dropped == 8
+
+
+def test_spill():
+    spilled = []
+    queue = ByteQueue(
+        size_max_bytes=8 * 10, policy=QueuePolicy.SPILL, func_spill=spilled.append
+    )
+    assert not queue.put(array(8, 1.0))
+    assert queue.put(array(4, 2.0))
+    assert queue.put(array(4, 3.0))
+
+    assert queue.get()[0] == 1.0
+    assert queue.get() == Gap(samples=8)
+    assert [a[0] for a in spilled] == [2.0, 3.0]
+    assert queue.metrics.samples_spilled == 8
+
+
+def test_nbytes_of_a_list():
+    queue = ByteQueue(size_max_bytes=8 * 10, policy=QueuePolicy.DROP_OLDEST)
+    assert not queue.put([1.0] * 8)
+    assert queue.bytes == 8 * 8
+    assert queue.get() == [1.0] * 8
+    assert queue.bytes == 0
+
+
+def test_close_releases_blocked_put():
+    queue = ByteQueue(size_max_bytes=8 * 10, policy=QueuePolicy.BLOCK)
+    queue.put(array(8))
+
+    def close_later():
+        time.sleep(0.2)
+        queue.close()
+
+    thread = threading.Thread(target=close_later)
+    thread.start()
+    with pytest.raises(Exception, match="worker thread stopped"):
+        queue.put(array(8))
+    thread.join()
+
+    with pytest.raises(Exception, match="worker thread stopped"):
+        queue.put(array(1))
+    # The worker is gone: EOF is ignored
+    queue.put_EOF(ExitCode.OK)
+
+
+class OutRecorder:
+    """
+    A Stream-Interface which records the calls.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls: list[str] = []
+
+    def init(self, stage, dt_s):
+        self.calls.append("init")
+
+    def push(self, array_in):
+        if self.fail:
+            raise ValueError("Calculation failed")
+        self.calls.append(f"push {len(array_in)}")
+
+    def restart(self):
+        self.calls.append("restart")
+
+    def done(self):
+        self.calls.append("done")
+
+
+def in_thread(out, policy, size_max_bytes) -> InThread:
+    return InThread(
+        out,
+        dt_s=0.01,
+        func_convert=np.asarray,
+        capture_raw=None,
+        duration_s=1.0,
+        policy=policy,
+        size_max_bytes=size_max_bytes,
+    )
+
+
+def test_in_thread_put_raises_if_worker_died():
+    i = in_thread(OutRecorder(fail=True), QueuePolicy.BLOCK, size_max_bytes=8 * 10)
+    i.start()
+    i.put(array(8))
+    i.join()
+    assert i.exitcode == ExitCode.ERROR
+
+    with pytest.raises(Exception, match="worker thread stopped"):
+        i.put(array(8))
+
+
+def test_in_thread_gap_restarts_stages():
+    out = OutRecorder()
+    i = in_thread(out, QueuePolicy.DROP_OLDEST, size_max_bytes=8 * 10)
+    # Fill the queue before the worker runs
+    i.put(array(4))
+    i.put(array(4))
+    assert i.put(array(4))
+    i.put_EOF(ExitCode.OK)
+    i.start()
+    i.join()
+
+    assert out.calls == ["init", "restart", "push 4", "push 4", "done"]
+
+
+def test_spill_does_not_block_get():
+    queue: ByteQueue
+
+    def func_spill(raw_data):
+        # The worker thread gets the queued data while spilling
+        thread = threading.Thread(target=lambda: got.append(queue.get()))
+        thread.start()
+        thread.join(timeout=2.0)
+        assert not thread.is_alive()
+
+    got = []
+    queue = ByteQueue(
+        size_max_bytes=8 * 10, policy=QueuePolicy.SPILL, func_spill=func_spill
+    )
+    queue.put(array(8, 1.0))
+    assert queue.put(array(4, 2.0))
+    assert got[0][0] == 1.0
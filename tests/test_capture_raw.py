@@ -0,0 +1,68 @@
+"""
+'capture_raw_*.raw': Only supported dtypes are written and read.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import library_capture_raw
+
+
+def test_roundtrip(tmp_path):
+    filename = tmp_path / "capture_raw_slow.raw"
+    writer = library_capture_raw.CaptureRawWriter(
+        filename, dt_s=0.5, stepname="slow", skalierungsfaktor=1.0
+    )
+    writer.append(np.arange(5, dtype=np.float32))
+    writer.close()
+    reader = library_capture_raw.CaptureRawReader(filename)
+    assert reader.dtype == np.float32
+    assert reader.array.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_writer_rejects_unsupported_dtype(tmp_path):
+    writer = library_capture_raw.CaptureRawWriter(
+        tmp_path / "capture_raw_slow.raw",
+        dt_s=0.5,
+        stepname="slow",
+        skalierungsfaktor=1.0,
+    )
+    with pytest.raises(Exception, match="Unsupported dtype"):
+        writer.append(np.arange(5, dtype=np.int16))
+
+
+def test_reader_rejects_unsupported_dtype(tmp_path):
+    filename = tmp_path / "capture_raw_slow.raw"
+    header = library_capture_raw.MAGIC + json.dumps(
+        {"dtype": "<i2", "dt_s": 0.5, "stepname": "slow", "skalierungsfaktor": 1.0}
+    ).encode("ascii")
+    filename.write_bytes(
+        header.ljust(library_capture_raw.HEADER_SIZE, b" ") + b"\0" * 8
+    )
+    with pytest.raises(Exception, match="Unsupported dtype"):
+        library_capture_raw.CaptureRawReader(filename)
+
+
+def test_legacy_float32(tmp_path):
+    filename = tmp_path / "capture_raw_slow.raw"
+    filename.write_bytes(np.arange(10, dtype=np.float32).tobytes())
+    reader = library_capture_raw.CaptureRawReader(filename)
+    assert reader.dtype == np.float32
+    assert reader.samples == 10
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"abcde",
+        np.full(8, np.nan, dtype=np.float32).tobytes(),
+        b"pymeas2019_noise capture_raw_v2\n" + b" " * 100,
+    ],
+)
+def test_legacy_rejects_garbage(tmp_path, content):
+    filename = tmp_path / "capture_raw_slow.raw"
+    filename.write_bytes(content)
+    with pytest.raises(Exception, match="header"):
+        library_capture_raw.CaptureRawReader(filename)
@@ -0,0 +1,60 @@
+"""
+'CascadeBoundary': The arrays queued for the worker thread are bounded.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import program_fir
+
+
+class SlowOut:
+    """
+    A Stream-Interface which calculates slower than the arrays are pushed.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.pushed = 0
+        self.event = threading.Event()
+
+    def init(self, stage, dt_s, prev):
+        pass
+
+    def push(self, array_in):
+        self.event.wait()
+        if self.fail:
+            raise ValueError("Calculation failed")
+        time.sleep(0.001)
+        self.pushed += 1
+
+
+def test_push_waits_if_full(monkeypatch):
+    monkeypatch.setattr(program_fir, "CASCADE_BOUNDARY_ARRAYS_MAX", 4)
+    out = SlowOut()
+    boundary = program_fir.CascadeBoundary(out, stages=[])
+    boundary.init(stage=0, dt_s=1.0, prev=None)
+    for _ in range(4):
+        boundary.push(np.zeros(1))
+
+    threading.Timer(0.2, out.event.set).start()
+    for _ in range(20):
+        boundary.push(np.zeros(1))
+    boundary.close()
+    assert out.pushed == 24
+    assert boundary.statistics_waited_s > 0.1
+
+
+def test_push_raises_if_worker_failed(monkeypatch):
+    monkeypatch.setattr(program_fir, "CASCADE_BOUNDARY_ARRAYS_MAX", 4)
+    monkeypatch.setattr(program_fir, "CASCADE_BOUNDARY_WAIT_S", 0.05)
+    out = SlowOut(fail=True)
+    boundary = program_fir.CascadeBoundary(out, stages=[])
+    boundary.init(stage=0, dt_s=1.0, prev=None)
+    out.event.set()
+    with pytest.raises(Exception, match="worker thread failed"):
+        for _ in range(10):
+            boundary.push(np.zeros(1))
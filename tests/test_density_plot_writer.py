@@ -0,0 +1,47 @@
+"""
+'DensityPlotWriter': A snapshot which failed to be written must not be lost silently.
+"""
+
+import pathlib
+
+import pytest
+
+from pymeas2019_noise import program_fir_plot
+
+
+class FailingWrite:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.written: list[tuple[pathlib.Path, dict]] = []
+
+    def __call__(self, filename, data):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.written.append((filename, data))
+
+
+def test_failed_snapshot_is_retried_on_close():
+    func_write = FailingWrite(failures=1)
+    writer = program_fir_plot.DensityPlotWriter(interval_s=100.0, func_write=func_write)
+    writer.put(pathlib.Path("densitystep_a.npz"), {"v": 1})
+    writer.close()
+    assert func_write.written == [(pathlib.Path("densitystep_a.npz"), {"v": 1})]
+
+
+def test_failed_final_snapshot_raises():
+    func_write = FailingWrite(failures=2)
+    writer = program_fir_plot.DensityPlotWriter(interval_s=100.0, func_write=func_write)
+    writer.put(pathlib.Path("densitystep_a.npz"), {"v": 1})
+    with pytest.raises(OSError):
+        writer.close()
+
+
+def test_newer_snapshot_replaces_failed():
+    func_write = FailingWrite(failures=1)
+    writer = program_fir_plot.DensityPlotWriter(interval_s=0.0, func_write=func_write)
+    writer.put(pathlib.Path("densitystep_a.npz"), {"v": 1})
+    writer.flush()
+    writer.put(pathlib.Path("densitystep_a.npz"), {"v": 2})
+    writer.close()
+    assert func_write.written[-1] == (pathlib.Path("densitystep_a.npz"), {"v": 2})
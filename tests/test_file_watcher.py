@@ -0,0 +1,41 @@
+"""
+'PollingFileWatcher' only reports changes if a directory or a densitystep changed.
+"""
+
+from pymeas2019_noise.library_topic import PollingFileWatcher
+
+
+def test_polling_file_watcher(tmp_path):
+    dir_raw = tmp_path / "raw-a"
+    dir_raw.mkdir()
+    watcher = PollingFileWatcher(tmp_path)
+    watcher.watch([dir_raw])
+
+    # A new directory is reported as changed
+    assert watcher.changes_pending([dir_raw])
+    assert not watcher.directories_changed()
+    assert watcher.pop_changed([dir_raw]) == {dir_raw}
+    assert not watcher.changes_pending([dir_raw])
+
+    # Not a densitystep
+    (dir_raw / "result_summary.npz").write_bytes(b"summary")
+    assert not watcher.changes_pending([dir_raw])
+
+    filename = dir_raw / "densitystep_a_00.npz"
+    filename.write_bytes(b"1")
+    assert watcher.changes_pending([dir_raw])
+    assert watcher.pop_changed([dir_raw]) == {dir_raw}
+    assert not watcher.changes_pending([dir_raw])
+
+    filename.write_bytes(b"22")
+    assert watcher.changes_pending([dir_raw])
+    assert watcher.pop_changed([dir_raw]) == {dir_raw}
+
+    # A new 'raw-*' directory
+    (tmp_path / "raw-b").mkdir()
+    assert watcher.changes_pending([dir_raw])
+    assert watcher.directories_changed()
+    watcher.watch([dir_raw, tmp_path / "raw-b"])
+    watcher.pop_changed([dir_raw, tmp_path / "raw-b"])
+    assert not watcher.directories_changed()
+    assert not watcher.changes_pending([dir_raw, tmp_path / "raw-b"])
@@ -0,0 +1,63 @@
+"""
+Regression test: The streaming decimation ('DECIMATE_STREAMING') has to
+deliver the same samples as 'scipy.signal.decimate()' on every block
+of 'previous_fir_samples_input', the previous implementation.
+"""
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import program_fir
+
+
+class OutCollect:
+    """
+    The stage after the FIR: Collects the decimated samples.
+    """
+
+    def __init__(self):
+        self.arrays: list[np.ndarray] = []
+
+    def init(self, stage, dt_s, prev):
+        pass
+
+    def push(self, array_in):
+        if array_in is None:
+            return ""
+        self.arrays.append(array_in.copy())
+        return None
+
+
+def decimate(monkeypatch, streaming: bool, dt_s: float, arrays: list) -> np.ndarray:
+    monkeypatch.setattr(program_fir, "DECIMATE_STREAMING", streaming)
+    out = OutCollect()
+    fir = program_fir.FIR(out)
+    fir.init(stage=0, dt_s=dt_s, prev=None)
+    for array in arrays:
+        fir.push(array)
+        while fir.ready():
+            fir.calculate()
+    return np.concatenate(out.arrays)
+
+
+@pytest.mark.parametrize("dt_s", [1e-4, 1.0])
+def test_streaming_equals_scipy(monkeypatch, dt_s):
+    push_size_samples = program_fir.PushCalculator(dt_s).push_size_samples
+    rng = np.random.default_rng(0)
+    t = np.arange(20 * push_size_samples)
+    signal = np.sin(t / 50.0) + 0.1 * rng.standard_normal(len(t))
+    arrays = np.split(signal, 20)
+
+    decimated_scipy = decimate(monkeypatch, streaming=False, dt_s=dt_s, arrays=arrays)
+    decimated_streaming = decimate(
+        monkeypatch, streaming=True, dt_s=dt_s, arrays=arrays
+    )
+
+    # The streaming decimation does not wait for SAMPLES_RIGHT: It may have more blocks.
+    assert len(decimated_streaming) >= len(decimated_scipy) > 0
+    np.testing.assert_allclose(
+        decimated_streaming[: len(decimated_scipy)],
+        decimated_scipy,
+        rtol=program_fir.DECIMATE_CROSSCHECK_RTOL,
+        atol=program_fir.DECIMATE_CROSSCHECK_RTOL,
+    )
@@ -0,0 +1,75 @@
+"""
+'library_lod.envelope()': Every pixel column keeps its minimum and maximum.
+"""
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import library_lod
+
+
+def envelope_loop(x, y, x_min, x_max, columns, logarithmic):
+    """
+    Brute force: The minimum and maximum of every pixel column.
+    """
+    if logarithmic:
+        edges = np.geomspace(x_min, x_max, num=columns + 1)
+    else:
+        edges = np.linspace(x_min, x_max, num=columns + 1)
+    column = np.searchsorted(edges[1:-1], x, side="right")
+    inside = (x >= x_min) & (x <= x_max)
+    return {
+        (
+            int(c),
+            float(y[inside & (column == c)].min()),
+            float(y[inside & (column == c)].max()),
+        )
+        for c in np.unique(column[inside])
+    }
+
+
+@pytest.mark.parametrize("logarithmic", [False, True])
+@pytest.mark.parametrize("view", [(1.0, 1e5), (2e3, 3e3)])
+def test_envelope(logarithmic, view):
+    rng = np.random.default_rng(0)
+    x = np.arange(1.0, 1e5 + 1.0)
+    y = np.cumsum(rng.standard_normal(len(x)))
+    x_min, x_max = view
+    columns = 50
+
+    x_lod, y_lod = library_lod.envelope(
+        x, y, x_min=x_min, x_max=x_max, columns=columns, logarithmic=logarithmic
+    )
+    # Only samples of the series are returned, sorted.
+    assert np.all(np.diff(x_lod) > 0)
+    np.testing.assert_array_equal(y_lod, y[np.searchsorted(x, x_lod)])
+
+    # The samples beyond the border of the view are kept.
+    assert x_lod[0] <= x_min
+    assert x_lod[-1] >= x_max or x_lod[-1] == x[-1]
+
+    expected = envelope_loop(x, y, x_min, x_max, columns, logarithmic)
+    actual = envelope_loop(x_lod, y_lod, x_min, x_max, columns, logarithmic)
+    assert actual == expected
+    assert len(x_lod) <= 2 * columns + 4
+
+
+def test_short_series_unchanged():
+    x = np.arange(100.0)
+    y = np.sin(x)
+    x_lod, y_lod = library_lod.envelope(
+        x, y, x_min=0.0, x_max=99.0, columns=50, logarithmic=False
+    )
+    np.testing.assert_array_equal(x_lod, x)
+    np.testing.assert_array_equal(y_lod, y)
+
+
+def test_nan():
+    x = np.arange(10_000.0)
+    y = np.sin(x / 100.0)
+    y[5000:6000] = np.nan
+    x_lod, y_lod = library_lod.envelope(
+        x, y, x_min=0.0, x_max=9999.0, columns=20, logarithmic=False
+    )
+    assert np.nanmin(y_lod) == np.nanmin(y)
+    assert np.nanmax(y_lod) == np.nanmax(y)
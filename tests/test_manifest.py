@@ -0,0 +1,94 @@
+"""
+'library_manifest.Manifest': A step is skipped only if its inputs,
+parameters, version and outputs are unchanged.
+"""
+
+import dataclasses
+
+import pytest
+
+from pymeas2019_noise import library_manifest
+from pymeas2019_noise.library_manifest import Manifest, STEP_CONDENSE, fingerprint
+
+
+@pytest.fixture
+def done(tmp_path):
+    """
+    A directory with a condense step which is up to date.
+    """
+    filename_input = tmp_path / "densitystep_a_00.npz"
+    filename_input.write_bytes(b"input")
+    filename_output = tmp_path / "result_summary.npz"
+    filename_output.write_bytes(b"output")
+    manifest = Manifest(tmp_path)
+    manifest.updater(
+        STEP_CONDENSE,
+        manifest.stamp([filename_input]),
+        fingerprint("E12"),
+        func_outputs=lambda: [filename_output],
+    )()
+    return manifest, filename_input, filename_output
+
+
+def up_to_date(manifest, filename_input, parameter="E12") -> bool:
+    return Manifest(manifest.directory).is_up_to_date(
+        STEP_CONDENSE, manifest.stamp([filename_input]), fingerprint(parameter)
+    )
+
+
+def test_up_to_date(done):
+    manifest, filename_input, _ = done
+    assert manifest.has_step(STEP_CONDENSE)
+    assert not manifest.has_step(library_manifest.STEP_COMPOSITE_PLOTS)
+    assert up_to_date(manifest, filename_input)
+
+
+def test_input_changed(done):
+    manifest, filename_input, _ = done
+    filename_input.write_bytes(b"input changed")
+    assert not up_to_date(manifest, filename_input)
+
+
+def test_parameter_changed(done):
+    manifest, filename_input, _ = done
+    assert not up_to_date(manifest, filename_input, parameter="E24")
+
+
+def test_output_removed(done):
+    manifest, filename_input, filename_output = done
+    filename_output.unlink()
+    assert not up_to_date(manifest, filename_input)
+
+
+def test_version_changed(done, monkeypatch):
+    manifest, filename_input, _ = done
+    monkeypatch.setattr(library_manifest, "__version__", "0.0.0")
+    assert not up_to_date(manifest, filename_input)
+
+
+def test_corrupt_manifest(done):
+    manifest, filename_input, _ = done
+    manifest.filename.write_text("{ not json")
+    assert not up_to_date(manifest, filename_input)
+
+
+@dataclasses.dataclass
+class Config:
+    series: str
+    func: object
+
+
+def func_a(x):
+    return x
+
+
+def func_b(x):
+    return 2 * x
+
+
+def test_fingerprint():
+    assert fingerprint(Config("E12", func_a)) == fingerprint(Config("E12", func_a))
+    assert fingerprint(Config("E12", func_a)) != fingerprint(Config("E24", func_a))
+    # Functions are compared by their source code
+    assert fingerprint(Config("E12", func_a)) != fingerprint(Config("E12", func_b))
+    assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
@@ -0,0 +1,51 @@
+"""
+Regression test: The batched 'periodogram_sum()' has to return the same
+sum as 'scipy.signal.periodogram()' called for every segment.
+"""
+
+import numpy as np
+import pytest
+import scipy.signal
+
+from pymeas2019_noise import program_fir
+
+
+def periodogram_sum_loop(array, dt_s):
+    """
+    The previous implementation: One periodogram per segment.
+    """
+    step = program_fir.SAMPLES_DENSITY // program_fir.PERIODOGRAM_OVERLAP
+    Pxx_sum = 0.0
+    n = 0
+    for start in range(0, len(array) - program_fir.SAMPLES_DENSITY + 1, step):
+        frequencies, Pxx = scipy.signal.periodogram(
+            array[start : start + program_fir.SAMPLES_DENSITY],
+            1 / dt_s,
+            window="hamming",
+            detrend="linear",
+        )
+        Pxx_sum = Pxx_sum + Pxx
+        n += 1
+    return frequencies, Pxx_sum, n
+
+
+@pytest.mark.parametrize(
+    "samples",
+    [
+        program_fir.SAMPLES_DENSITY,
+        program_fir.SAMPLES_DENSITY + 1,
+        # More segments than 'DENSITY_BATCH_SEGMENTS'
+        20 * program_fir.SAMPLES_DENSITY + 123,
+    ],
+)
+def test_periodogram_sum(samples):
+    dt_s = 1e-5
+    rng = np.random.default_rng(0)
+    array = np.cumsum(rng.standard_normal(samples)) + 1e-3 * np.arange(samples)
+
+    frequencies, Pxx_sum, n = program_fir.periodogram_sum(array, dt_s)
+    frequencies_loop, Pxx_sum_loop, n_loop = periodogram_sum_loop(array, dt_s)
+
+    assert n == n_loop
+    np.testing.assert_allclose(frequencies, frequencies_loop, rtol=1e-12)
+    np.testing.assert_allclose(Pxx_sum, Pxx_sum_loop, rtol=1e-9)
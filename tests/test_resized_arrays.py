@@ -0,0 +1,66 @@
+"""
+Regression test: The vectorized 'ResizedArrays' has to match the same
+frequencies as the previous loop implementation.
+"""
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise.library_topic import ResizedArrays
+
+
+def resized_arrays_loop(f, base_f, d, base_d):
+    """
+    The previous implementation of 'ResizedArrays.__init__()'.
+    """
+    new_f = np.zeros(len(f), dtype=np.float32)
+    new_d = np.zeros(len(f), dtype=np.float32)
+    new_base_d = np.zeros(len(f), dtype=np.float32)
+
+    idx = 0
+    idx_base = 0
+    idx_out = 0
+    while True:
+        if idx >= len(f):
+            break
+        if idx_base >= len(base_f):
+            break
+        diff = f[idx] - base_f[idx_base]
+        if abs(diff) < 1e-12:
+            # Both are equal
+            new_f[idx_out] = f[idx]
+            new_d[idx_out] = d[idx]
+            new_base_d[idx_out] = base_d[idx_base]
+            idx += 1
+            idx_base += 1
+            idx_out += 1
+            continue
+        if diff < 0:
+            idx += 1
+            continue
+        idx_base += 1
+
+    return new_f[:idx_out], new_d[:idx_out], new_base_d[:idx_out]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_resized_arrays(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        n, m = rng.integers(0, 60, size=2)
+        # Few distinct frequencies: Many matches and repetitions
+        pool = np.round(rng.uniform(0, 100, size=80), 1)
+        f = sorted(rng.choice(pool, n).tolist())
+        base_f = sorted(rng.choice(pool, m).tolist())
+        if seed % 3 == 0:
+            # Within the tolerance
+            base_f = [x + 1e-13 for x in base_f]
+        d = rng.normal(size=n).tolist()
+        base_d = rng.normal(size=m).tolist()
+
+        resized = ResizedArrays(f, base_f, d, base_d)
+        f_loop, y_loop, base_y_loop = resized_arrays_loop(f, base_f, d, base_d)
+        np.testing.assert_array_equal(resized.f, f_loop)
+        np.testing.assert_array_equal(resized.y, y_loop)
+        np.testing.assert_array_equal(resized.base_y, base_y_loop)
+        assert resized.f.dtype == np.float32
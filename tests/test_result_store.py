@@ -0,0 +1,81 @@
+"""
+'library_result_store': The '.npz' bundles which replaced the pickle files.
+"""
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import library_result_store
+from pymeas2019_noise.library_result_store import KIND_DENSITYSTEP, KIND_SUMMARY
+
+COLUMNS = {
+    "f": np.linspace(0.1, 1.0, 10),
+    "stage": np.array([0, 1, 2], dtype=np.int64),
+    "stepname": np.array("a"),
+    "empty": np.zeros(0),
+}
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_roundtrip(tmp_path, mmap_mode):
+    filename = tmp_path / "result_summary.npz"
+    library_result_store.save(filename, kind=KIND_SUMMARY, columns=COLUMNS)
+    assert not (tmp_path / "result_summary.npz.tmp").exists()
+
+    columns = library_result_store.load(
+        filename, kind=KIND_SUMMARY, mmap_mode=mmap_mode
+    )
+    assert sorted(columns) == sorted(COLUMNS)
+    for name, array in COLUMNS.items():
+        np.testing.assert_array_equal(columns[name], array)
+        assert columns[name].dtype == array.dtype
+
+    columns = library_result_store.load(
+        filename, kind=KIND_SUMMARY, mmap_mode=mmap_mode, names=("stage",)
+    )
+    assert list(columns) == ["stage"]
+
+
+def test_wrong_kind(tmp_path):
+    filename = tmp_path / "densitystep_a_00.npz"
+    library_result_store.save(filename, kind=KIND_DENSITYSTEP, columns=COLUMNS)
+    with pytest.raises(Exception, match="Expected format 'result_summary'"):
+        library_result_store.load(filename, kind=KIND_SUMMARY)
+
+
+def test_newer_version(tmp_path, monkeypatch):
+    filename = tmp_path / "result_summary.npz"
+    monkeypatch.setattr(
+        library_result_store, "FORMAT_VERSION", library_result_store.FORMAT_VERSION + 1
+    )
+    library_result_store.save(filename, kind=KIND_SUMMARY, columns=COLUMNS)
+    monkeypatch.undo()
+    with pytest.raises(Exception, match="is not supported"):
+        library_result_store.load(filename, kind=KIND_SUMMARY)
+
+
+def test_compressed_not_mapped(tmp_path):
+    filename = tmp_path / "result_summary.npz"
+    np.savez_compressed(filename, format=KIND_SUMMARY, version=1, **COLUMNS)
+    assert "f" in library_result_store.load(filename, kind=KIND_SUMMARY)
+    with pytest.raises(Exception, match="is compressed"):
+        library_result_store.load(filename, kind=KIND_SUMMARY, mmap_mode="r")
+
+
+def test_truncated_file_raises_load_error(tmp_path):
+    filename = tmp_path / "result_summary.npz"
+    library_result_store.save(filename, kind=KIND_SUMMARY, columns=COLUMNS)
+    filename.write_bytes(filename.read_bytes()[:100])
+    with pytest.raises(library_result_store.LOAD_ERRORS):
+        library_result_store.load(filename, kind=KIND_SUMMARY)
+
+
+def test_pack_unpack():
+    arrays = [np.array([1.0, 2.0]), np.zeros(0), np.array([3.0])]
+    values, offsets = library_result_store.pack(arrays)
+    assert offsets.tolist() == [0, 2, 2, 3]
+    unpacked = library_result_store.unpack(values, offsets)
+    assert [a.tolist() for a in unpacked] == [a.tolist() for a in arrays]
+
+    values, offsets = library_result_store.pack([])
+    assert library_result_store.unpack(values, offsets) == []
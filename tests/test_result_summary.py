@@ -0,0 +1,73 @@
+"""
+'result_summary.npz': The stage columns are loaded on first access
+and must come from the same file as the summary.
+"""
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import library_plot, library_plot_config, library_topic
+from pymeas2019_noise.library_topic import PickleResultSummary
+
+
+def save(directory, samples_V: np.ndarray) -> None:
+    dict_stages = {
+        stage: {
+            "stage": stage,
+            "dt_s": 0.1 * 2**stage,
+            "stepsize_bins_V": np.arange(3.0),
+            "stepsize_bins_count": np.ones(3),
+            "samples_V": samples_V + stage,
+        }
+        for stage in range(2)
+    }
+    PickleResultSummary.save(
+        directory, f=[1.0, 2.0], d=[3.0, 4.0], enbw=[5.0, 6.0], dict_stages=dict_stages
+    )
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_lazy_stage_columns(tmp_path, mmap_mode):
+    save(tmp_path, samples_V=np.linspace(0.0, 1.0, 5))
+    prs = PickleResultSummary.load(tmp_path, mmap_mode=mmap_mode)
+    assert prs.f == [1.0, 2.0]
+    dict_stage = prs.dict_stages[1]
+    assert dict_stage["dt_s"] == 0.2
+    np.testing.assert_array_equal(dict_stage["samples_V"], np.linspace(0.0, 1.0, 5) + 1)
+    assert sorted(dict_stage) == sorted(
+        ["stage", "dt_s", *PickleResultSummary.STAGE_COLUMNS_RAGGED]
+    )
+
+
+def test_replaced_summary_raises(tmp_path):
+    save(tmp_path, samples_V=np.zeros(5))
+    prs = PickleResultSummary.load(tmp_path)
+    save(tmp_path, samples_V=np.ones(7))
+    with pytest.raises(library_topic.SummaryReplacedException):
+        prs.dict_stages[0]["samples_V"]
+
+    prs = PickleResultSummary.load(tmp_path)
+    np.testing.assert_array_equal(prs.dict_stages[0]["samples_V"], np.ones(7))
+
+
+def test_replaced_summary_skipped_by_calculate_xy(tmp_path):
+    dir_raw = tmp_path / "raw-blue-a"
+    dir_raw.mkdir()
+    save(dir_raw, samples_V=np.zeros(5))
+    plot_config = library_plot_config.PlotConfig()
+    presentations = library_topic.get_presentations(plot_config=plot_config)
+    topic = library_topic.Topic.load(
+        dir_raw, plot_config=plot_config, presentations=presentations
+    )
+    # The refresh worker writes the summary before the topic is updated
+    save(dir_raw, samples_V=np.ones(7))
+
+    replaced = []
+    list_xy, _x_label = library_plot.calculate_xy(
+        topics=[topic],
+        presentation=presentations.get(library_topic.PRESENTATION_TIMESERIE),
+        stage=None,
+        func_summary_replaced=lambda: replaced.append(True),
+    )
+    assert list_xy == [(topic, None)]
+    assert replaced == [True]
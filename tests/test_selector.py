@@ -0,0 +1,147 @@
+"""
+Regression test: The vectorized 'Selector.fill_bins()' has to write the
+same 'result_summary_LSD.txt' as the previous loop implementation.
+"""
+
+import math
+import pathlib
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import (
+    library_plot_config,
+    program_eseries,
+    program_fir,
+    program_fir_plot,
+)
+
+
+def fill_bins_loop(series, density, firstDensityPoint, lastDensity, trace):
+    """
+    The previous implementation of 'Selector.fill_bins()'.
+    """
+    eseries_borders = program_eseries.eseries(
+        series=series, minimal=1e-6, maximal=1e8, borders=True
+    )
+    sum_d = 0.0
+    sum_n = 0
+    idx_fft = 0
+    Pxx = density.Pxx
+    list_density_points = []
+
+    fmax_Hz = 1.0 / (density.dt_s * 2.0)
+    f_high_limit_Hz = program_fir_plot.Selector.USEFUL_PART * fmax_Hz
+    f_low_limit_Hz = f_high_limit_Hz / program_fir.DECIMATE_FACTOR
+
+    for f_eserie_left, f_eserie, f_eserie_right in eseries_borders:
+        if not trace:
+            if f_eserie < f_low_limit_Hz:
+                if not firstDensityPoint:
+                    continue
+            if f_eserie > f_high_limit_Hz:
+                if not lastDensity:
+                    return list_density_points
+
+        while True:
+            if idx_fft >= len(density.frequencies):
+                return list_density_points
+
+            f_fft = density.frequencies[idx_fft]
+
+            if f_fft < f_eserie_left:
+                idx_fft += 1
+                continue
+
+            if f_fft > f_eserie_right:
+                if sum_n > 0:
+                    list_density_points.append(
+                        program_fir_plot.DensityPoint(
+                            f=f_eserie,
+                            d=math.sqrt(sum_d / sum_n),
+                            densityPlot=density,
+                            enbw=f_eserie_right - f_eserie_left,
+                        )
+                    )
+                    sum_d = 0.0
+                    sum_n = 0
+                break
+
+            sum_d += Pxx[idx_fft]
+            sum_n += 1
+            idx_fft += 1
+
+    raise Exception("Internal Programming Error")
+
+
+def write_densitysteps(directory: pathlib.Path, stages: int) -> None:
+    rng = np.random.default_rng(42)
+    dt_s = 1.0 / 97656.25
+    for stage in range(stages):
+        skip = stage < 2
+        samples = 4096 if stage < stages - 1 else 2718
+        frequencies = np.fft.rfftfreq(samples, d=dt_s)
+        Pxx_n = 0 if stage == 3 else int(rng.integers(1, 100))
+        Pxx_sum = (
+            Pxx_n
+            * 1e-12
+            / (1.0 + frequencies)
+            * rng.uniform(0.5, 2.0, len(frequencies))
+        )
+        filename = (
+            program_fir_plot.FilenameDensityStepMatcher.filename_from_stepname_stage(
+                stepname="slow", stage=stage, skip=skip
+            )
+        )
+        program_fir_plot.DensityPlot.write(
+            directory / filename,
+            dict(  # noqa: C408
+                stepname="slow",
+                stage=stage,
+                dt_s=dt_s,
+                skip=skip,
+                frequencies=frequencies,
+                Pxx_n=Pxx_n,
+                Pxx_sum=Pxx_sum,
+                stepsize_bins_count=np.zeros(10),
+                stepsize_bins_V=np.zeros(10),
+                samples_V=np.zeros(10),
+            ),
+        )
+        dt_s *= program_fir.DECIMATE_FACTOR
+
+
+@pytest.mark.parametrize("series", ["E12", "E24", "E192"])
+@pytest.mark.parametrize("trace", [False, True])
+def test_fill_bins(tmp_path, series, trace):
+    write_densitysteps(tmp_path, stages=8)
+    plot_config = library_plot_config.PlotConfig(eseries=series)
+
+    list_density = program_fir_plot.DensityPlot.plots_from_directory(
+        dir_input=tmp_path, skip=not trace
+    )
+    lsd_summary = program_fir_plot.LsdSummary(
+        plot_config, list_density, directory=tmp_path, trace=trace
+    )
+    lsd_summary.write_summary_file(trace=trace)
+    file_tag = "_trace" if trace else ""
+    lines = (tmp_path / f"result_summary_LSD{file_tag}.txt").read_text().splitlines()
+
+    lines_expected = []
+    list_density = sorted(
+        list_density, key=program_fir_plot.DensityPlot.sort_key, reverse=True
+    )
+    for density in list_density:
+        if density.Pxx is None:
+            continue
+        list_density_points = fill_bins_loop(
+            series,
+            density,
+            firstDensityPoint=len(lines_expected) == 0,
+            lastDensity=density == list_density[-1],
+            trace=trace,
+        )
+        lines_expected.extend(dp.line for dp in list_density_points)
+
+    assert len(lines) > 0
+    assert lines == lines_expected
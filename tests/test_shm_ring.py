@@ -0,0 +1,88 @@
+"""
+'ShmRing': Waiting while the ring is full and a consumer which stopped.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pymeas2019_noise import library_shm_ring
+
+
+@pytest.fixture
+def ring(monkeypatch):
+    monkeypatch.setattr(library_shm_ring, "WAIT_TIMEOUT_S", 0.05)
+    ring = library_shm_ring.ShmRing.create(capacity=8, dtype=np.float64)
+    yield ring
+    ring.close(unlink=True)
+
+
+def test_wrap_around(ring):
+    received = []
+    for i in range(5):
+        array = np.arange(i * 5, (i + 1) * 5, dtype=np.float64)
+        assert ring.put(array) == 0.0
+        while ring.size > 0:
+            view = ring.get(max_samples=3)
+            received.extend(view)
+            ring.release(len(view))
+    assert received == list(range(25))
+
+
+def test_put_waits_for_release(ring):
+    ring.put(np.zeros(8))
+
+    def release_later():
+        time.sleep(0.2)
+        ring.release(len(ring.get(max_samples=8)))
+
+    thread = threading.Thread(target=release_later)
+    thread.start()
+    waited_s = ring.put(np.ones(4), func_alive=lambda: True)
+    thread.join()
+    assert waited_s > 0.1
+    np.testing.assert_array_equal(ring.get(max_samples=8), np.ones(4))
+
+
+def test_put_raises_if_consumer_stopped(ring):
+    ring.put(np.zeros(8))
+    with pytest.raises(Exception, match="consumer stopped"):
+        ring.put(np.ones(1), func_alive=lambda: False)
+
+
+def test_put_EOF_raises_if_consumer_holds_the_lock(ring):
+    condition = ring.descriptor.condition
+    acquired = threading.Event()
+    stop = threading.Event()
+
+    def hold_lock():
+        # Like a consumer which died while holding the lock
+        with condition:
+            acquired.set()
+            stop.wait()
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    acquired.wait()
+    try:
+        with pytest.raises(Exception, match="consumer stopped"):
+            ring.put_EOF(exit_code=0, func_alive=lambda: False)
+    finally:
+        stop.set()
+        thread.join()
+
+    ring.put_EOF(exit_code=3, func_alive=lambda: True)
+    assert ring.get(max_samples=8) is None
+    assert ring.exit_code == 3
+
+
+def test_get_raises_if_producer_stopped(ring):
+    with pytest.raises(Exception, match="producer stopped"):
+        ring.get(max_samples=8, func_alive=lambda: False)
+
+    ring.put(np.ones(2))
+    np.testing.assert_array_equal(
+        ring.get(max_samples=8, func_alive=lambda: False), np.ones(2)
+    )